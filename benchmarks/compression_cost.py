@@ -0,0 +1,121 @@
+"""Compare the CPU cost of the response codecs against the bytes they save.
+
+    PYTHONPATH=src python benchmarks/compression_cost.py [--teams 5,50,200] [--repeat N]
+
+Sessions of teams of every size, with as many members and ten tasks a member,
+are created through the API on an embedded SQLite database. Their session and
+organization dumps are then compressed with gzip and, when installed, brotli
+at several levels, the way common.compression compresses the responses.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+
+# the tasks of a batch request
+BATCH_SIZE = 500
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--teams', default='5,50,200', help='comma separated team sizes')
+    parser.add_argument('--repeat', type=int, default=20, help='the compressions of every payload and codec')
+    return parser.parse_args(argv)
+
+
+def send(client, method: str, path: str, **options):
+    """Send a setup request, fail loudly unless it succeeded."""
+    response = client.open(path, method=method, **options)
+    if not 200 <= response.status_code < 300:
+        raise RuntimeError(f'{method} {path} answered {response.status_code}: {response.get_data(as_text=True)}')
+    return response
+
+
+def create_team(client, size: int) -> dict:
+    """Create an organization with a session of the size's members, ten tasks a member."""
+    suffix = os.urandom(4).hex()
+    organization = send(client, 'POST', '/organizations/', json={'name': f'Team {suffix}'}).get_json()
+    session = send(client, 'POST', '/estimations/sessions/', json={
+        'name': f'Planning {suffix}',
+        'organization': {'id': organization['id']},
+        'sequence': {'name': 'Fibonacci'},
+    }).get_json()
+
+    users = [send(client, 'POST', '/users/', json={
+        'email': f'member-{suffix}-{index}@example.com',
+        'name': f'Member {index}',
+        'password': 'benchmark',
+        'organization': organization['id'],
+    }).get_json() for index in range(size)]
+    send(client, 'PUT', f'/estimations/sessions/{session["id"]}/members/batch',
+         json={'users': [{'id': user['id']} for user in users]})
+    tasks = [{'name': f'TASK-{index}'} for index in range(size * 10)]
+    for start in range(0, len(tasks), BATCH_SIZE):
+        send(client, 'POST', f'/estimations/sessions/{session["id"]}/tasks/batch',
+             json=tasks[start:start + BATCH_SIZE])
+
+    return {
+        'session': send(client, 'GET', f'/estimations/sessions/{session["id"]}').data,
+        'organization': send(client, 'GET', f'/organizations/{organization["id"]}').data,
+    }
+
+
+def codecs():
+    from common import compression
+
+    for level in (1, 6, 9):
+        yield f'gzip-{level}', lambda level=level: compression.gzip_compressor(level)
+    if compression.brotli is not None:
+        for quality in (1, 4, 8):
+            yield f'br-{quality}', lambda quality=quality: compression.brotli_compressor(quality)
+
+
+def measure(payload: bytes, compressor, repeat: int):
+    timings = list()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        process, finish = compressor()
+        compressed = process(payload) + finish()
+        timings.append(time.perf_counter() - started)
+    return len(compressed), statistics.median(timings)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(DB_ENGINE='sqlite', DB_SQLITE_PATH=os.path.join(directory, 'estimations.db'))
+        from common import db
+        from common.migrations import manager
+
+        manager(db.database).upgrade()
+        db.database.close()
+
+        from run import app
+
+        client = app.test_client()
+        send(client, 'POST', '/estimations/sequences/', json={'name': 'Fibonacci'})
+        send(client, 'POST', '/estimations/sequences/Fibonacci/values/',
+             json=[{'value': value} for value in (0, 1, 2, 3, 5, 8, 13, 21)] + [{'name': '?'}])
+
+        print(f'{"payload":<20} {"codec":<8} {"bytes":>10} {"saved":>7} {"ms":>8} {"MB/s":>8}')
+        for size in map(int, args.teams.split(',')):
+            for kind, payload in create_team(client, size).items():
+                name = f'{kind} ({size})'
+                print(f'{name:<20} {"identity":<8} {len(payload):>10}')
+                for codec, compressor in codecs():
+                    compressed, seconds = measure(payload, compressor, args.repeat)
+                    print(f'{"":<20} {codec:<8} {compressed:>10} {1 - compressed / len(payload):>7.1%} '
+                          f'{seconds * 1000:>8.3f} {len(payload) / seconds / 1e6:>8.1f}')
+
+        db.database.close_all()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Compare the request latency with logging to a slow stdout.
+
+    PYTHONPATH=src python benchmarks/logging_latency.py [--requests N] [--write-ms MS] [--sample-rate RATE]
+
+The request mix of request_latency.py is served on an embedded SQLite database
+with LOG_LEVEL=DEBUG, so every statement is logged, to a stream taking
+--write-ms per write, e.g., a pipe whose reader falls behind. Modes:
+
+* direct: a StreamHandler writing in the request thread, as before;
+* queue: the queue handler of common.loggers;
+* sampled: the queue handler writing --sample-rate of the debug records.
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from request_latency import percentile, requests, seed
+
+
+MODES = ('direct', 'queue', 'sampled')
+
+
+class SlowStream(io.StringIO):
+
+    def __init__(self, write_ms: float):
+        super().__init__()
+        self.write_ms = write_ms
+
+    def write(self, text: str) -> int:
+        time.sleep(self.write_ms / 1000)
+        return super().write(text)
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='the requests of each mode')
+    parser.add_argument('--write-ms', type=float, default=0.2, help='the time of every write to the stream')
+    parser.add_argument('--sample-rate', type=float, default=0.1, help='the debug records written when sampled')
+    return parser.parse_args(argv)
+
+
+def log_to(mode: str, args) -> SlowStream:
+    from common import loggers
+
+    stream = SlowStream(args.write_ms)
+    if mode == 'direct':
+        loggers.uninstall()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(loggers.TEXT_FORMAT))
+        for target in loggers.LOGGERS:
+            target.setLevel(logging.DEBUG)
+            target.addHandler(handler)
+    else:
+        loggers.install(stream, level='DEBUG', sample_rate=args.sample_rate if mode == 'sampled' else 1.0)
+    return stream
+
+
+def stop_logging():
+    from common import loggers
+
+    loggers.uninstall()
+    for target in loggers.LOGGERS:
+        for handler in list(target.handlers):
+            target.removeHandler(handler)
+
+
+def serve(client, dataset: dict, count: int) -> Dict[str, List[float]]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    for number in range(count):
+        name, method, path, payload = requests(dataset, number)
+        started = time.perf_counter()
+        response = getattr(client, method)(path, json=payload)
+        latencies[name].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method.upper()} {path} failed with {response.status_code}: {response.data}')
+    return latencies
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(DB_ENGINE='sqlite', DB_SQLITE_PATH=os.path.join(directory, 'estimations.db'))
+        from common import db
+        from common.migrations import manager
+
+        manager(db.database).upgrade()
+        db.database.close()
+
+        from run import app
+
+        client = app.test_client()
+        dataset = seed(client)
+
+        print(f'{"mode":<8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"lines":>8}')
+        for mode in MODES:
+            stream = log_to(mode, args)
+            values = [value for values in serve(client, dataset, args.requests).values() for value in values]
+            stop_logging()
+            lines = stream.getvalue().count('\n')
+            print(f'{mode:<8} {percentile(values, 0.5):>8.2f} {percentile(values, 0.95):>8.2f} '
+                  f'{percentile(values, 0.99):>8.2f} {lines:>8}')
+
+        db.database.close_all()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
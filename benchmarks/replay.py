@@ -0,0 +1,170 @@
+"""Replay recorded requests against this build and report its throughput and latency.
+
+    PYTHONPATH=src python benchmarks/replay.py RECORDS [--speed 0] [--json REPORT]
+
+The records are JSON lines written by common.recorder (RECORD_PATH). They are
+replayed in order, in-process through the Flask test client, on an embedded
+SQLite database migrated from scratch, so the recorded traffic runs on any
+build without a MySQL around.
+
+The IDs the recorded writes got are mapped to the ones the replayed writes get,
+in the paths, query strings and bodies of the following requests. Reads of
+rows the replay did not create, e.g., recorded against an existing database,
+are replayed as they are and most likely miss.
+
+--speed 0 replays as fast as possible, --speed 1 keeps the recorded intervals
+between the requests and --speed N replays N times faster. Compare the builds
+with the reports of --json.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+
+PERCENTILES = (50, 90, 99)
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('records', help='the JSON lines file of the recorded requests')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='0 as fast as possible, 1 at the recorded pace, N times faster than it')
+    parser.add_argument('--json', dest='report', help='write the report to this file as JSON')
+    return parser.parse_args(argv)
+
+
+def percentile(timings: List[float], rank: int) -> float:
+    """The nearest rank percentile of the sorted timings."""
+    if not timings:
+        return math.nan
+    return timings[max(0, math.ceil(rank / 100 * len(timings)) - 1)]
+
+
+class Replay:
+    """The requests replayed and the IDs mapped so far."""
+
+    def __init__(self, client):
+        self.client = client
+        self.mapped: Dict[str, str] = dict()
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Counter = Counter()
+        self.mismatches: Counter = Counter()
+
+    def map(self, payload: Any) -> Any:
+        if isinstance(payload, str):
+            return self.mapped.get(payload, payload)
+        if isinstance(payload, dict):
+            return {key: self.map(value) for key, value in payload.items()}
+        if isinstance(payload, list):
+            return [self.map(item) for item in payload]
+        return payload
+
+    def send(self, record: dict):
+        from common import recorder
+
+        method = record['method']
+        path = '/'.join(self.map(segment) for segment in record['path'].split('/'))
+        query = urlencode([(key, self.map(value)) for key, value in parse_qsl(record.get('query', ''))])
+        options = {'json': self.map(record['body'])} if 'body' in record else dict()
+
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, query_string=query,
+                                    headers=record.get('headers', dict()), **options)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+
+        endpoint = record.get('endpoint') or 'unmatched'
+        self.timings[endpoint].append(elapsed)
+        self.statuses[response.status_code] += 1
+        if response.status_code != record.get('status', response.status_code):
+            self.mismatches[f'{endpoint} {record["status"]} -> {response.status_code}'] += 1
+
+        if record.get('ids') and response.is_json:
+            for recorded, replayed in zip(record['ids'], recorder.ids(response.get_json(silent=True))):
+                if recorded != replayed:
+                    self.mapped[recorded] = replayed
+
+    def report(self, elapsed: float) -> dict:
+        timings = sorted(timing for endpoint_timings in self.timings.values() for timing in endpoint_timings)
+        return {
+            'requests': len(timings),
+            'seconds': elapsed,
+            'throughput': len(timings) / elapsed if elapsed else math.nan,
+            'latency': latencies(timings),
+            'endpoints': {endpoint: latencies(sorted(endpoint_timings))
+                          for endpoint, endpoint_timings in sorted(self.timings.items())},
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'mismatches': dict(self.mismatches.most_common()),
+        }
+
+
+def latencies(timings: List[float]) -> dict:
+    data = {'count': len(timings)}
+    data.update({f'p{rank}': percentile(timings, rank) for rank in PERCENTILES})
+    data['max'] = timings[-1] if timings else math.nan
+    return data
+
+
+def run(replay: Replay, records: List[dict], speed: float) -> float:
+    """Send the records at the speed, returns the seconds it took."""
+    started = time.perf_counter()
+    first_at = records[0].get('at', 0) if records else 0
+    for record in records:
+        if speed > 0:
+            delay = (record.get('at', first_at) - first_at) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        replay.send(record)
+    return time.perf_counter() - started
+
+
+def print_report(report: dict):
+    print(f'{report["requests"]} requests in {report["seconds"]:.2f}s, {report["throughput"]:.1f} requests/s')
+    columns = [f'p{rank}' for rank in PERCENTILES] + ['max']
+    print(f'{"endpoint":<50} {"count":>7} ' + ' '.join(f'{f"{column} ms":>9}' for column in columns))
+    for endpoint, data in list(report['endpoints'].items()) + [('all', report['latency'])]:
+        timings = ' '.join(f'{data[column] * 1000:>9.2f}' for column in columns)
+        print(f'{endpoint:<50} {data["count"]:>7} {timings}')
+    print('statuses: ' + ', '.join(f'{status}: {count}' for status, count in report['statuses'].items()))
+    for mismatch, count in report['mismatches'].items():
+        print(f'status differs from the recorded one: {mismatch} ({count})')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # the replay is not recorded again
+        os.environ.update(DB_ENGINE='sqlite', DB_SQLITE_PATH=os.path.join(directory, 'estimations.db'),
+                          RECORD_PATH='')
+        from common import db, recorder
+        from common.migrations import manager
+
+        manager(db.database).upgrade()
+        db.database.close()
+
+        from run import app
+
+        records = recorder.read(args.records)
+        replay = Replay(app.test_client())
+        report = replay.report(run(replay, records, args.speed))
+
+        db.database.close_all()
+
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
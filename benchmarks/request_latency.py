@@ -0,0 +1,181 @@
+"""Compare the request latency of the embedded SQLite mode against MySQL.
+
+    PYTHONPATH=src python benchmarks/request_latency.py [--requests N] [--targets embedded,standin,mysql]
+
+Every target runs in its own process, with its database built the way the
+application builds it, and serves the same request mix through the Flask test
+client: reading sessions, tasks, summaries and histograms, and estimating.
+
+Targets:
+
+* embedded: DB_ENGINE=sqlite, a WAL mode file in a temporary directory;
+* standin: a local stand-in for the MySQL path when there is no MySQL around,
+  SQLite with a rollback journal, full syncs and --rtt-ms of network round
+  trip added to every statement;
+* mysql: the configured MySQL database (DB_HOST and co.), migrated already.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+TARGETS = ('embedded', 'standin', 'mysql')
+
+MEMBERS = 5
+
+TASKS = 20
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', default='embedded,standin',
+                        help=f'comma separated targets, of {", ".join(TARGETS)}')
+    parser.add_argument('--requests', type=int, default=2000, help='the requests of each target')
+    parser.add_argument('--rtt-ms', type=float, default=0.3, help='the round trip of the stand-in per statement')
+    parser.add_argument('--worker', choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def build_database(args):
+    """Build the target's database, must run before the models are imported."""
+    from common import db
+
+    if args.worker != 'standin':
+        return db.build_database()
+
+    class StandInDatabase(db.RoutedSqliteDatabase):
+        def execute_sql(self, sql, params=None, commit=db.peewee.SENTINEL):
+            time.sleep(args.rtt_ms / 1000)
+            return super().execute_sql(sql, params, commit)
+
+    return StandInDatabase(os.path.join(args.directory, 'standin.db'),
+                           pragmas=(('journal_mode', 'delete'), ('synchronous', 'full'), ('foreign_keys', 1)),
+                           check_same_thread=False)
+
+
+def seed(client) -> dict:
+    """Create an organization with a session, its members and tasks through the API."""
+    suffix = os.urandom(4).hex()
+    organization = client.post('/organizations/', json={'name': f'Benchmark {suffix}'}).get_json()
+    users = [client.post('/users/', json={
+        'email': f'benchmark-{suffix}-{index}@example.com',
+        'name': f'User {index}',
+        'password': 'benchmark',
+        'organization': organization['id'],
+    }).get_json() for index in range(MEMBERS)]
+
+    sequence = f'Benchmark {suffix}'
+    client.post('/estimations/sequences/', json={'name': sequence})
+    client.post(f'/estimations/sequences/{sequence}/values/',
+                json=[{'value': value} for value in (0, 1, 2, 3, 5, 8, 13)] + [{'name': '?'}])
+
+    session = client.post('/estimations/sessions/', json={
+        'name': 'Benchmark',
+        'organization': {'id': organization['id']},
+        'sequence': {'name': sequence},
+    }).get_json()
+    for user in users:
+        client.put(f'/estimations/sessions/{session["id"]}/members/', json={'user': {'id': user['id']}})
+    tasks = [client.post(f'/estimations/sessions/{session["id"]}/tasks/', json={'name': f'TASK-{index}'}).get_json()
+             for index in range(TASKS)]
+
+    return {'session': session['id'], 'tasks': [task['id'] for task in tasks], 'users': [user['id'] for user in users]}
+
+
+def requests(dataset: dict, number: int):
+    """The (name, method, path, payload) of the request number of the mix."""
+    session = dataset['session']
+    task = dataset['tasks'][number % len(dataset['tasks'])]
+    user = dataset['users'][number % len(dataset['users'])]
+
+    kind = number % 5
+    if kind == 0:
+        return 'estimate', 'put', f'/estimations/sessions/{session}/tasks/{task}/estimations/', {
+            'user': {'id': user},
+            'value': {'value': [1, 2, 3, 5, 8][number // 5 % 5]},
+        }
+    if kind == 1:
+        return 'session', 'get', f'/estimations/sessions/{session}', None
+    if kind == 2:
+        return 'tasks', 'get', f'/estimations/sessions/{session}/tasks', None
+    if kind == 3:
+        return 'summary', 'get', f'/estimations/sessions/{session}/tasks/{task}/summary', None
+    return 'histogram', 'get', f'/estimations/sessions/{session}/tasks/{task}/histogram', None
+
+
+def work(args):
+    """Serve the request mix on the target and print the latencies as JSON."""
+    from common import db
+    from common.migrations import manager
+
+    db.database = build_database(args)
+    manager(db.database).upgrade()
+    # every request connects on its own
+    db.database.close()
+
+    from run import app
+
+    client = app.test_client()
+    dataset = seed(client)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    started = time.perf_counter()
+    for number in range(args.requests):
+        name, method, path, payload = requests(dataset, number)
+        request_started = time.perf_counter()
+        response = getattr(client, method)(path, json=payload)
+        latencies[name].append((time.perf_counter() - request_started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method.upper()} {path} failed with {response.status_code}: {response.data}')
+
+    elapsed = time.perf_counter() - started
+    print(json.dumps({'elapsed': elapsed, 'latencies': latencies}))
+
+
+def percentile(values: List[float], ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def report(target: str, requests_count: int, result: dict):
+    print(f'\n{target}: {requests_count / result["elapsed"]:.0f} requests/s')
+    print(f'    {"request":<10} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for name, values in sorted(result['latencies'].items()):
+        print(f'    {name:<10} {statistics.median(values):>8.2f} '
+              f'{percentile(values, 0.95):>8.2f} {percentile(values, 0.99):>8.2f}')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.worker:
+        work(args)
+        return 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        for target in args.targets.split(','):
+            env = dict(os.environ)
+            if target == 'embedded':
+                env.update(DB_ENGINE='sqlite', DB_SQLITE_PATH=os.path.join(directory, 'embedded.db'))
+            elif target == 'mysql':
+                env['DB_ENGINE'] = 'mysql'
+
+            output = subprocess.run(
+                [sys.executable, __file__, '--worker', target, '--directory', directory,
+                 '--requests', str(args.requests), '--rtt-ms', str(args.rtt_ms)],
+                env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True,
+            ).stdout
+            report(target, args.requests, json.loads(output.splitlines()[-1]))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Compare dumping the list endpoints' rows through model instances against the row path.
+
+    PYTHONPATH=src python benchmarks/row_serialization.py [--rows 10000] [--repeat N]
+
+An organization with --rows users, a session with --rows tasks and a task with
+--rows estimations are inserted in an embedded SQLite database. Every list is
+then dumped the way the endpoints did, building an instance of every row and
+calling its dump(), and the way they do, selecting the dumped columns as tuples
+and serializing them with the models' dump_row(). The median latency and the
+peak of the memory allocated, traced with tracemalloc, are reported for both.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List, Optional
+from uuid import uuid4
+
+
+# the rows of a multi-row insert
+BATCH_SIZE = 500
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='the rows of every list')
+    parser.add_argument('--repeat', type=int, default=10, help='the dumps of every list and path')
+    return parser.parse_args(argv)
+
+
+def insert(model, rows: List[dict]):
+    for start in range(0, len(rows), BATCH_SIZE):
+        model.insert_many(rows[start:start + BATCH_SIZE]).execute()
+
+
+def populate(size: int):
+    """Create the organization, session and task with the size's users, tasks and estimations."""
+    from estimations.models import Estimation, Sequence, Session, Task, Value
+    from organizations.models import Organization
+    from users.models import User
+
+    organization = Organization.create(name='Organization')
+    sequence = Sequence.create(name='Fibonacci')
+    Value.from_list([{'value': value} for value in (0, 1, 2, 3, 5, 8, 13, 21)] + [{'name': '?'}], sequence)
+    values = [value.id for value in sequence.values]
+    session = Session.create(name='Planning', organization=organization, sequence=sequence)
+    task = Task.create(session=session, name='TASK-0')
+
+    now = datetime.now()
+    users = [uuid4() for _ in range(size)]
+    insert(User, [{'id': user_id, 'email': f'user-{index}@example.com', 'name': f'User {index}',
+                   'password': 'benchmark', 'organization': organization.id, 'registered_on': now}
+                  for index, user_id in enumerate(users)])
+    insert(Task, [{'id': uuid4(), 'name': f'TASK-{index}', 'session': session.id, 'created_at': now}
+                  for index in range(1, size)])
+    insert(Estimation, [{'id': uuid4(), 'task': task.id, 'user': user_id, 'value': values[index % len(values)],
+                         'created_at': now} for index, user_id in enumerate(users)])
+
+    return {
+        'organization users': (
+            lambda: sorted([user.dump(with_organization=False) for user in organization.users],
+                           key=lambda user: user['name']),
+            lambda: organization.dump()['users'],
+        ),
+        'session tasks': (
+            lambda: [task.dump(with_session=False) for task in session.tasks],
+            lambda: Task.dump_rows(session.tasks),
+        ),
+        'task estimations': (
+            lambda: [estimation.dump(with_task=False) for estimation in task.estimations],
+            lambda: Estimation.dump_rows(task.estimations),
+        ),
+    }
+
+
+def measure(dump, repeat: int):
+    from common import identity
+
+    timings = list()
+    for _ in range(repeat):
+        # like a request, within a scope of the identity map
+        with identity.scope():
+            started = time.perf_counter()
+            dump()
+            timings.append(time.perf_counter() - started)
+
+    with identity.scope():
+        tracemalloc.start()
+        dump()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return statistics.median(timings), peak
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.update(DB_ENGINE='sqlite', DB_SQLITE_PATH=os.path.join(directory, 'estimations.db'))
+        from common import db
+        from common.migrations import manager
+
+        manager(db.database).upgrade()
+
+        lists = populate(args.rows)
+
+        print(f'{"list":<20} {"path":<10} {"ms":>9} {"peak KiB":>10}')
+        for name, (instances, rows) in lists.items():
+            assert instances() == rows(), f'the {name} differ'
+            baseline = None
+            for path, dump in (('instances', instances), ('rows', rows)):
+                seconds, peak = measure(dump, args.repeat)
+                gain = '' if baseline is None else \
+                    f'  {baseline[0] / seconds:.1f}x faster, {1 - peak / baseline[1]:.0%} less memory'
+                print(f'{name:<20} {path:<10} {seconds * 1000:>9.1f} {peak / 1024:>10.0f}{gain}')
+                baseline = baseline or (seconds, peak)
+
+        db.database.close_all()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,12 @@
+import glob
 import multiprocessing
+import os
+import tempfile
 
-from settings.app import HOSTNAME, PORT
+# the workers share their metrics through this directory, it must be set before the app is imported
+os.environ.setdefault('prometheus_multiproc_dir', os.path.join(tempfile.gettempdir(), 'estimations-metrics'))
+
+from settings.app import HOSTNAME, METRICS_DIR, PORT  # noqa: E402
 
 
 workers = (multiprocessing.cpu_count() * 2) - 1
@@ -11,6 +17,7 @@ bind = f'{HOSTNAME}:{PORT}'
 
 threads = 2 if workers > 1 else 4
 
+# every recycled worker leaves its counter and histogram files in METRICS_DIR, child_exit compacts them
 max_requests = 100
 
 max_requests_jitter = 5
@@ -18,3 +25,21 @@ max_requests_jitter = 5
 accesslog = '-'
 
 errorlog = '-'
+
+
+def on_starting(server):
+    # the files of a previous run would add up to the metrics of this one, only they are removed
+    # in case the directory is shared with anything else
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    from common import metrics_files
+
+    multiprocess.mark_process_dead(worker.pid, METRICS_DIR)
+    # the worker was removed from the live ones before this hook
+    metrics_files.compact(METRICS_DIR, server.WORKERS)
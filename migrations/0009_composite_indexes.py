@@ -0,0 +1,23 @@
+"""Composite indexes matching the models' hot lookups."""
+from peewee_moves import Migrator
+from playhouse.migrate import make_index_name
+
+
+INDEXES = (
+    # Task.lookup by name filters on (name, session) and session.tasks on the session
+    ('tasks', ('session', 'name')),
+    # Estimation.lookup filters on (task, user) and task.estimations on the task
+    ('estimations', ('task', 'user')),
+    # organization.sessions, listed by their creation date
+    ('sessions', ('organization_id', 'created_at')),
+)
+
+
+def upgrade(migrator: Migrator):
+    for table, columns in INDEXES:
+        migrator.add_index(table, columns, unique=False)
+
+
+def downgrade(migrator: Migrator):
+    for table, columns in INDEXES:
+        migrator.drop_index(table, make_index_name(table, columns))
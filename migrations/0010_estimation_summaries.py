@@ -0,0 +1,29 @@
+"""Estimation Summary Model migrations."""
+from peewee_moves import Migrator
+
+
+TABLE_NAME = 'estimation_summaries'
+
+
+def upgrade(migrator: Migrator):
+    with migrator.create_table(TABLE_NAME) as table:
+        table.uuid('id', constraints=['PRIMARY KEY'])
+        table.foreign_key('uuid', 'task',
+                          references='tasks.id',
+                          on_delete='CASCADE',
+                          null=False,
+                          unique=True)
+        table.decimal('mean')
+        table.foreign_key('uuid', 'closest_value',
+                          references='estimation_values.id',
+                          on_delete='SET NULL',
+                          null=True)
+        table.bool('everybody_estimated', null=False)
+        table.bool('consensus_met', null=False)
+        table.text('histogram')
+        table.text('payload')
+        table.integer('created_at')
+
+
+def downgrade(migrator: Migrator):
+    migrator.drop_table(TABLE_NAME)
@@ -0,0 +1,27 @@
+"""Task Aggregate Model migrations.
+
+The aggregates of the existing tasks are built on their first estimation,
+or all at once with bin/rebuild-aggregates.
+"""
+from peewee_moves import Migrator
+
+
+TABLE_NAME = 'task_aggregates'
+
+
+def upgrade(migrator: Migrator):
+    with migrator.create_table(TABLE_NAME) as table:
+        table.foreign_key('uuid', 'task',
+                          references='tasks.id',
+                          on_delete='CASCADE',
+                          null=False,
+                          primary_key=True)
+        table.integer('count')
+        table.decimal('numeric_sum', max_digits=20, decimal_places=5)
+        table.integer('non_numeric_count')
+        table.text('value_counts')
+        table.integer('updated_at')
+
+
+def downgrade(migrator: Migrator):
+    migrator.drop_table(TABLE_NAME)
@@ -0,0 +1,340 @@
+"""Generate a large synthetic dataset straight into the database.
+
+    PYTHONPATH=src python seeds/synthetic_seed.py [--database URL] [--seed N]
+        [--organizations N] [--users N] [--sessions N] [--tasks N] [--estimations N] ...
+
+Capacity testing sized dataset:
+
+    PYTHONPATH=src python seeds/synthetic_seed.py --organizations 1000 --users 100000 \\
+        --sessions 20000 --tasks 200000 --estimations 1000000
+
+The rows are written with multi-row inserts, bypassing the API and the models'
+business logic, one transaction per batch. The same seed and options always
+generate the same rows, so a run cannot be repeated against the same database
+(the IDs and emails would clash), use another --seed instead.
+
+The database is the configured MySQL one unless --database is given, e.g.
+sqlite:///seed.db, SQLite tables are created when missing.
+
+Distributions:
+
+* users are spread over the organizations following a Pareto distribution
+  (--org-size-skew, the lower the more skewed), every organization has a user;
+* sessions are spread over the organizations proportionally to their users;
+* every session has between --min-members and --max-members of its organization's users;
+* tasks are spread uniformly over the sessions;
+* every member estimates a task with the probability needed to get about
+  --estimations estimations, voting around the task's "true" value of the
+  sequence with a normal deviation of --vote-spread positions, or a
+  non-numeric value with a --non-numeric-rate probability.
+"""
+import argparse
+import random
+import sys
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from typing import Dict, List, Optional
+from uuid import UUID
+
+import peewee
+from playhouse.db_url import connect
+
+from common.db import database as default_database
+from common.loggers import logger
+from estimations.models import Estimation, Sequence, Session, SessionMember, Task, TaskAggregate, Value
+from organizations.models import Organization
+from users.models import User
+
+
+MODELS = [
+    Organization,
+    User,
+    Sequence,
+    Value,
+    Session,
+    SessionMember,
+    Task,
+    Estimation,
+    TaskAggregate,
+]
+
+# the buffered rows are inserted following the references between them
+BUFFERED = (Session, SessionMember, Task, Estimation, TaskAggregate)
+
+SEQUENCE_NAME = 'Synthetic Fibonacci'
+
+SEQUENCE_VALUES = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+NON_NUMERIC_VALUES = ('?', 'Coffee')
+
+# older SQLite versions limit the variables of a statement to 999
+SQLITE_MAX_VARIABLES = 999
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', help='the database URL, defaults to the configured MySQL database')
+    parser.add_argument('--seed', type=int, default=0, help='the random seed')
+    parser.add_argument('--organizations', type=int, default=10)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--estimations', type=int, default=2000, help='the approximate amount of estimations')
+    parser.add_argument('--org-size-skew', type=float, default=1.2,
+                        help='the alpha of the Pareto distribution of the users per organization')
+    parser.add_argument('--min-members', type=int, default=3)
+    parser.add_argument('--max-members', type=int, default=10)
+    parser.add_argument('--vote-spread', type=float, default=1.0,
+                        help='the standard deviation of the votes, in sequence positions')
+    parser.add_argument('--non-numeric-rate', type=float, default=0.05)
+    parser.add_argument('--completed-rate', type=float, default=0.5, help='the ratio of completed sessions')
+    parser.add_argument('--start', type=datetime.fromisoformat, default=datetime(2020, 1, 1),
+                        help='the date of the oldest sessions')
+    parser.add_argument('--days', type=int, default=365, help='the days the sessions are spread over')
+    parser.add_argument('--batch-size', type=int, default=1000, help='the rows written per multi-row insert')
+    return parser.parse_args(argv)
+
+
+class Generator:
+    """Generates the rows and writes them in batches."""
+
+    def __init__(self, database: peewee.Database, args):
+        self.database = database
+        self.args = args
+        self.random = random.Random(args.seed)
+
+        self.pending: Dict[peewee.ModelBase, List[dict]] = defaultdict(list)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+        self.organization_ids: List[UUID] = list()
+        self.numeric_values: List[Value] = list()
+        self.non_numeric_values: List[Value] = list()
+
+    def uuid(self) -> UUID:
+        return UUID(int=self.random.getrandbits(128), version=4)
+
+    def run(self):
+        self.create_sequence()
+        organization_users = self.create_organizations()
+
+        sessions = self.assign_sessions(organization_users)
+        tasks_per_session = self.spread(self.args.tasks, 0, [1] * len(sessions))
+        members = [self.pick_members(organization_users[organization]) for organization in sessions]
+
+        slots = sum(tasks * len(session_members) for tasks, session_members in zip(tasks_per_session, members))
+        participation = min(1.0, self.args.estimations / slots) if slots else 0.0
+
+        for number, organization in enumerate(sessions):
+            self.create_session(number, organization, members[number], tasks_per_session[number], participation)
+            if number % 1000 == 999:
+                logger.info('%s sessions generated, %s', number + 1, dict(self.counts))
+
+        self.flush()
+        logger.info('Generated %s', dict(self.counts))
+
+    def create_sequence(self):
+        """Create the sequence of the sessions, or reuse it if it exists."""
+        with self.database.atomic():
+            if not Sequence.select().where(Sequence.name == SEQUENCE_NAME).exists():
+                Sequence.insert(name=SEQUENCE_NAME, created_at=self.args.start).execute()
+
+                numeric_ids = [self.uuid() for _ in SEQUENCE_VALUES]
+                rows = [{
+                    'id': value_id,
+                    'sequence': SEQUENCE_NAME,
+                    'name': None,
+                    'value': Decimal(number),
+                    'created_at': self.args.start,
+                } for value_id, number in zip(numeric_ids, SEQUENCE_VALUES)]
+                rows.extend({
+                    'id': self.uuid(),
+                    'sequence': SEQUENCE_NAME,
+                    'name': name,
+                    'value': None,
+                    'created_at': self.args.start,
+                } for name in NON_NUMERIC_VALUES)
+
+                Value.insert_many(rows).execute()
+                # the values are linked once they all exist
+                for index, value_id in enumerate(numeric_ids):
+                    Value.update(previous=numeric_ids[index - 1] if index else None,
+                                 next=numeric_ids[index + 1] if index + 1 < len(numeric_ids) else None) \
+                        .where(Value.id == value_id) \
+                        .execute()
+
+            values = list(Value.select().where(Value.sequence == SEQUENCE_NAME))
+
+        self.numeric_values = sorted((value for value in values if value.value is not None), key=lambda v: v.value)
+        self.non_numeric_values = sorted((value for value in values if value.value is None), key=lambda v: v.name)
+
+    def create_organizations(self) -> List[List[UUID]]:
+        """Create the organizations and their users, returns the user IDs of every organization."""
+        organization_ids = [self.uuid() for _ in range(self.args.organizations)]
+        self.insert(Organization, [{
+            'id': organization_id,
+            'name': f'Organization {self.args.seed}-{number}',
+            'registered_on': self.args.start,
+        } for number, organization_id in enumerate(organization_ids)])
+
+        weights = [self.random.paretovariate(self.args.org_size_skew) for _ in organization_ids]
+        sizes = self.spread(self.args.users, 1, weights)
+
+        organization_users: List[List[UUID]] = list()
+        rows = list()
+        for number, (organization_id, size) in enumerate(zip(organization_ids, sizes)):
+            user_ids = [self.uuid() for _ in range(size)]
+            organization_users.append(user_ids)
+            rows.extend({
+                'id': user_id,
+                'email': f'user-{self.args.seed}-{number}-{index}@example.com',
+                'name': f'User {index}',
+                'password': 'synthetic',
+                'organization': organization_id,
+                'registered_on': self.args.start,
+            } for index, user_id in enumerate(user_ids))
+
+            if len(rows) >= self.args.batch_size:
+                self.insert(User, rows)
+                rows = list()
+        self.insert(User, rows)
+
+        self.organization_ids = organization_ids
+        return organization_users
+
+    def assign_sessions(self, organization_users: List[List[UUID]]) -> List[int]:
+        """Returns the organization index of every session."""
+        weights = [len(user_ids) for user_ids in organization_users]
+        per_organization = self.spread(self.args.sessions, 0, weights)
+        return [organization for organization, amount in enumerate(per_organization) for _ in range(amount)]
+
+    def spread(self, total: int, minimum: int, weights: List[float]) -> List[int]:
+        """Spread the total over the weights, each one gets at least the minimum if the total allows it."""
+        amounts = [minimum if total >= minimum * len(weights) else 0 for _ in weights]
+        cumulative = list(accumulate(weights))
+        for _ in range(total - sum(amounts)):
+            amounts[bisect_left(cumulative, self.random.random() * cumulative[-1])] += 1
+        return amounts
+
+    def pick_members(self, user_ids: List[UUID]) -> List[UUID]:
+        size = self.random.randint(self.args.min_members, self.args.max_members)
+        return self.random.sample(user_ids, min(size, len(user_ids)))
+
+    def create_session(self, number: int, organization: int, members: List[UUID], tasks: int, participation: float):
+        session_id = self.uuid()
+        created_at = self.args.start + timedelta(seconds=self.random.uniform(0, self.args.days * 86400))
+        completed = self.random.random() < self.args.completed_rate
+
+        self.buffer(Session, {
+            'id': session_id,
+            'name': f'Session {number}',
+            'organization': self.organization_ids[organization],
+            'sequence': SEQUENCE_NAME,
+            'completed': completed,
+            'completed_at': created_at + timedelta(days=1) if completed else None,
+            'created_at': created_at,
+        })
+        for user_id in members:
+            self.buffer(SessionMember, {'session': session_id, 'user': user_id})
+
+        for index in range(tasks):
+            task_id = self.uuid()
+            self.buffer(Task, {
+                'id': task_id,
+                'name': f'TASK-{number}-{index}',
+                'session': session_id,
+                'created_at': created_at,
+            })
+            voters = [user_id for user_id in members if self.random.random() < participation]
+            self.create_estimations(task_id, voters, created_at)
+
+    def create_estimations(self, task_id: UUID, voters: List[UUID], created_at: datetime):
+        """Create the estimations of the task and its aggregate."""
+        aggregate = {
+            'task': task_id,
+            'count': 0,
+            'numeric_sum': Decimal(0),
+            'non_numeric_count': 0,
+            'value_counts': dict(),
+            'updated_at': created_at,
+        }
+        true_position = self.random.randrange(len(self.numeric_values))
+
+        for user_id in voters:
+            value = self.vote(true_position)
+            self.buffer(Estimation, {
+                'id': self.uuid(),
+                'task': task_id,
+                'user': user_id,
+                'value': value.id,
+                'created_at': created_at,
+            })
+
+            aggregate['count'] += 1
+            if value.value is None:
+                aggregate['non_numeric_count'] += 1
+            else:
+                aggregate['numeric_sum'] += value.value
+            key = str(value.id)
+            aggregate['value_counts'][key] = aggregate['value_counts'].get(key, 0) + 1
+
+        if voters:
+            self.buffer(TaskAggregate, aggregate)
+
+    def vote(self, true_position: int) -> Value:
+        if self.non_numeric_values and self.random.random() < self.args.non_numeric_rate:
+            return self.random.choice(self.non_numeric_values)
+
+        position = round(self.random.gauss(true_position, self.args.vote_spread))
+        return self.numeric_values[max(0, min(position, len(self.numeric_values) - 1))]
+
+    def buffer(self, model: peewee.ModelBase, row: dict):
+        self.pending[model].append(row)
+        if len(self.pending[model]) >= self.args.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Insert the buffered rows, all of them so the references are already written."""
+        with self.database.atomic():
+            for model in BUFFERED:
+                self.insert(model, self.pending.pop(model, []))
+
+    def insert(self, model: peewee.ModelBase, rows: List[dict]):
+        if not rows:
+            return
+
+        batch_size = self.args.batch_size
+        if isinstance(self.database, peewee.SqliteDatabase):
+            batch_size = min(batch_size, SQLITE_MAX_VARIABLES // len(rows[0]))
+
+        with self.database.atomic():
+            for batch in peewee.chunked(rows, batch_size):
+                model.insert_many(batch).execute()
+        self.counts[model._meta.table_name] += len(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.organizations or args.users < args.organizations:
+        logger.error('There must be organizations and at least a user per organization')
+        return 1
+    if args.min_members > args.max_members:
+        logger.error('--min-members must not be greater than --max-members')
+        return 1
+
+    database = connect(args.database) if args.database else default_database
+    with database.bind_ctx(MODELS):
+        if isinstance(database, peewee.SqliteDatabase):
+            database.pragma('foreign_keys', 1, permanent=True)
+            database.create_tables(MODELS)
+
+        Generator(database, args).run()
+
+    database.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Per-worker admission control.
+
+Every request takes a slot of its budget before anything else, e.g., a
+database connection. When the slots are taken the request waits in a bounded
+queue up to ADMISSION_QUEUE_TIMEOUT seconds, when the queue is full or the
+wait times out the request is shed right away with a 503 and Retry-After, so
+a slow database does not pile up requests until the worker timeout.
+
+The budgets, see settings/app.py:
+
+* light: the cheap reads, health checks and sequences;
+* heavy: the session dumps, summaries, histograms, analytics and exports;
+* standard: everything else.
+"""
+import threading
+from http import HTTPStatus
+from typing import Optional
+
+from flask import Flask, g, jsonify, make_response, request, Response
+
+from settings import app as settings
+
+
+LIGHT_BLUEPRINTS = frozenset({'health_app'})
+
+LIGHT_ENDPOINTS = frozenset({
+    'estimations.get_all_sequences',
+    'estimations.get_sequence',
+})
+
+HEAVY_ENDPOINTS = frozenset({
+    'estimations.get_session',
+    'estimations.get_task_summary',
+    'estimations.get_task_histogram',
+    'estimations.get_session_histograms',
+    'estimations.estimate_many',
+    'organizations.get_organization_analytics',
+    'organizations.export_organization',
+    'organizations.import_organizations',
+})
+
+
+class Budget:
+    """A limit of concurrent requests with a bounded queue of waiting ones, 0 is unlimited."""
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.waiting = 0
+        self._slots = threading.BoundedSemaphore(limit) if limit else None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Take a slot, False if the request must be shed."""
+        if self._slots is None or self._slots.acquire(blocking=False):
+            return True
+
+        with self._lock:
+            if self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+        try:
+            return self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def release(self):
+        if self._slots is not None:
+            self._slots.release()
+
+
+BUDGETS = {
+    'light': Budget('light', settings.ADMISSION_LIGHT_LIMIT, settings.ADMISSION_LIGHT_QUEUE,
+                    settings.ADMISSION_QUEUE_TIMEOUT),
+    'standard': Budget('standard', settings.ADMISSION_STANDARD_LIMIT, settings.ADMISSION_STANDARD_QUEUE,
+                       settings.ADMISSION_QUEUE_TIMEOUT),
+    'heavy': Budget('heavy', settings.ADMISSION_HEAVY_LIMIT, settings.ADMISSION_HEAVY_QUEUE,
+                    settings.ADMISSION_QUEUE_TIMEOUT),
+}
+
+
+def init_app(app: Flask):
+    """Admit the requests of the app, register it before the hooks taking resources."""
+    app.before_request(admit)
+    app.teardown_request(leave)
+
+
+def budget_of(blueprint: Optional[str], endpoint: Optional[str]) -> Budget:
+    if blueprint in LIGHT_BLUEPRINTS or endpoint in LIGHT_ENDPOINTS:
+        return BUDGETS['light']
+    if endpoint in HEAVY_ENDPOINTS:
+        return BUDGETS['heavy']
+    return BUDGETS['standard']
+
+
+def admit() -> Optional[Response]:
+    budget = budget_of(request.blueprint, request.endpoint)
+    if not budget.acquire():
+        response = make_response(jsonify({
+            'message': 'The service is overloaded, retry later',
+        }), HTTPStatus.SERVICE_UNAVAILABLE)
+        response.headers['Retry-After'] = str(settings.ADMISSION_RETRY_AFTER)
+        return response
+
+    g.admission_budget = budget
+    return None
+
+
+def leave(exc: Optional[BaseException]):
+    budget = g.pop('admission_budget', None)
+    if budget is not None:
+        budget.release()
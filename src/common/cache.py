@@ -0,0 +1,269 @@
+"""Cache singleton.
+
+The backend is picked with CACHE_BACKEND:
+
+* memory: a LRU of the worker, lost with it, e.g., every max_requests;
+* shared: a SQLite file in shared memory, shared by the workers of the host;
+* redis: a Redis server, shared by the hosts, needs the redis package.
+
+The entries are invalidated by namespace: the keys are built with the version
+of their namespace, see key(), and the write paths call invalidate() to bump
+it, so the entries computed before are never read again and expire.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from settings import cache as settings
+
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+# get() of a key without value, None can be cached
+MISSING = object()
+
+
+class Cache:
+    """The interface of the backends, the ttl are seconds and None never expires."""
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set the key unless it has a value, True if it was set."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def version(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def invalidate(self, namespace: str) -> int:
+        """Bump the version of the namespace, returns the new one."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def key(self, namespace: str, key: str) -> str:
+        """The key within the current version of the namespace."""
+        return f'{namespace}:{self.version(namespace)}:{key}'
+
+
+class MemoryCache(Cache):
+    """A LRU with expiring entries, within the process."""
+
+    def __init__(self, max_entries: int = settings.MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[Optional[float], Any]]' = OrderedDict()
+        self._versions: Dict[str, int] = dict()
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            expires, value = self._entries.get(key, (None, MISSING))
+            if value is MISSING:
+                return MISSING
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self.get(key) is not MISSING:
+                return False
+            self.set(key, value, ttl)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def version(self, namespace: str) -> int:
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def invalidate(self, namespace: str) -> int:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            return self._versions[namespace]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+class SharedCache(Cache):
+    """A SQLite file shared by the processes of the host, the oldest written entries are evicted.
+
+    Put it in shared memory, e.g., /dev/shm, nothing is synced to a disk. The
+    entries are unpickled, so the file and its directory must be the service's
+    own: the directory is created 0700 and the file 0600, and they are refused
+    when owned by another user or writable by others.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)',
+        'CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires)',
+        'CREATE TABLE IF NOT EXISTS versions (namespace TEXT PRIMARY KEY, version INTEGER NOT NULL)',
+    )
+
+    def __init__(self, path: str = settings.PATH, max_entries: int = settings.MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # a connection per thread, and per process after a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._create()
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode = wal')
+            connection.execute('PRAGMA synchronous = off')
+            connection.execute('PRAGMA mmap_size = 67108864')
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+    def _create(self):
+        """Create the private file, or check the existing one is."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # SQLite would create it following the umask, its -wal and -shm files get its permissions
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600))
+
+        for path in (directory, self.path):
+            status = os.lstat(path)
+            if status.st_uid != os.getuid() or status.st_mode & 0o022:
+                raise PermissionError(f'The cache {path} must be owned by the user {os.getuid()} '
+                                      'and not writable by others')
+
+    def get(self, key: str) -> Any:
+        row = self.connection.execute('SELECT value, expires FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return MISSING
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._transaction():
+            self._write('INSERT OR REPLACE', key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        with self._transaction():
+            self.connection.execute('DELETE FROM entries WHERE key = ? AND expires <= ?', (key, time.time()))
+            return self._write('INSERT OR IGNORE', key, value, ttl) == 1
+
+    @contextmanager
+    def _transaction(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    def _write(self, insert: str, key: str, value: Any, ttl: Optional[float]) -> int:
+        expires = None if ttl is None else time.time() + ttl
+        written = self.connection.execute(f'{insert} INTO entries (key, value, expires) VALUES (?, ?, ?)',
+                                          (key, pickle.dumps(value), expires)).rowcount
+        # every write takes a greater rowid, the oldest written go first
+        self.connection.execute('DELETE FROM entries WHERE expires <= ? OR rowid <= '
+                                '(SELECT MAX(rowid) FROM entries) - ?', (time.time(), self.max_entries))
+        return written
+
+    def delete(self, key: str):
+        self.connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def version(self, namespace: str) -> int:
+        row = self.connection.execute('SELECT version FROM versions WHERE namespace = ?', (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def invalidate(self, namespace: str) -> int:
+        with self._transaction():
+            self.connection.execute('INSERT OR IGNORE INTO versions (namespace, version) VALUES (?, 0)', (namespace,))
+            self.connection.execute('UPDATE versions SET version = version + 1 WHERE namespace = ?', (namespace,))
+            return self.version(namespace)
+
+    def clear(self):
+        with self._transaction():
+            self.connection.execute('DELETE FROM entries')
+            self.connection.execute('DELETE FROM versions')
+
+
+class RedisCache(Cache):
+    """A Redis server, or anything speaking its protocol, through a redis-py client.
+
+    The versions do not expire, use a volatile-* maxmemory-policy so they are not evicted.
+    """
+
+    def __init__(self, client: 'redis.Redis', prefix: str = 'estimations:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Any:
+        value = self.client.get(self.prefix + key)
+        return MISSING if value is None else pickle.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.client.set(self.prefix + key, pickle.dumps(value), px=_milliseconds(ttl))
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return bool(self.client.set(self.prefix + key, pickle.dumps(value), px=_milliseconds(ttl), nx=True))
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def version(self, namespace: str) -> int:
+        return int(self.client.get(f'{self.prefix}{namespace}:version') or 0)
+
+    def invalidate(self, namespace: str) -> int:
+        return self.client.incr(f'{self.prefix}{namespace}:version')
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f'{self.prefix}*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def _milliseconds(ttl: Optional[float]) -> Optional[int]:
+    return None if ttl is None else max(1, int(ttl * 1000))
+
+
+def build_cache() -> Cache:
+    if settings.BACKEND == 'shared':
+        return SharedCache()
+    if settings.BACKEND == 'redis':
+        if redis is None:
+            raise RuntimeError('CACHE_BACKEND=redis needs the redis package')
+        return RedisCache(redis.Redis.from_url(settings.REDIS_URL))
+    return MemoryCache()
+
+
+cache = build_cache()
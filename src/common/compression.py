@@ -0,0 +1,95 @@
+"""Negotiated response compression.
+
+The responses are compressed with the codec preferred by the Accept-Encoding
+of the request among the available ones: br, when the optional brotli package
+is installed, and gzip. Responses smaller than COMPRESSION_MIN_SIZE are sent
+as they are, streamed responses are compressed chunk by chunk.
+"""
+import zlib
+from typing import Callable, Iterable, Iterator, Optional
+
+from flask import Flask, request, Response
+
+from settings import app as settings
+
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/html',
+    'text/plain',
+})
+
+
+def gzip_compressor(level: int = settings.COMPRESSION_LEVEL):
+    # wbits of 16 and over write a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+def brotli_compressor(quality: int = settings.COMPRESSION_BROTLI_QUALITY):
+    compressor = brotli.Compressor(quality=quality)
+    return compressor.process, compressor.finish
+
+
+# the codecs by preference for equal qualities of the client
+CODECS = {'br': brotli_compressor, 'gzip': gzip_compressor} if brotli else {'gzip': gzip_compressor}
+
+
+def init_app(app: Flask):
+    app.after_request(compress)
+
+
+def negotiate() -> Optional[str]:
+    """The codec to use for the request, None for the identity."""
+    return request.accept_encodings.best_match(CODECS)
+
+
+def is_compressible(response: Response) -> bool:
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    return response.mimetype in COMPRESSIBLE_MIMETYPES and 'Content-Encoding' not in response.headers
+
+
+def compress(response: Response) -> Response:
+    if not is_compressible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    codec = negotiate()
+    if codec is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, *CODECS[codec]())
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        process, finish = CODECS[codec]()
+        response.set_data(process(data) + finish())
+
+    response.headers['Content-Encoding'] = codec
+    return response
+
+
+def compress_stream(chunks: Iterable[bytes], process: Callable[[bytes], bytes],
+                    finish: Callable[[], bytes]) -> Iterator[bytes]:
+    try:
+        for chunk in chunks:
+            compressed = process(chunk.encode() if isinstance(chunk, str) else chunk)
+            if compressed:
+                yield compressed
+        yield finish()
+    finally:
+        # e.g., the client went away, the stream must release its context
+        if hasattr(chunks, 'close'):
+            chunks.close()
@@ -1,15 +1,148 @@
-"""Database singleton."""
-from playhouse.pool import PooledMySQLDatabase
+"""Database singleton.
+
+The database is MySQL unless DB_ENGINE=sqlite, the embedded single node mode
+on a SQLite file in WAL mode, see RoutedSqliteDatabase.
+
+When a read replica is configured, the reads of the read-only requests go to
+it, see ReplicaRouting.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import peewee
+from playhouse.pool import PooledMySQLDatabase, PooledSqliteDatabase
+from pymysql.cursors import SSCursor
 
 from settings import db
 
 
-database = PooledMySQLDatabase(db.DATABASE,
+_timing = threading.local()
+
+
+class QueryTiming:
+    """Accumulate the time the current thread spends executing statements, see query_time()."""
+
+    def execute_sql(self, sql, params=None, commit=peewee.SENTINEL):
+        started = time.perf_counter()
+        try:
+            return super().execute_sql(sql, params, commit)
+        finally:
+            _timing.seconds = query_time() + time.perf_counter() - started
+
+
+def query_time() -> float:
+    """The seconds spent executing statements by the current thread since reset_query_time()."""
+    return getattr(_timing, 'seconds', 0.0)
+
+
+def reset_query_time():
+    _timing.seconds = 0.0
+
+
+class ReplicaRouting:
+    """Route the reads to a replica database while in read-only mode.
+
+    Only SELECT statements outside of a transaction of the primary are routed,
+    so the writes and the reads depending on them stay on the primary.
+    The mode is kept per thread, see use_replica().
+    """
+
+    def __init__(self, *args, replica: Optional[peewee.Database] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+        self._routing = threading.local()
+
+    @property
+    def read_only(self) -> bool:
+        return getattr(self._routing, 'read_only', False)
+
+    def use_replica(self, read_only: bool = True):
+        """Enable, or disable, the routing of the reads of the current thread."""
+        self._routing.read_only = read_only
+
+    @contextmanager
+    def primary(self):
+        """Read from the primary within the block."""
+        read_only = self.read_only
+        self.use_replica(False)
+        try:
+            yield self
+        finally:
+            self.use_replica(read_only)
+
+    def for_read(self) -> peewee.Database:
+        """The database the reads go to right now."""
+        if self.replica is not None and self.read_only and not self.in_transaction():
+            return self.replica
+        return self
+
+    def execute_sql(self, sql, params=None, commit=peewee.SENTINEL):
+        target = self.for_read()
+        if target is not self and is_read(sql):
+            return target.execute_sql(sql, params, commit)
+        return super().execute_sql(sql, params, commit)
+
+
+class RoutedMySQLDatabase(QueryTiming, ReplicaRouting, PooledMySQLDatabase):
+    pass
+
+
+class RoutedSqliteDatabase(QueryTiming, ReplicaRouting, PooledSqliteDatabase):
+    """The embedded database, one pooled connection per thread of each worker.
+
+    WAL mode lets the readers go on while a transaction writes. The transactions
+    outside of read-only mode take the write lock as soon as they begin, so
+    concurrent writers wait for it (up to the busy timeout) instead of failing
+    when upgrading a read lock.
+    """
+
+    def begin(self, lock_type=None):
+        if lock_type is None and not self.read_only:
+            lock_type = 'IMMEDIATE'
+        super().begin(lock_type)
+
+
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'wal'),
+    # durable on checkpoints only, a crash can lose the last commits but never corrupts the database
+    ('synchronous', 'normal'),
+    ('foreign_keys', 1),
+    # in KiB when negative
+    ('cache_size', -64 * 1024),
+    ('mmap_size', 256 * 1024 * 1024),
+    ('temp_store', 'memory'),
+)
+
+
+def build_database() -> peewee.Database:
+    if db.ENGINE == 'sqlite':
+        return RoutedSqliteDatabase(db.SQLITE_PATH,
+                                    pragmas=SQLITE_PRAGMAS,
+                                    timeout=db.SQLITE_BUSY_TIMEOUT,
+                                    check_same_thread=False,
+                                    max_connections=db.MAX_CONNECTIONS)
+
+    replica = None
+    if db.REPLICA_HOST:
+        replica = PooledMySQLDatabase(db.DATABASE,
+                                      host=db.REPLICA_HOST,
+                                      port=db.REPLICA_PORT,
+                                      user=db.REPLICA_USER,
+                                      password=db.REPLICA_PASSWORD,
+                                      max_connections=db.MAX_CONNECTIONS)
+
+    return RoutedMySQLDatabase(db.DATABASE,
                                host=db.HOST,
                                port=db.PORT,
                                user=db.USER,
                                password=db.PASSWORD,
-                               max_connections=5)
+                               max_connections=db.MAX_CONNECTIONS,
+                               replica=replica)
+
+
+database = build_database()
 
 
 def connect(*args, **kwargs):
@@ -22,3 +155,60 @@ def close(*args, **kwargs):
 
     if database and not database.is_closed():
         database.close()
+
+    replica_database = getattr(database, 'replica', None)
+    if replica_database and not replica_database.is_closed():
+        replica_database.close()
+
+
+def is_read(sql: str) -> bool:
+    statement = sql.lstrip().upper()
+    return statement.startswith('SELECT') and 'FOR UPDATE' not in statement
+
+
+@contextmanager
+def reading_primary(query_database: peewee.Database):
+    """Read from the primary within the block, see ReplicaRouting.primary()."""
+    if isinstance(query_database, ReplicaRouting):
+        with query_database.primary():
+            yield
+    else:
+        yield
+
+
+def reader(query_database: peewee.Database) -> peewee.Database:
+    """The database the reads of the given one go to right now."""
+    if isinstance(query_database, ReplicaRouting):
+        return query_database.for_read()
+    return query_database
+
+
+def stream(query: peewee.SelectBase, batch_size: int = 1000) -> Iterator[tuple]:
+    """Yield the rows of the query as tuples without loading the whole result in memory.
+
+    MySQL reads the rows through a server-side cursor, no other query can run on
+    the connection until the rows are consumed. Other databases use their default cursor.
+    The selected fields are converted to their python values like .tuples() does.
+    """
+    query_database = reader(query.model._meta.database)
+    sql, params = query.sql()
+    converters = [column.python_value if isinstance(column, peewee.Field) else None
+                  for column in query._returning]
+
+    connection = query_database.connection()
+    if isinstance(query_database, peewee.MySQLDatabase):
+        cursor = connection.cursor(SSCursor)
+    else:
+        cursor = connection.cursor()
+
+    try:
+        cursor.execute(sql, params or ())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield tuple(value if converter is None else converter(value)
+                            for converter, value in zip(converters, row))
+    finally:
+        cursor.close()
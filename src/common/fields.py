@@ -0,0 +1,21 @@
+"""Custom model fields."""
+import json
+
+import peewee
+
+
+class JSONField(peewee.TextField):
+    """Stores JSON serializable values as text.
+
+    Values that JSON can not serialize (e.g., UUID or Decimal) are stored as strings.
+    """
+
+    def db_value(self, value):
+        if value is None:
+            return None
+        return json.dumps(value, default=str)
+
+    def python_value(self, value):
+        if value is None:
+            return None
+        return json.loads(value)
@@ -0,0 +1,103 @@
+"""Request scoped identity map.
+
+Within a scope, see start(), the instances looked up by their primary key are
+kept, so looking up the same row again, including through the lazy accessors
+of MappedForeignKeyField, returns the same instance instead of querying it.
+Outside of a scope nothing is kept.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import peewee
+
+
+_state = threading.local()
+
+
+def start():
+    """Open the scope of the current thread, dropping any instance kept."""
+    _state.instances = dict()
+
+
+def clear():
+    """Close the scope of the current thread."""
+    _state.instances = None
+
+
+@contextmanager
+def scope():
+    previous = _instances()
+    start()
+    try:
+        yield
+    finally:
+        _state.instances = previous
+
+
+def get(model: peewee.ModelBase, identifier: Any) -> Optional[peewee.Model]:
+    """Return the kept instance of the model with the primary key, if any."""
+    instances = _instances()
+    if instances is None or identifier is None:
+        return None
+
+    key = _key(model, identifier)
+    return instances.get(key) if key else None
+
+
+def add(instance: peewee.Model) -> peewee.Model:
+    """Keep the instance while in scope, returns it."""
+    instances = _instances()
+    if instances is not None:
+        key = _key(type(instance), instance._pk)
+        if key:
+            instances[key] = instance
+    return instance
+
+
+def discard(instance: peewee.Model):
+    instances = _instances()
+    if instances is not None:
+        instances.pop(_key(type(instance), instance._pk), None)
+
+
+def _instances() -> Optional[Dict[Tuple[peewee.ModelBase, Any], peewee.Model]]:
+    return getattr(_state, 'instances', None)
+
+
+def _key(model: peewee.ModelBase, identifier: Any) -> Optional[Tuple[peewee.ModelBase, Any]]:
+    # e.g., str and UUID identifiers of the same row share the key
+    try:
+        return model, model._meta.primary_key.python_value(identifier)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class IdentityMapped:
+    """Model mixin forgetting the deleted instances."""
+
+    def delete_instance(self, *args, **kwargs):
+        discard(self)
+        return super().delete_instance(*args, **kwargs)
+
+
+class MappedForeignKeyAccessor(peewee.ForeignKeyAccessor):
+
+    def get_rel_instance(self, instance):
+        loaded = self.name in instance.__rel__
+        if not loaded and self.field.rel_field is self.rel_model._meta.primary_key:
+            related = get(self.rel_model, instance.__data__.get(self.name))
+            if related is not None:
+                instance.__rel__[self.name] = related
+                return related
+
+        related = super().get_rel_instance(instance)
+        if not loaded and isinstance(related, peewee.Model):
+            add(related)
+        return related
+
+
+class MappedForeignKeyField(peewee.ForeignKeyField):
+    """Foreign key whose lazy accessor goes through the identity map."""
+
+    accessor_class = MappedForeignKeyAccessor
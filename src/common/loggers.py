@@ -1,15 +1,133 @@
+"""Application logging.
+
+The records are put on a queue and written to stdout by a background thread,
+so a slow stdout pipe does not block the request threads. The messages take
+%-style arguments, formatted only when the record is going to be written:
+
+    logger.error('No root value, can not sort in %s', values)
+
+Settings, see settings/app.py: LOG_LEVEL, LOG_FORMAT (text or json),
+LOG_QUEUE_SIZE and LOG_DEBUG_SAMPLE_RATE, the share of debug records written,
+e.g., peewee's statements with LOG_LEVEL=DEBUG.
+"""
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
 import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+
+from settings import app as settings
 
 
 logger = logging.getLogger(__name__)
 
-logger.setLevel(logging.INFO)
+# the loggers written through the queue
+LOGGERS = (logger, logging.getLogger('peewee'))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# the attributes of every record, anything else was given as extra
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """Format the records as a JSON object per line, including their extra attributes."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        payload.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Let through only a share of the debug records."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue the records without ever waiting, the records of a full queue are dropped and counted."""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the arguments could change before the writer gets to them, the rest is formatted by the writer
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class QueueWriter(QueueListener):
+    """Write the queued records to the handlers, in a background thread."""
+
+    def enqueue_sentinel(self):
+        # wait for room, the records queued before stopping are written
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[QueueWriter] = None
+
+
+def install(stream: TextIO = sys.stdout,
+            level: str = settings.LOG_LEVEL,
+            log_format: str = settings.LOG_FORMAT,
+            sample_rate: float = settings.LOG_DEBUG_SAMPLE_RATE,
+            queue_size: int = settings.LOG_QUEUE_SIZE) -> NonBlockingQueueHandler:
+    """Write LOGGERS to the stream through a queue, replacing the handler installed before."""
+    uninstall()
+
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JSONFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(DebugSampler(sample_rate))
+    for target in LOGGERS:
+        target.setLevel(level)
+        target.addHandler(handler)
+
+    global _listener
+    _listener = QueueWriter(handler.queue, stream_handler)
+    _listener.start()
+    return handler
+
+
+def uninstall():
+    """Stop the writer once it wrote the queued records."""
+    global _listener
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for target in LOGGERS:
+        for handler in list(target.handlers):
+            if isinstance(handler, NonBlockingQueueHandler):
+                target.removeHandler(handler)
+    _listener = None
 
-handler = logging.StreamHandler(sys.stdout)
-handler.setLevel(logging.INFO)
 
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
+install()
 
-logger.addHandler(handler)
+atexit.register(uninstall)
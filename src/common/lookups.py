@@ -0,0 +1,64 @@
+"""Cached lookups by primary key.
+
+The rows looked up on most requests and rarely changed, e.g., the users and
+organizations, are kept in the cache for LOOKUP_TTL seconds, see
+common/cache.py. Only the given fields are cached, e.g., never the
+passwords, every lookup gets its own instance of them. The write paths
+changing the rows must call invalidate() once done, it bumps the version of
+the row. With the memory backend the other workers are not invalidated, they
+read the row stale for up to LOOKUP_TTL seconds, so it is disabled there
+unless CACHE_LOOKUP_TTL is set.
+
+The hits and misses are counted per model in model_lookups_total.
+"""
+from typing import Any, Callable, Iterable, Optional
+
+import peewee
+from prometheus_client import Counter
+
+from common.cache import cache, MISSING
+from common.db import reader
+from settings import cache as settings
+
+
+LOOKUPS = Counter('model_lookups_total', 'Cached lookups by model and result', ('model', 'result'))
+
+
+def lookup(model: peewee.ModelBase, identifier: Any, fetch: Callable[[], peewee.Model],
+           fields: Iterable[peewee.Field]) -> peewee.Model:
+    """Return a new instance of the cached fields of the model's row with the primary key, or fetch it."""
+    namespace = _namespace(model, identifier)
+    if namespace is None or not settings.LOOKUP_TTL:
+        return fetch()
+
+    # the key of the version before fetching, a row fetched while written is never read
+    key = cache.key(namespace, 'row')
+    data = cache.get(key)
+    LOOKUPS.labels(model.__name__, 'miss' if data is MISSING else 'hit').inc()
+    if data is not MISSING:
+        instance = model(__no_default__=1, **data)
+        instance._dirty.clear()
+        return instance
+
+    model_database = model._meta.database
+    instance = fetch()
+    # a lagging replica would keep the row stale after the writes invalidated it
+    if reader(model_database) is model_database:
+        data = {field.name: instance.__data__.get(field.name) for field in fields}
+        cache.set(key, data, ttl=settings.LOOKUP_TTL)
+    return instance
+
+
+def invalidate(model: peewee.ModelBase, identifier: Any):
+    namespace = _namespace(model, identifier)
+    if namespace is not None:
+        cache.invalidate(namespace)
+
+
+def _namespace(model: peewee.ModelBase, identifier: Any) -> Optional[str]:
+    # e.g., str and UUID identifiers of the same row share the namespace
+    try:
+        identifier = model._meta.primary_key.python_value(identifier)
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return None if identifier is None else f'lookups:{model._meta.table_name}:{identifier}'
@@ -0,0 +1,84 @@
+"""Request metrics in the Prometheus format.
+
+Every request is recorded per blueprint and endpoint (the Flask view name):
+its latency, its status, the time it spent executing statements and the
+requests in flight.
+
+Under gunicorn every worker writes its metrics to memory-mapped files in
+METRICS_DIR and the exposition aggregates all of them, see common.metrics_files
+for the compaction of the dead workers' files. The directory must be set in the
+environment before this module is imported.
+"""
+import fcntl
+import time
+from typing import Optional
+
+from flask import Flask, g, request, Response
+from prometheus_client import (
+    CollectorRegistry,
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    generate_latest,
+    Histogram,
+    multiprocess,
+    REGISTRY,
+)
+
+from common import db, metrics_files
+from settings import app as settings
+
+
+LABELS = ('blueprint', 'endpoint', 'method')
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Request latency', LABELS)
+
+REQUEST_DB_DURATION = Histogram('http_request_db_duration_seconds', 'Time spent executing statements per request',
+                                LABELS)
+
+REQUESTS = Counter('http_requests_total', 'Requests by status', LABELS + ('status',))
+
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests being served', multiprocess_mode='livesum')
+
+
+def init_app(app: Flask):
+    """Record the requests of the app, register it before any other request hook."""
+    app.before_request(start_request)
+    app.after_request(record_status)
+    app.teardown_request(finish_request)
+
+
+def start_request():
+    g.metrics_started = time.perf_counter()
+    db.reset_query_time()
+    IN_FLIGHT.inc()
+
+
+def record_status(response: Response) -> Response:
+    g.metrics_status = response.status_code
+    return response
+
+
+def finish_request(exc: Optional[BaseException]):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return
+
+    IN_FLIGHT.dec()
+    labels = (request.blueprint or 'app', request.endpoint or 'unmatched', request.method)
+    REQUEST_DURATION.labels(*labels).observe(time.perf_counter() - started)
+    REQUEST_DB_DURATION.labels(*labels).observe(db.query_time())
+    REQUESTS.labels(*labels, str(g.pop('metrics_status', 500))).inc()
+
+
+def exposition() -> Response:
+    """The metrics of all the workers in the Prometheus text format."""
+    if not settings.METRICS_DIR:
+        return Response(generate_latest(REGISTRY), mimetype=CONTENT_TYPE_LATEST)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=settings.METRICS_DIR)
+    # the files are not compacted while they are read
+    with metrics_files.locked(settings.METRICS_DIR, fcntl.LOCK_SH):
+        content = generate_latest(registry)
+    return Response(content, mimetype=CONTENT_TYPE_LATEST)
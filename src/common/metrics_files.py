@@ -0,0 +1,75 @@
+"""The metrics files shared by the gunicorn workers.
+
+prometheus_client writes the counters and histograms of every worker to its
+own files in METRICS_DIR, named after its pid, and they stay there once the
+worker exits, e.g., recycled every max_requests. compact() merges the files
+of the dead workers into an archive file per type, so the directory holds
+the files of the live workers and the archives only, and the exposition
+merges as many files.
+
+The exposition reads the files holding the shared lock and the compaction
+merges them holding the exclusive one, so a scrape never reads a worker's
+values twice or misses them. This module does not import the app, gunicorn's
+master process compacts the files, see conf/app_conf.py.
+"""
+import fcntl
+import glob
+import os
+import re
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from prometheus_client.mmap_dict import MmapedDict
+
+
+# the types whose values of the dead workers still count, the live gauges are removed with their worker
+MERGED_TYPES = ('counter', 'histogram', 'summary')
+
+ARCHIVE = 'archive'
+
+LOCK_NAME = 'metrics.lock'
+
+_WORKER_FILE = re.compile(r'^(?P<type>[a-z]+)_(?P<pid>\d+)\.db$')
+
+
+@contextmanager
+def locked(path: str, operation: int) -> Iterator[None]:
+    """Hold the lock of the metrics directory, raises BlockingIOError with LOCK_NB if it is taken."""
+    descriptor = os.open(os.path.join(path, LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(descriptor, operation)
+        yield
+    finally:
+        os.close(descriptor)
+
+
+def compact(path: str, live_pids: Iterable[int]) -> int:
+    """Merge the files of the workers not alive into the archives, returns the files merged.
+
+    Nothing is merged while an exposition reads the files, the next call merges them.
+    """
+    live_pids = set(live_pids)
+    try:
+        with locked(path, fcntl.LOCK_EX | fcntl.LOCK_NB):
+            merged = 0
+            for filename in sorted(glob.glob(os.path.join(path, '*.db'))):
+                match = _WORKER_FILE.match(os.path.basename(filename))
+                if not match or match['type'] not in MERGED_TYPES or int(match['pid']) in live_pids:
+                    continue
+
+                merge(filename, os.path.join(path, f'{match["type"]}_{ARCHIVE}.db'))
+                os.remove(filename)
+                merged += 1
+            return merged
+    except BlockingIOError:
+        return 0
+
+
+def merge(filename: str, archive_filename: str):
+    """Add the values of the file to the ones of the archive."""
+    archive = MmapedDict(archive_filename)
+    try:
+        for key, value, _ in MmapedDict.read_all_values_from_file(filename):
+            archive.write_value(key, archive.read_value(key) + value)
+    finally:
+        archive.close()
@@ -0,0 +1,27 @@
+"""Migrations manager, see bin/migrate and bin/revert."""
+from contextlib import contextmanager
+
+import peewee
+from peewee_moves import DatabaseManager, Migrator
+
+
+class PortableMigrator(Migrator):
+    """Names the indexes of the created tables after the table.
+
+    peewee_moves names them after its fake model (e.g., fakemodel_name), which
+    MySQL allows since its index names are scoped per table, but SQLite does not.
+    """
+
+    @contextmanager
+    def create_table(self, name, safe=False):
+        with super().create_table(name, safe=safe) as creator:
+            creator.model._meta.legacy_table_names = False
+            yield creator
+
+
+def manager(database: peewee.Database, directory: str = 'migrations') -> DatabaseManager:
+    migrations = DatabaseManager(database, directory=directory)
+    # the existing MySQL schemas keep their index names
+    if isinstance(database, peewee.SqliteDatabase):
+        migrations.migrator = PortableMigrator(database)
+    return migrations
@@ -0,0 +1,83 @@
+"""On-demand profiling of single requests.
+
+A request is run under cProfile when it carries the PROFILE_SECRET, in the
+X-Profile header or the profile query parameter, or when it is one in
+PROFILE_SAMPLE_EVERY requests. The profile is written to PROFILE_DIR, to be
+read with pstats or snakeviz, and the functions with the highest cumulative
+time are summarized in the X-Profile-Summary response header.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import pstats
+import time
+import uuid
+from typing import Optional
+
+from flask import Flask, g, request, Response
+
+from settings import app as settings
+
+
+HEADER = 'X-Profile'
+
+QUERY_PARAMETER = 'profile'
+
+_requests = itertools.count(1)
+
+
+def init_app(app: Flask):
+    app.before_request(start_profile)
+    app.after_request(write_profile)
+    app.teardown_request(stop_profile)
+
+
+def is_requested() -> bool:
+    if settings.PROFILE_SAMPLE_EVERY and next(_requests) % settings.PROFILE_SAMPLE_EVERY == 0:
+        return True
+
+    secret = request.headers.get(HEADER) or request.args.get(QUERY_PARAMETER)
+    if not settings.PROFILE_SECRET or not secret:
+        return False
+    return hmac.compare_digest(secret.encode(), settings.PROFILE_SECRET.encode())
+
+
+def start_profile():
+    if is_requested():
+        g.profile = cProfile.Profile()
+        g.profile.enable()
+
+
+def write_profile(response: Response) -> Response:
+    profile = stop_profile()
+    if profile is None:
+        return response
+
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = f'{time.strftime("%Y%m%dT%H%M%S")}-{request.endpoint or "unmatched"}-{uuid.uuid4().hex[:8]}.prof'
+    profile.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+
+    response.headers['X-Profile-File'] = name
+    response.headers['X-Profile-Summary'] = summary(profile)
+    return response
+
+
+def stop_profile(exc: Optional[BaseException] = None) -> Optional[cProfile.Profile]:
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.disable()
+    return profile
+
+
+def summary(profile: cProfile.Profile, top: int = settings.PROFILE_TOP) -> str:
+    """The functions with the highest cumulative time, e.g., get_session (estimations.py:92) 12.30ms, ..."""
+    stats = pstats.Stats(profile)
+    stats.sort_stats('cumulative')
+
+    functions = list()
+    for function in stats.fcn_list[:top]:
+        filename, line, name = function
+        cumulative = stats.stats[function][3]
+        functions.append(f'{name} ({os.path.basename(filename)}:{line}) {cumulative * 1000:.2f}ms')
+    return ', '.join(functions)
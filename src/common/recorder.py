@@ -0,0 +1,164 @@
+"""Request recorder.
+
+With RECORD_PATH set every request is appended to the file as a JSON line, to
+be replayed against another build with benchmarks/replay.py:
+
+    {"at": 1571130000.123, "method": "POST", "path": "/organizations/", "query": "",
+     "endpoint": "organizations.create_organization", "headers": {"Accept-Encoding": "gzip"},
+     "body": {"name": "Team"}, "status": 201, "duration": 0.0042, "ids": ["8f0c..."]}
+
+The records are sanitized: the values of the keys of the JSON bodies and query
+strings containing a SENSITIVE word, e.g., new_password or api_key, are masked,
+the PERSONAL ones, e.g., the emails and the users' names, are replaced by their
+hash keyed with RECORD_KEY, and only the HEADERS are kept. Only JSON bodies
+are recorded, e.g., the streamed NDJSON imports are recorded without theirs.
+The IDs of the JSON responses of the writes are kept in the order of ids(), so
+the replay can map the recorded IDs to the ones it creates.
+
+The lines are written with a single append each, the workers can share the file.
+"""
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+from urllib.parse import urlencode
+
+from flask import Flask, g, request, Response
+
+from common.loggers import logger
+from settings import app as settings
+
+
+# the keys containing any of these are masked, compared lowercase
+SENSITIVE = ('password', 'passwd', 'secret', 'token', 'api_key', 'apikey', 'credential', 'authorization', 'profile')
+
+# the keys containing any of these are hashed, compared lowercase, and the ones within the users' requests
+PERSONAL = ('email',)
+
+USER_PERSONAL = ('name',)
+
+MASK = '***'
+
+# the request headers recorded, the rest can carry credentials
+HEADERS = ('Accept', 'Accept-Encoding')
+
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_files: Dict[Tuple[str, int], int] = dict()
+
+_lock = threading.Lock()
+
+
+def init_app(app: Flask):
+    """Record the requests of the app, register it before the hooks that can answer them, e.g., admission."""
+    app.before_request(start_record)
+    app.after_request(write_record)
+
+
+def start_record():
+    if settings.RECORD_PATH:
+        g.record_at, g.record_started = time.time(), time.perf_counter()
+
+
+def write_record(response: Response) -> Response:
+    started = g.pop('record_started', None)
+    if started is None:
+        return response
+
+    try:
+        append(settings.RECORD_PATH, record(response, g.pop('record_at'), time.perf_counter() - started))
+    except (OSError, TypeError, ValueError):
+        logger.exception('Could not record %s %s', request.method, request.path)
+    return response
+
+
+def record(response: Response, at: float, duration: float) -> dict:
+    personal = PERSONAL + USER_PERSONAL if request.blueprint == 'users' else PERSONAL
+    data = {
+        'at': round(at, 6),
+        'method': request.method,
+        'path': request.path,
+        'query': urlencode([(key, scrub(key, value, personal)) for key, value in request.args.items(multi=True)]),
+        'endpoint': request.endpoint,
+        'headers': {header: request.headers[header] for header in HEADERS if header in request.headers},
+        'status': response.status_code,
+        'duration': round(duration, 6),
+    }
+
+    if request.is_json:
+        data['body'] = sanitize(request.get_json(silent=True), personal)
+
+    if request.method not in READ_ONLY_METHODS and response.is_json and not response.is_streamed:
+        data['ids'] = list(ids(response.get_json(silent=True)))
+
+    return data
+
+
+def append(path: str, data: dict):
+    line = (json.dumps(data, separators=(',', ':'), default=str) + '\n').encode()
+    os.write(_file(path), line)
+
+
+def _file(path: str) -> int:
+    # a descriptor per process, the appends of a single write do not interleave
+    key = (path, os.getpid())
+    with _lock:
+        if key not in _files:
+            _files[key] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        return _files[key]
+
+
+def scrub(key: str, value: Any, personal: Sequence[str] = PERSONAL) -> Any:
+    """The value of the key, masked if the key is sensitive or hashed if it is personal."""
+    key = key.lower()
+    if value is None:
+        return value
+    if any(word in key for word in SENSITIVE):
+        return MASK
+    if isinstance(value, str) and any(word in key for word in personal):
+        return pseudonym(key, value)
+    return value
+
+
+def pseudonym(key: str, value: str) -> str:
+    """The keyed hash of the value, the emails stay valid and unique ones for the replay."""
+    digest = hmac.new(settings.RECORD_KEY.encode(), value.encode(), hashlib.sha256).hexdigest()[:20]
+    return f'{digest}@example.com' if 'email' in key else digest
+
+
+def sanitize(payload: Any, personal: Sequence[str] = PERSONAL) -> Any:
+    """The payload with the values of the SENSITIVE and personal keys scrubbed, at any depth."""
+    if isinstance(payload, dict):
+        return {key: scrub(key, sanitize(value, personal), personal) for key, value in payload.items()}
+    if isinstance(payload, list):
+        return [sanitize(item, personal) for item in payload]
+    return payload
+
+
+def ids(payload: Any) -> Iterator[str]:
+    """The values of the id keys of the payload, depth first in the order of the keys."""
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            if key == 'id' and isinstance(value, str):
+                yield value
+            else:
+                yield from ids(value)
+    elif isinstance(payload, list):
+        for item in payload:
+            yield from ids(item)
+
+
+def read(path: str) -> List[dict]:
+    """The records of the file, in order, skipping the lines that can not be parsed."""
+    records: List[dict] = list()
+    with open(path) as lines:
+        for number, line in enumerate(lines, start=1):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning('Skipping the line %d of %s, it is not JSON', number, path)
+    return records
+
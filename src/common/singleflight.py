@@ -0,0 +1,112 @@
+"""Request coalescing.
+
+Concurrent identical requests share a single computation: the first one
+computes the result while the others wait for it, see coalesce(). The
+requests are identical when they have the same method, path and query, and
+version: a counter of the data the result is computed from, bumped on its
+changes, so a request arriving after a change never gets a result computed
+before it.
+
+With SINGLEFLIGHT_SHARED the workers sharing the cache coalesce too, see
+common/cache.py: the leader takes a lease on the key in the cache and leaves
+the result there for the followers of the other workers.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from flask import request
+
+from common.cache import Cache, cache, MISSING
+from settings import app as settings
+
+
+# the seconds the followers of the other workers have to read the result
+RESULT_TTL = 1
+
+# the seconds between the checks of the followers of the other workers
+POLL_INTERVAL = 0.005
+
+
+class Flight:
+    """A computation in progress, with its result once done."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class Group:
+    """Coalesce the computations of the same key within the process, and across them with a shared cache."""
+
+    def __init__(self, shared: Optional[Cache] = None, timeout: float = 10):
+        self.shared = shared
+        self.timeout = timeout
+        self._flights: Dict[Tuple[str, Hashable], Flight] = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key: str, compute: Callable[[], Any], version: Hashable = None) -> Any:
+        with self._lock:
+            flight = self._flights.get((key, version))
+            leading = flight is None
+            if leading:
+                flight = self._flights[(key, version)] = Flight()
+            else:
+                flight.followers += 1
+
+        if not leading:
+            if flight.done.wait(self.timeout):
+                return flight.outcome()
+            # the leader is stuck, do not pile up behind it
+            return compute()
+
+        try:
+            flight.result = self._shared(key, compute, version) if self.shared else compute()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                del self._flights[(key, version)]
+            flight.done.set()
+        return flight.outcome()
+
+    def _shared(self, key: str, compute: Callable[[], Any], version: Hashable) -> Any:
+        lease, result = f'singleflight:{key}:{version}:lease', f'singleflight:{key}:{version}:result'
+        if self.shared.add(lease, True, ttl=self.timeout):
+            try:
+                value = compute()
+                self.shared.set(result, value, ttl=RESULT_TTL)
+                return value
+            finally:
+                self.shared.delete(lease)
+
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            value = self.shared.get(result)
+            if value is not MISSING:
+                return value
+            if self.shared.get(lease) is MISSING:
+                # the result is set before the lease is released, unless the leader failed
+                value = self.shared.get(result)
+                return compute() if value is MISSING else value
+            time.sleep(POLL_INTERVAL)
+        return compute()
+
+
+group = Group(cache if settings.SINGLEFLIGHT_SHARED else None, settings.SINGLEFLIGHT_TIMEOUT)
+
+
+def coalesce(compute: Callable[[], Any], version: Hashable = None) -> Any:
+    """Compute the result of the request, sharing it with the identical requests in flight.
+
+    The results are shared, they must not be changed, and must be picklable
+    with SINGLEFLIGHT_SHARED.
+    """
+    return group.do(f'{request.method} {request.full_path}', compute, version)
@@ -0,0 +1,187 @@
+"""Organization level estimation analytics.
+
+All the estimations of the organization's sessions are pulled as flat columns
+with a single streamed query. The rows come ordered by session and task, so the
+statistics of every task are computed in a Python pass over its contiguous
+slice of the columns, without a query per session or task.
+
+The reports are cached per organization until a session of it changes, see
+invalidate(), or until ANALYTICS_CACHE_TTL seconds passed. Only the shared
+cache backends invalidate every worker, with the memory one the reports are
+not cached unless ANALYTICS_CACHE_TTL is set.
+"""
+import math
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import peewee
+
+from common.cache import cache, MISSING
+from common.db import reading_primary
+from settings import app as settings
+
+from .models import Estimation, Session, Task, Value
+
+
+class Columns:
+    """The estimations of an organization as flat columns, one row per estimation.
+
+    Tasks without estimations and sessions without tasks get a single row
+    with an empty value (and task).
+    """
+
+    def __init__(self):
+        self.session_ids: List[UUID] = list()
+        self.task_ids: List[Optional[UUID]] = list()
+        self.value_ids: List[Optional[UUID]] = list()
+        # NaN for the non-numeric or missing values
+        self.numbers = array('d')
+
+        self.sessions: Dict[UUID, dict] = dict()
+        self.task_names: Dict[UUID, str] = dict()
+
+    def __len__(self):
+        return len(self.session_ids)
+
+    @classmethod
+    def fetch(cls, organization_id: UUID) -> 'Columns':
+        query = (Session
+                 .select(Session.id, Session.name, Session.completed, Session.created_at,
+                         Task.id, Task.name, Estimation.value, Value.value)
+                 .join(Task, peewee.JOIN.LEFT_OUTER)
+                 .join(Estimation, peewee.JOIN.LEFT_OUTER)
+                 .join(Value, peewee.JOIN.LEFT_OUTER)
+                 .where(Session.organization == organization_id)
+                 .order_by(Session.created_at, Session.id, Task.id)
+                 .tuples())
+
+        columns = cls()
+        for session_id, name, completed, created_at, task_id, task_name, value_id, number in query.iterator():
+            if session_id not in columns.sessions:
+                columns.sessions[session_id] = {
+                    'id': str(session_id),
+                    'name': name,
+                    'completed': completed,
+                    'created_at': created_at.isoformat(),
+                }
+            if task_id is not None:
+                columns.task_names[task_id] = task_name
+
+            columns.session_ids.append(session_id)
+            columns.task_ids.append(task_id)
+            columns.value_ids.append(value_id)
+            columns.numbers.append(math.nan if number is None else float(number))
+
+        return columns
+
+
+def organization_analytics(organization_id: UUID) -> dict:
+    """Return the organization's analytics report, from the cache when possible."""
+    if not settings.ANALYTICS_CACHE_TTL:
+        return compute(organization_id)
+
+    # a session changing while computing bumps the version, the report is kept for the previous one
+    key = cache.key(namespace(organization_id), 'analytics')
+    report = cache.get(key)
+    if report is not MISSING:
+        return report
+
+    # the report is cached, a lagging replica would keep it stale
+    with reading_primary(Session._meta.database):
+        report = compute(organization_id)
+
+    cache.set(key, report, ttl=settings.ANALYTICS_CACHE_TTL)
+    return report
+
+
+def namespace(organization_id: UUID) -> str:
+    """The cache namespace of the organization's sessions."""
+    return f'organizations:{organization_id}:sessions'
+
+
+def generation(organization_id: UUID) -> int:
+    """Count the changes of the organization's sessions, see invalidate()."""
+    return cache.version(namespace(organization_id))
+
+
+def invalidate(organization_id: UUID):
+    """Invalidate the cached results of the organization, call it after changing any of its sessions."""
+    cache.invalidate(namespace(organization_id))
+
+
+def compute(organization_id: UUID) -> dict:
+    """Compute the analytics report of the organization."""
+    columns = Columns.fetch(organization_id)
+
+    sessions = [session_statistics(columns, start, end) for start, end in runs(columns.session_ids, 0, len(columns))]
+    tasks = [task for session in sessions for task in session['tasks']]
+
+    return {
+        'organization': {'id': str(organization_id)},
+        'totals': totals(tasks, sessions=len(sessions)),
+        'sessions': sessions,
+    }
+
+
+def session_statistics(columns: Columns, start: int, end: int) -> dict:
+    """The statistics of the session held in the given rows."""
+    tasks = [task_statistics(columns, task_start, task_end)
+             for task_start, task_end in runs(columns.task_ids, start, end)
+             if columns.task_ids[task_start] is not None]
+
+    data = dict(columns.sessions[columns.session_ids[start]])
+    data['totals'] = totals(tasks)
+    data['tasks'] = tasks
+    return data
+
+
+def task_statistics(columns: Columns, start: int, end: int) -> dict:
+    """The statistics of the task held in the given rows."""
+    task_id = columns.task_ids[start]
+    value_ids = [value_id for value_id in columns.value_ids[start:end] if value_id is not None]
+    numbers = [number for number in columns.numbers[start:end] if not math.isnan(number)]
+
+    mean = variance = spread = 0.0
+    if numbers:
+        mean = math.fsum(numbers) / len(numbers)
+        variance = math.fsum((number - mean) ** 2 for number in numbers) / len(numbers)
+        spread = max(numbers) - min(numbers)
+
+    return {
+        'id': str(task_id),
+        'name': columns.task_names[task_id],
+        'estimations': len(value_ids),
+        'non_numeric_estimations': len(value_ids) - len(numbers),
+        'mean': mean,
+        'variance': variance,
+        'spread': spread,
+        'consensus_met': len(set(value_ids)) == 1,
+    }
+
+
+def totals(tasks: List[dict], **extra) -> dict:
+    """Aggregate the statistics of the tasks."""
+    estimated = [task for task in tasks if task['estimations']]
+    numeric = [task for task in estimated if task['estimations'] > task['non_numeric_estimations']]
+    consensus = [task for task in estimated if task['consensus_met']]
+
+    data = dict(extra)
+    data.update({
+        'tasks': len(tasks),
+        'estimated_tasks': len(estimated),
+        'estimations': sum(task['estimations'] for task in tasks),
+        'points': math.fsum(task['mean'] for task in numeric),
+        'consensus_rate': len(consensus) / len(estimated) if estimated else 0.0,
+        'mean_variance': math.fsum(task['variance'] for task in numeric) / len(numeric) if numeric else 0.0,
+    })
+    return data
+
+
+def runs(keys: List, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """Yield the (start, end) bounds of the contiguous equal keys within the given bounds."""
+    run_start = start
+    for index in range(start + 1, end + 1):
+        if index == end or keys[index] != keys[run_start]:
+            yield run_start, index
+            run_start = index
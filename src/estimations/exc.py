@@ -30,11 +30,25 @@ class EmptyIdentifier(InvalidRequest):
     """Empty identifier."""
 
 
+@add_status_code(HTTPStatus.BAD_REQUEST)
+class InvalidRecord(InvalidRequest):
+    """An imported record is not valid."""
+
+    def __init__(self, field: str, message: str):
+        super().__init__(message)
+        self.field = field
+
+
 @add_status_code(HTTPStatus.UNPROCESSABLE_ENTITY)
 class ResourceAlreadyExists(EstimationsException):
     """Resource Already exists."""
 
 
+@add_status_code(HTTPStatus.UNPROCESSABLE_ENTITY)
+class SessionCompleted(EstimationsException):
+    """The session is completed and can not be changed."""
+
+
 @add_status_code(HTTPStatus.NOT_FOUND)
 class ResourceNotFound(EstimationsException):
     """Resource does not exist."""
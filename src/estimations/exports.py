@@ -0,0 +1,240 @@
+"""Organization exports.
+
+The sessions, members, tasks and estimations of an organization are read
+with streamed queries within a single read transaction (on the replica when
+the request is read-only), so the export is
+consistent and its memory usage does not grow with the organization's size.
+
+NDJSON exports emit one typed record per line, they can be imported into
+another database, see estimations/imports.py:
+
+    {"type": "organization", "id": ..., "name": ...}
+    {"type": "user", "id": ..., "email": ..., "name": ..., "role": ..., "organization": ...}
+    {"type": "sequence", "name": ..., "values": [{"id": ..., "name": ..., "value": ...}, ...]}
+    {"type": "session", "id": ..., "name": ..., "organization": {"id": ...}, "sequence": {"name": ...}, ...}
+    {"type": "member", "session": ..., "user": {"id": ...}}
+    {"type": "task", "id": ..., "session": ..., "name": ..., "created_at": ...}
+    {"type": "estimation", "id": ..., "task": ..., "user": {"id": ...}, "value": {"id": ...}, ...}
+
+The users are the organization's and the ones its sessions reference, the
+organization is left out of the ones from another organization. Their
+passwords are never exported.
+
+CSV exports emit one row per estimation, tasks without estimations get a row
+with empty estimation columns.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Iterator, List, Optional
+
+import peewee
+
+from common.db import reader, stream
+from organizations.models import Organization
+from users.models import User
+
+from .models import Estimation, Sequence, Session, SessionMember, Task, Value
+
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CSV_COLUMNS = (
+    'session_id',
+    'session_name',
+    'session_completed',
+    'session_created_at',
+    'task_id',
+    'task_name',
+    'estimation_id',
+    'user_id',
+    'value_id',
+    'value_name',
+    'value',
+    'estimated_at',
+)
+
+# the lines written out at once
+CHUNK_SIZE = 500
+
+
+def export(organization: Organization, export_format: str) -> Iterator[str]:
+    """Yield the export of the organization in the given format, in chunks."""
+    # the transaction is opened where the reads go, the replica on read-only requests
+    with reader(Session._meta.database).atomic():
+        if export_format == 'csv':
+            lines = csv_lines(organization)
+        else:
+            lines = (json.dumps(record) + '\n' for record in ndjson_records(organization))
+
+        yield from chunked(lines)
+
+
+def ndjson_records(organization: Organization) -> Iterator[dict]:
+    yield {
+        'type': 'organization',
+        'id': str(organization.id),
+        'name': organization.name,
+    }
+
+    members = (SessionMember
+               .select(SessionMember.user)
+               .join(Session)
+               .where(Session.organization == organization))
+    voters = (Estimation
+              .select(Estimation.user)
+              .join(Task)
+              .join(Session)
+              .where(Session.organization == organization))
+    query = (User
+             .select(User.id, User.email, User.name, User.role, User.organization)
+             .where((User.organization == organization) | User.id.in_(members) | User.id.in_(voters))
+             .order_by(User.registered_on, User.id))
+    for user_id, email, name, role, organization_id in stream(query):
+        record = {
+            'type': 'user',
+            'id': str(user_id),
+            'email': email,
+            'name': name,
+            'role': role,
+        }
+        if organization_id == organization.id:
+            record['organization'] = str(organization_id)
+        yield record
+
+    sequences = (Sequence
+                 .select()
+                 .join(Session)
+                 .where(Session.organization == organization)
+                 .distinct())
+    for sequence in sequences:
+        yield {
+            'type': 'sequence',
+            'name': sequence.name,
+            'values': [value_record(value) for value in sequence.sorted_values],
+        }
+
+    query = (Session
+             .select(Session.id, Session.name, Session.sequence, Session.completed,
+                     Session.completed_at, Session.created_at)
+             .where(Session.organization == organization)
+             .order_by(Session.created_at))
+    for session_id, name, sequence, completed, completed_at, created_at in stream(query):
+        yield {
+            'type': 'session',
+            'id': str(session_id),
+            'name': name,
+            'organization': {'id': str(organization.id)},
+            'sequence': {'name': sequence},
+            'completed': completed,
+            'completed_at': isoformat(completed_at) if completed else None,
+            'created_at': isoformat(created_at),
+        }
+
+    query = (SessionMember
+             .select(SessionMember.session, SessionMember.user)
+             .join(Session)
+             .where(Session.organization == organization))
+    for session_id, user_id in stream(query):
+        yield {
+            'type': 'member',
+            'session': str(session_id),
+            'user': {'id': str(user_id)},
+        }
+
+    query = (Task
+             .select(Task.id, Task.session, Task.name, Task.created_at)
+             .join(Session)
+             .where(Session.organization == organization))
+    for task_id, session_id, name, created_at in stream(query):
+        yield {
+            'type': 'task',
+            'id': str(task_id),
+            'session': str(session_id),
+            'name': name,
+            'created_at': isoformat(created_at),
+        }
+
+    query = (Estimation
+             .select(Estimation.id, Estimation.task, Estimation.user, Estimation.value,
+                     Value.name, Value.value, Estimation.created_at)
+             .join(Value, peewee.JOIN.LEFT_OUTER)
+             .switch(Estimation)
+             .join(Task)
+             .join(Session)
+             .where(Session.organization == organization))
+    for estimation_id, task_id, user_id, value_id, value_name, number, created_at in stream(query):
+        yield {
+            'type': 'estimation',
+            'id': str(estimation_id),
+            'task': str(task_id),
+            'user': {'id': str(user_id) if user_id else None},
+            'value': {'id': str(value_id) if value_id else None},
+            'value_name': value_name,
+            'value_number': float(number) if number is not None else None,
+            'created_at': isoformat(created_at),
+        }
+
+
+def value_record(value: Value) -> dict:
+    record = {'id': str(value.id)}
+    if value.name is not None:
+        record['name'] = value.name
+    if value.value is not None:
+        record['value'] = float(value.value)
+    return record
+
+
+def csv_lines(organization: Organization) -> Iterator[str]:
+    query = (Session
+             .select(Session.id, Session.name, Session.completed, Session.created_at,
+                     Task.id, Task.name,
+                     Estimation.id, Estimation.user, Estimation.value,
+                     Value.name, Value.value, Estimation.created_at)
+             .join(Task, peewee.JOIN.LEFT_OUTER)
+             .join(Estimation, peewee.JOIN.LEFT_OUTER)
+             .join(Value, peewee.JOIN.LEFT_OUTER)
+             .where(Session.organization == organization)
+             .order_by(Session.created_at, Session.id, Task.id))
+
+    yield csv_line(CSV_COLUMNS)
+    for row in stream(query):
+        yield csv_line(csv_value(value) for value in row)
+
+
+def csv_line(values: Iterable) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def csv_value(value) -> Optional[str]:
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(float(value))
+    return str(value)
+
+
+def isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def chunked(lines: Iterable[str]) -> Iterator[str]:
+    """Join the lines in chunks so the response is not written line by line."""
+    chunk: List[str] = list()
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk.clear()
+
+    if chunk:
+        yield ''.join(chunk)
@@ -0,0 +1,397 @@
+"""Bulk NDJSON imports.
+
+Every line is a typed record, in the same format the exports are written
+(organization, user, sequence, session, member, task and estimation records).
+Each record is validated against the schema of the endpoint that creates the
+same resource. The valid records are buffered and written with multi-row
+inserts of up to ``batch_size`` rows, the transaction is committed every
+``transaction_batches`` batches. Records must come after the ones they
+reference, like the exports write them.
+
+The records of rows that already exist, by ID or by name for the sequences,
+are skipped, so an export can be imported again into the same database. The
+exported users carry no password, they are imported with a random one and
+must be given a new one (PATCH /users/<id>) before using it.
+
+A batch failing to insert is retried record by record, so only the offending
+records are reported as errors.
+"""
+import copy
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from uuid import UUID, uuid4
+
+import peewee
+from cerberus import Validator
+
+from organizations import schemas as organization_schemas
+from organizations.models import Organization
+from users import schemas as user_schemas
+from users.models import ROLES, User
+
+from . import analytics, schemas
+from .exc import InvalidRecord
+from .models import Estimation, Sequence, Session, SessionMember, Task, TaskAggregate, Value
+from .models.sequences import to_uuid
+
+
+DEFAULT_BATCH_SIZE = 500
+
+DEFAULT_TRANSACTION_BATCHES = 10
+
+_RECORD_ID = {'type': 'string', 'empty': False}
+
+_TIMESTAMP = {'type': 'string', 'empty': False, 'nullable': True}
+
+_REFERENCE = {'type': 'string', 'required': True, 'empty': False}
+
+
+def record_schema(schema: dict, **fields) -> dict:
+    """Extend the endpoint's schema with the fields only the records have."""
+    merged = copy.deepcopy(schema)
+    merged.update(fields)
+    merged['type'] = {'type': 'string', 'required': True}
+    return merged
+
+
+SCHEMAS = {
+    'organization': record_schema(organization_schemas.CREATE_ORGANIZATION, id=_RECORD_ID),
+    'user': record_schema(user_schemas.CREATE_USER_SCHEMA, id=_RECORD_ID, password={'type': 'string', 'empty': False}),
+    'sequence': record_schema(schemas.CREATE_SEQUENCE, **schemas.CREATE_VALUES_SCHEMA),
+    'session': record_schema(schemas.CREATE_SESSION, id=_RECORD_ID, completed={'type': 'boolean'},
+                             completed_at=_TIMESTAMP, created_at=_TIMESTAMP),
+    'member': record_schema(schemas.JOIN_SESSION, session=_REFERENCE),
+    'task': record_schema(schemas.CREATE_TASK, id=_RECORD_ID, session=_REFERENCE, created_at=_TIMESTAMP),
+    'estimation': record_schema(schemas.CREATE_ESTIMATION, id=_RECORD_ID, task=_REFERENCE, created_at=_TIMESTAMP),
+}
+
+# the buffered records are inserted following the references between them
+MODELS = (
+    ('organization', Organization),
+    ('user', User),
+    ('session', Session),
+    ('member', SessionMember),
+    ('task', Task),
+    ('estimation', Estimation),
+)
+
+
+class ImportReport:
+    """The outcome of an import."""
+
+    MAX_ERRORS = 1000
+
+    def __init__(self):
+        self.lines = 0
+        self.imported: Dict[str, int] = defaultdict(int)
+        self.skipped: Dict[str, int] = defaultdict(int)
+        self.errors: List[dict] = list()
+        self.error_count = 0
+
+    @property
+    def imported_count(self) -> int:
+        return sum(self.imported.values())
+
+    def add_error(self, line: int, kind: Optional[str], errors: dict):
+        self.error_count += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append({'line': line, 'type': kind, 'errors': errors})
+
+    def dump(self) -> dict:
+        return {
+            'lines': self.lines,
+            'imported': dict(self.imported),
+            'skipped': dict(self.skipped),
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+class Importer:
+    """Imports NDJSON records, see the module's documentation."""
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                 transaction_batches: int = DEFAULT_TRANSACTION_BATCHES,
+                 progress: Optional[Callable[[ImportReport], None]] = None):
+        self.batch_size = batch_size
+        self.transaction_batches = transaction_batches
+        self.progress = progress
+
+        self.report = ImportReport()
+        self.pending: Dict[str, List[Tuple[int, dict]]] = defaultdict(list)
+        self.pending_count = 0
+        self.batches = 0
+
+        self.task_sessions: Dict[UUID, Optional[UUID]] = dict()
+        self.session_sequences: Dict[UUID, Optional[str]] = dict()
+        self.sequence_values: Dict[str, List[Value]] = dict()
+        self.estimated_tasks: Set[UUID] = set()
+        self.organizations: Set[UUID] = set()
+
+    @property
+    def database(self) -> peewee.Database:
+        return Session._meta.database
+
+    def run(self, lines: Iterable[Union[str, bytes]]) -> ImportReport:
+        with self.database.atomic() as transaction:
+            for number, line in enumerate(lines, start=1):
+                self.report.lines = number
+                self.read(number, line)
+
+                if self.pending_count >= self.batch_size:
+                    self.flush()
+                    if self.batches % self.transaction_batches == 0:
+                        transaction.commit()
+
+            self.flush()
+            for task_ids in peewee.chunked(list(self.estimated_tasks), self.batch_size):
+                TaskAggregate.rebuild(task_ids)
+
+        for organization_id in self.organizations:
+            analytics.invalidate(organization_id)
+
+        return self.report
+
+    def read(self, number: int, line: Union[str, bytes]):
+        """Validate the line's record and buffer its row."""
+        record = self.parse(number, line)
+        if record is None:
+            return
+
+        kind = record['type']
+        try:
+            row = getattr(self, f'{kind}_row')(record)
+        except InvalidRecord as e:
+            self.report.add_error(number, kind, {e.field: [str(e)]})
+            return
+
+        if row is not None:
+            self.pending[kind].append((number, row))
+            self.pending_count += 1
+
+    def parse(self, number: int, line: Union[str, bytes]) -> Optional[dict]:
+        """Return the line's record if it is valid, None otherwise."""
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            return None
+
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            self.report.add_error(number, None, {'record': [f'Invalid JSON: {e}']})
+            return None
+
+        kind = record.get('type') if isinstance(record, dict) else None
+        if kind not in SCHEMAS:
+            self.report.add_error(number, kind, {'type': [f'Unknown record type, use one of {", ".join(SCHEMAS)}']})
+            return None
+
+        validator = Validator(SCHEMAS[kind], allow_unknown=True)
+        if not validator.validate(record):
+            self.report.add_error(number, kind, validator.errors)
+            return None
+
+        return record
+
+    def flush(self):
+        """Insert the buffered rows."""
+        for kind, model in MODELS:
+            entries = self.pending.pop(kind, None)
+            if entries:
+                self.insert(kind, model, entries)
+
+        self.pending_count = 0
+        self.batches += 1
+        if self.progress:
+            self.progress(self.report)
+
+    def insert(self, kind: str, model: peewee.ModelBase, entries: List[Tuple[int, dict]]):
+        existing = self.existing(model, entries)
+        if existing:
+            entries = [(number, row) for number, row in entries if row['id'] not in existing]
+            self.report.skipped[kind] += len(existing)
+            if not entries:
+                return
+
+        try:
+            with self.database.atomic():
+                insert_rows(model, [row for _, row in entries])
+        except peewee.IntegrityError:
+            for number, row in entries:
+                try:
+                    with self.database.atomic():
+                        insert_rows(model, [row])
+                except peewee.IntegrityError as e:
+                    self.report.add_error(number, kind, {'record': [str(e)]})
+                else:
+                    self.report.imported[kind] += 1
+        else:
+            self.report.imported[kind] += len(entries)
+
+    def existing(self, model: peewee.ModelBase, entries: List[Tuple[int, dict]]) -> Set[UUID]:
+        """The IDs of the rows that already exist, the members are inserted ignoring them instead."""
+        if model is SessionMember:
+            return set()
+
+        query = model.select(model.id).where(model.id.in_([row['id'] for _, row in entries]))
+        return {row_id for row_id, in query.tuples()}
+
+    def organization_row(self, record: dict) -> dict:
+        return {
+            'id': record_id(record),
+            'name': record['name'],
+            'registered_on': datetime.now(),
+        }
+
+    def user_row(self, record: dict) -> dict:
+        organization = record.get('organization')
+        return {
+            'id': record_id(record),
+            'email': record['email'],
+            'name': record['name'],
+            # the exports leave the passwords out, the users must be given a new one
+            'password': record.get('password') or uuid4().hex,
+            'role': record.get('role', ROLES[0]),
+            'organization': parse_uuid(organization, 'organization') if organization else None,
+            'registered_on': datetime.now(),
+        }
+
+    def sequence_row(self, record: dict) -> None:
+        """Sequences are few and their values are linked, so they are written right away."""
+        name = record['name']
+        if Sequence.select().where(Sequence.name == name).exists():
+            self.report.skipped['sequence'] += 1
+            return None
+
+        items = record.get('values', [])
+        value_ids = [parse_uuid(item['id'], 'values') if item.get('id') else None for item in items]
+        try:
+            with self.database.atomic():
+                sequence = Sequence.create(name=name)
+                values = list()
+                for item, value_id in zip(items, value_ids):
+                    value = Value.from_item(item, sequence)
+                    if value_id is not None:
+                        value.id = value_id
+                    value.save(force_insert=True)
+                    values.append(value)
+                values = Value.link(values, sequence)
+        except peewee.IntegrityError as e:
+            raise InvalidRecord('record', str(e)) from e
+
+        self.sequence_values[name] = values
+        self.report.imported['sequence'] += 1
+        return None
+
+    def session_row(self, record: dict) -> dict:
+        session_id = record_id(record)
+        organization_id = parse_uuid(record['organization']['id'], 'organization')
+        self.session_sequences[session_id] = record['sequence']['name']
+        self.organizations.add(organization_id)
+
+        completed = record.get('completed', False)
+        return {
+            'id': session_id,
+            'name': record['name'],
+            'organization': organization_id,
+            'sequence': record['sequence']['name'],
+            'completed': completed,
+            'completed_at': parse_timestamp(record, 'completed_at') if completed else None,
+            'created_at': parse_timestamp(record, 'created_at') or datetime.now(),
+        }
+
+    def member_row(self, record: dict) -> dict:
+        return {
+            'session': parse_uuid(record['session'], 'session'),
+            'user': parse_uuid(record['user']['id'], 'user'),
+        }
+
+    def task_row(self, record: dict) -> dict:
+        task_id = record_id(record)
+        session_id = parse_uuid(record['session'], 'session')
+        self.task_sessions[task_id] = session_id
+
+        return {
+            'id': task_id,
+            'session': session_id,
+            'name': record['name'],
+            'created_at': parse_timestamp(record, 'created_at') or datetime.now(),
+        }
+
+    def estimation_row(self, record: dict) -> dict:
+        task_id = parse_uuid(record['task'], 'task')
+        value_id = self.resolve_value(task_id, record['value'])
+        self.estimated_tasks.add(task_id)
+
+        return {
+            'id': record_id(record),
+            'task': task_id,
+            'user': parse_uuid(record['user']['id'], 'user'),
+            'value': value_id,
+            'created_at': parse_timestamp(record, 'created_at') or datetime.now(),
+        }
+
+    def resolve_value(self, task_id: UUID, payload: dict) -> UUID:
+        """Resolve the value payload within the sequence of the task's session."""
+        if 'id' in payload:
+            return parse_uuid(payload['id'], 'value')
+
+        sequence_name = self.sequence_of(task_id)
+        if sequence_name not in self.sequence_values:
+            self.sequence_values[sequence_name] = list(Value.select().where(Value.sequence == sequence_name))
+
+        value, = Sequence(name=sequence_name).find_values([payload], self.sequence_values[sequence_name])
+        if value is None:
+            raise InvalidRecord('value', f'The value was not found in the sequence {sequence_name}')
+        return value.id
+
+    def sequence_of(self, task_id: UUID) -> str:
+        if task_id not in self.task_sessions:
+            self.task_sessions[task_id] = Task.select(Task.session).where(Task.id == task_id).scalar()
+        session_id = self.task_sessions[task_id]
+        if session_id is None:
+            raise InvalidRecord('task', f'Task({task_id}) was not found')
+
+        if session_id not in self.session_sequences:
+            self.session_sequences[session_id] = Session.select(Session.sequence) \
+                .where(Session.id == session_id) \
+                .scalar()
+        sequence_name = self.session_sequences[session_id]
+        if sequence_name is None:
+            raise InvalidRecord('task', f'The session of Task({task_id}) was not found')
+
+        return sequence_name
+
+
+def insert_rows(model: peewee.ModelBase, rows: List[dict]):
+    query = model.insert_many(rows)
+    if model is SessionMember:
+        query = query.on_conflict_ignore()
+    query.execute()
+
+
+def record_id(record: dict) -> UUID:
+    if 'id' not in record:
+        return uuid4()
+    return parse_uuid(record['id'], 'id')
+
+
+def parse_uuid(value: str, field: str) -> UUID:
+    uuid = to_uuid(value)
+    if uuid is None:
+        raise InvalidRecord(field, f'{value} is not a valid UUID')
+    return uuid
+
+
+def parse_timestamp(record: dict, field: str) -> Optional[datetime]:
+    value = record.get(field)
+    if not value:
+        return None
+
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise InvalidRecord(field, f'{value} is not an ISO 8601 timestamp') from e
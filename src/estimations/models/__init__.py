@@ -18,17 +18,21 @@ from .sequences import (
 )
 from .sessions import (
     Estimation,
+    EstimationSummary,
     Session,
     SessionMember,
     Task,
+    TaskAggregate,
 )
 
 
 __all__ = [
     'Estimation',
+    'EstimationSummary',
     'Sequence',
     'Session',
     'SessionMember',
     'Task',
+    'TaskAggregate',
     'Value',
 ]
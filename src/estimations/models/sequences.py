@@ -1,11 +1,12 @@
 from datetime import datetime
 from decimal import Decimal
 from itertools import chain, islice, tee
-from typing import Any, Iterator, List, Optional, Tuple, Union
-from uuid import uuid4
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from uuid import UUID, uuid4
 
 import peewee
 
+from common import identity
 from common.db import database
 from common.loggers import logger
 
@@ -16,7 +17,11 @@ from ..exc import (
 )
 
 
-class Sequence(peewee.Model):
+# the IDs of each sequence's values in order, see Sequence.sorted_values
+_VALUE_ORDERS: Dict[str, List[UUID]] = dict()
+
+
+class Sequence(identity.IdentityMapped, peewee.Model):
     """Sequence model.
 
     Receives the backref from:
@@ -36,13 +41,17 @@ class Sequence(peewee.Model):
     @classmethod
     def lookup(cls, name: str) -> 'Sequence':
         """Return the sequence by name."""
+        sequence = identity.get(cls, name)
+        if sequence is not None:
+            return sequence
+
         query = cls.select().where(cls.name == name)
         try:
             sequence = query.get()
         except cls.DoesNotExist as e:
             raise SequenceNotFound(f'Sequence with name {name} was not found') from e
         else:
-            return sequence
+            return identity.add(sequence)
 
     @classmethod
     def all(cls) -> List['Sequence']:
@@ -72,39 +81,23 @@ class Sequence(peewee.Model):
 
     @property
     def sorted_values(self) -> List['Value']:
-        """Returns a sorted list of the values."""
-        if not self.values:
+        """Returns a sorted list of the values.
+
+        The values are fetched with a single query and linked in memory,
+        the resulting order is cached until the sequence's values change.
+        """
+        values = list(self.values)
+        if not values:
             logger.error('No values found')
             return list()
 
-        numeric_values = [val for val in self.values if val.value is not None]
-        if not numeric_values:
-            logger.error('Did not found any numeric values')
-            return self.values
-
-        root_generator = (nv for nv in numeric_values
-                          if nv.previous is None and nv.next is not None)
-        root_value = next(root_generator, None)
-        if root_value is None:
-            logger.error(f'No root value, can not sort in {numeric_values}')
-            return self.values
-
-        value, values = root_value, list()
-        values.append(value)
-        while value.next:
-            value = value.next
-            if value:
-                values.append(value)
-            else:
-                break
-
-        non_numeric_values = [val for val in self.values if val.value is None]
-        if non_numeric_values:
-            # sort in place by name, fallback to value's ID
-            non_numeric_values.sort(key=lambda v: v.name or str(v.id))
+        by_id = {value.id: value for value in values}
+        order = _VALUE_ORDERS.get(self.name)
+        if order is None or set(order) != set(by_id):
+            order = [value.id for value in sort_values(values)]
+            _VALUE_ORDERS[self.name] = order
 
-        values.extend(non_numeric_values)
-        return values
+        return [by_id[value_id] for value_id in order]
 
     def value_pairs(self):
         """Yields the current value and the next value as a 2-value tuple.
@@ -153,7 +146,7 @@ class Sequence(peewee.Model):
             if next_val is None:
                 return None, val
             if val.value is None and next_val.value is None:
-                logger.error(f'Value {val.value} and Next Value {next_val.value} are empty')
+                logger.error('Value %s and Next Value %s are empty', val.value, next_val.value)
                 continue
 
             if val.value is not None and next_val.value is None and val.value <= value:
@@ -195,6 +188,31 @@ class Sequence(peewee.Model):
 
         return None
 
+    def find_values(self, payloads: List[dict],
+                    values: Optional[List['Value']] = None) -> List[Optional['Value']]:
+        """Resolve many value payloads with a single query, or none if the values are given.
+
+        Each payload is matched like a single estimation does it:
+        by the value's ID first, then by its numeric value and at last by its name.
+        """
+        if values is None:
+            values = list(self.values)
+        by_id = {value.id: value for value in values}
+        by_number = {value.value: value for value in values if value.value is not None}
+        by_name = {value.name: value for value in values if value.name is not None}
+
+        found = list()
+        for payload in payloads:
+            if 'id' in payload:
+                value = by_id.get(to_uuid(payload['id']))
+            elif 'value' in payload:
+                value = by_number.get(Decimal(str(payload['value'])))
+            else:
+                value = by_name.get(payload.get('name'))
+            found.append(value)
+
+        return found
+
     def remove_values(self):
         """Removes the related values in an atomic way."""
         values = self.sorted_values
@@ -203,6 +221,7 @@ class Sequence(peewee.Model):
         with database.atomic():
             for value in values:
                 value.delete_instance()
+        _VALUE_ORDERS.pop(self.name, None)
 
 
 class Value(peewee.Model):
@@ -210,9 +229,9 @@ class Value(peewee.Model):
 
     id = peewee.UUIDField(primary_key=True, default=uuid4)
 
-    sequence = peewee.ForeignKeyField(Sequence, field='name', backref='values',
-                                      on_delete='CASCADE',
-                                      column_name='sequence')
+    sequence = identity.MappedForeignKeyField(Sequence, field='name', backref='values',
+                                              on_delete='CASCADE',
+                                              column_name='sequence')
 
     previous = peewee.ForeignKeyField('self', null=True, backref='next_value',
                                       on_delete='SET NULL',
@@ -228,6 +247,9 @@ class Value(peewee.Model):
 
     created_at = peewee.TimestampField(default=datetime.now)
 
+    # the columns of dump_row(), in its order
+    ROW = (id, name, value)
+
     class Meta:
 
         indexes = (
@@ -254,20 +276,30 @@ class Value(peewee.Model):
 
         with database.atomic():
             for item in items:
-                val = item.get('value')
-                try:
-                    normalized_value = Decimal(val)
-                except TypeError:
-                    log_call = logger.error if val is not None else logger.warning
-                    log_call(f'Value({val}) was not Decimal and will use None')
-                    normalized_value = None
-
-                value = cls(name=item.get('name'),
-                            sequence=sequence,
-                            value=normalized_value)
+                value = cls.from_item(item, sequence)
                 value.save(force_insert=True)
                 values.append(value)
 
+        return cls.link(values, sequence)
+
+    @classmethod
+    def from_item(cls, item: dict, sequence: Sequence) -> 'Value':
+        """Build the value of the payload, unsaved."""
+        val = item.get('value')
+        try:
+            normalized_value = Decimal(val)
+        except TypeError:
+            log_call = logger.error if val is not None else logger.warning
+            log_call('Value(%s) was not Decimal and will use None', val)
+            normalized_value = None
+
+        return cls(name=item.get('name'),
+                   sequence=sequence,
+                   value=normalized_value)
+
+    @classmethod
+    def link(cls, values: List['Value'], sequence: Sequence) -> List['Value']:
+        """Link the saved values of the sequence in order, returns them sorted."""
         numeric_values = [v for v in values if v.value is not None]
         numeric_values.sort(key=lambda v: v.value)
 
@@ -282,6 +314,9 @@ class Value(peewee.Model):
             for value in numeric_values:
                 value.save()
 
+        if sequence is not None:
+            _VALUE_ORDERS.pop(sequence.name, None)
+
         sorted_values = list()
         sorted_values.extend(numeric_values)
         sorted_values.extend(non_numeric_values)
@@ -289,24 +324,70 @@ class Value(peewee.Model):
         return sorted_values
 
     def dump(self):
+        return self.dump_row((self.id, self.name, self.value))
+
+    @staticmethod
+    def dump_row(row: tuple) -> dict:
+        """Dump a row of the ROW columns like dump()."""
+        value_id, name, value = row
         payload = {
-            'id': self.id,
+            'id': value_id,
         }
 
-        if self.name:
-            payload['name'] = self.name
+        if name:
+            payload['name'] = name
 
-        if self.value is not None:
-            payload['value'] = float(self.value)
+        if value is not None:
+            payload['value'] = float(value)
         else:
             payload['value'] = None
 
         return payload
 
 
+def sort_values(values: List[Value]) -> List[Value]:
+    """Sort the values following their links, the non-numeric values go last by name."""
+    numeric_values = [val for val in values if val.value is not None]
+    if not numeric_values:
+        logger.error('Did not found any numeric values')
+        return values
+
+    root_generator = (nv for nv in numeric_values
+                      if nv.previous_id is None and nv.next_id is not None)
+    root_value = next(root_generator, None)
+    if root_value is None:
+        logger.error('No root value, can not sort in %s', numeric_values)
+        return values
+
+    by_id = {value.id: value for value in values}
+    value, sorted_values = root_value, [root_value]
+    while value.next_id in by_id and len(sorted_values) <= len(values):
+        value = by_id[value.next_id]
+        sorted_values.append(value)
+
+    non_numeric_values = [val for val in values if val.value is None]
+    if non_numeric_values:
+        # sort in place by name, fallback to value's ID
+        non_numeric_values.sort(key=lambda v: v.name or str(v.id))
+
+    sorted_values.extend(non_numeric_values)
+    return sorted_values
+
+
 def previous_and_next(some_iterable: Iterator[Any]):
     """Iterate over a 3-tuple valued as (previous, current, next)."""
     prevs, items, nexts = tee(some_iterable, 3)
     prevs = chain([None], prevs)
     nexts = chain(islice(nexts, 1, None), [None])
     return zip(prevs, items, nexts)
+
+
+def to_uuid(value: Union[UUID, str]) -> Optional[UUID]:
+    """Return the value as an UUID, None if the value is not a valid UUID."""
+    if isinstance(value, UUID):
+        return value
+
+    try:
+        return UUID(value)
+    except (ValueError, TypeError, AttributeError):
+        return None
@@ -1,42 +1,50 @@
 import statistics
 
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from uuid import UUID, uuid4
 
 import peewee
 
+from common import identity
 from common.db import database
+from common.fields import JSONField
 from common.loggers import logger
 from organizations.models import Organization
 from users.models import User
 
-from .sequences import Sequence, Value
+from .sequences import Sequence, to_uuid, Value
 from ..exc import (
+    SessionCompleted,
     SessionNotFound,
     TaskNotFound,
     UserIsNotPartOfTheSession,
 )
 
 
-class Session(peewee.Model):
+class Session(identity.IdentityMapped, peewee.Model):
     """Estimations Session.
 
     Receives the backref from:
         * SessionMember as session_members
         * Task as tasks
+
+    Once completed, the summary of every task is frozen as an EstimationSummary
+    and the session does not accept further changes to its tasks and estimations.
     """
 
     id = peewee.UUIDField(primary_key=True, default=uuid4)
 
     name = peewee.CharField()
 
-    organization = peewee.ForeignKeyField(Organization, backref='sessions',
-                                          on_delete='CASCADE')
+    organization = identity.MappedForeignKeyField(Organization, backref='sessions',
+                                                  on_delete='CASCADE')
 
-    sequence = peewee.ForeignKeyField(Sequence, backref='sessions',
-                                      column_name='sequence')
+    sequence = identity.MappedForeignKeyField(Sequence, backref='sessions',
+                                              column_name='sequence')
 
     completed = peewee.BooleanField(default=False)
 
@@ -46,19 +54,27 @@ class Session(peewee.Model):
 
     class Meta:
 
+        indexes = (
+            (('organization', 'created_at'), False),
+        )
+
         database = database
 
         table_name = 'sessions'
 
     @classmethod
     def lookup(cls, code: str):
+        session = identity.get(cls, code)
+        if session is not None:
+            return session
+
         query = cls.select().where(cls.id == code)
         try:
             session = query.get()
         except cls.DoesNotExist as e:
             raise SessionNotFound(f'Session with name {code} was not found') from e
         else:
-            return session
+            return identity.add(session)
 
     @classmethod
     def from_data(cls, name, organization: dict, sequence: dict) -> 'Session':
@@ -66,8 +82,8 @@ class Session(peewee.Model):
             organization_id = organization['id']
             sequence_name = sequence['name']
         except KeyError as e:
-            logger.error(f'Expected the organization to have an ID or '
-                         f'the Sequence to have a name - {e}')
+            logger.error('Expected the organization to have an ID or '
+                         'the Sequence to have a name - %s', e)
             raise
 
         sequence_model = Sequence.lookup(sequence_name)
@@ -77,12 +93,40 @@ class Session(peewee.Model):
                              sequence=sequence_model)
         return session
 
+    def ensure_open(self):
+        """Raises SessionCompleted if the session was already completed."""
+        if self.completed:
+            raise SessionCompleted(f'Session({self.id}) is completed and can not be changed')
+
+    def complete(self) -> List['EstimationSummary']:
+        """Complete the session and freeze the summary of every task."""
+        self.ensure_open()
+
+        sequence: Sequence = self.sequence
+        values = sequence.sorted_values
+
+        try:
+            with database.atomic():
+                histograms = Task.histograms(self, values)
+                summaries = [EstimationSummary.from_task(task, sequence, histograms[task.id])
+                             for task in self.tasks]
+                if summaries:
+                    EstimationSummary.bulk_create(summaries)
+
+                self.completed = True
+                self.completed_at = datetime.now()
+                self.save(only=('completed', 'completed_at'))
+        except peewee.IntegrityError as e:
+            raise SessionCompleted(f'Session({self.id}) was already completed') from e
+        else:
+            return summaries
+
     def dump(self, with_organization=True, with_tasks=True):
         data = {
             'id': str(self.id),
             'name': self.name,
             'completed': self.completed,
-            'created_at': self.completed_at.isoformat(),
+            'created_at': self.created_at.isoformat(),
         }
 
         if self.completed and self.completed_at:
@@ -98,10 +142,11 @@ class Session(peewee.Model):
             members.sort(key=lambda member: member.get('registered_on'))
             data['members'] = members
 
-        if with_tasks and self.tasks:
-            tasks = [task.dump(with_session=False) for task in self.tasks]
-            tasks.sort(key=lambda task: task.get('name', ''))
-            data['tasks'] = tasks
+        if with_tasks:
+            tasks = Task.dump_rows(self.tasks)
+            if tasks:
+                tasks.sort(key=lambda task: task.get('name', ''))
+                data['tasks'] = tasks
 
         return data
 
@@ -109,13 +154,13 @@ class Session(peewee.Model):
 class SessionMember(peewee.Model):
     """The session members."""
 
-    session = peewee.ForeignKeyField(Session, backref='session_members',
-                                     on_delete='CASCADE',
-                                     column_name='session')
+    session = identity.MappedForeignKeyField(Session, backref='session_members',
+                                             on_delete='CASCADE',
+                                             column_name='session')
 
-    user = peewee.ForeignKeyField(User, backref='session_user',
-                                  on_delete='CASCADE',
-                                  column_name='user')
+    user = identity.MappedForeignKeyField(User, backref='session_user',
+                                          on_delete='CASCADE',
+                                          column_name='user')
 
     class Meta:
 
@@ -141,6 +186,61 @@ class SessionMember(peewee.Model):
         else:
             return member
 
+    @classmethod
+    def join_many(cls, session: Session, user_ids: List[str]) -> List[dict]:
+        """Add the users to the session.
+
+        The users and their organizations are fetched with a single query,
+        the new members are then inserted with insert-ignore semantics.
+        Returns one result per given user ID, in the same order.
+        """
+        identifiers = {user_id: to_uuid(user_id) for user_id in user_ids}
+        uuids = [uuid for uuid in set(identifiers.values()) if uuid is not None]
+
+        organizations, members = dict(), set()
+        if uuids:
+            query = User.select(User.id, User.organization).where(User.id.in_(uuids))
+            organizations = {user_id: organization_id for user_id, organization_id in query.tuples()}
+
+            query = cls.select(cls.user).where((cls.session == session) & (cls.user.in_(uuids)))
+            members = {user_id for user_id, in query.tuples()}
+
+        results, rows = list(), list()
+        for user_id in user_ids:
+            uuid = identifiers[user_id]
+            if uuid not in organizations:
+                results.append({
+                    'id': user_id,
+                    'status': 'not_found',
+                    'message': f'User with ID {user_id} was not found',
+                })
+            elif organizations[uuid] != session.organization_id:
+                results.append({
+                    'id': user_id,
+                    'status': 'not_in_organization',
+                    'message': f'User({user_id}) is not part of the session\'s '
+                               f'organization({session.organization_id})',
+                })
+            elif uuid in members:
+                results.append({
+                    'id': user_id,
+                    'status': 'already_joined',
+                    'message': 'User has already joined the session',
+                })
+            else:
+                members.add(uuid)
+                rows.append({'session': session, 'user': uuid})
+                results.append({
+                    'id': user_id,
+                    'status': 'joined',
+                })
+
+        if rows:
+            with database.atomic():
+                cls.insert_many(rows).on_conflict_ignore().execute()
+
+        return results
+
     def leave(self):
         query = SessionMember.delete().where(
             (SessionMember.session == self.session) & (SessionMember.user == self.user))
@@ -158,7 +258,7 @@ class SessionMember(peewee.Model):
         return data
 
 
-class Task(peewee.Model):
+class Task(identity.IdentityMapped, peewee.Model):
     """Task model.
 
     Receives the backref:
@@ -170,54 +270,136 @@ class Task(peewee.Model):
 
     name = peewee.CharField(index=True)
 
-    session = peewee.ForeignKeyField(Session, backref='tasks',
-                                     on_delete='CASCADE',
-                                     column_name='session')
+    session = identity.MappedForeignKeyField(Session, backref='tasks',
+                                             on_delete='CASCADE',
+                                             column_name='session')
 
     created_at = peewee.TimestampField(default=datetime.now)
 
+    # the columns of dump_row(), in its order
+    ROW = (id, name, created_at)
+
     class Meta:
 
+        indexes = (
+            (('session', 'name'), False),
+        )
+
         database = database
 
         table_name = 'tasks'
 
     @classmethod
     def lookup(cls, name_or_id: Union[UUID, str], session: Union[Session, None] = None):
-        if isinstance(name_or_id, UUID):  # then for sure it is the Task ID
-            query = cls.select().where(cls.id == name_or_id)
-        else:
+        if not isinstance(name_or_id, UUID):
             # well it could be either the Task ID or the name...
             try:
                 name_or_id = UUID(name_or_id)
             except (ValueError, TypeError):  # for sure then it is the name
                 if not session:
                     # we kind of need the session for it
-                    logger.error(f'While trying to lookup the Task {name_or_id} we got no session')
+                    logger.error('While trying to lookup the Task %s we got no session', name_or_id)
                     raise
-                query = cls.select().where(
-                    (cls.name == name_or_id) & (cls.session == session))
-            else:
-                # we know we are referring to the Task ID
-                query = cls.select().where(cls.id == name_or_id)
+                return cls._get_where((cls.name == name_or_id) & (cls.session == session))
 
-        if query is None:
-            raise TaskNotFound('No query for Task search could be built')
+        # we know we are referring to the Task ID
+        task = identity.get(cls, name_or_id)
+        if task is not None:
+            return task
+        return cls._get_where(cls.id == name_or_id)
 
+    @classmethod
+    def _get_where(cls, condition: peewee.Expression) -> 'Task':
         try:
-            task = query.get()
+            task = cls.select().where(condition).get()
         except cls.DoesNotExist as e:
             raise TaskNotFound('Task was not found') from e
         else:
-            return task
+            return identity.add(task)
+
+    @classmethod
+    def resolve_many(cls, session: Session, names_or_ids: List[str]) -> Dict[str, UUID]:
+        """Map the given task names or IDs to the task IDs with a single query.
+
+        Only the tasks of the session are considered; unknown tasks are left out.
+        """
+        identifiers = {name_or_id: to_uuid(name_or_id) for name_or_id in names_or_ids}
+        ids = [uuid for uuid in identifiers.values() if uuid is not None]
+        names = [name_or_id for name_or_id, uuid in identifiers.items() if uuid is None]
+
+        query = cls.select(cls.id, cls.name).where(
+            (cls.session == session) & (cls.id.in_(ids) | cls.name.in_(names)))
+        found_ids, by_name = set(), dict()
+        for task_id, name in query.tuples():
+            found_ids.add(task_id)
+            by_name.setdefault(name, task_id)
+
+        tasks = dict()
+        for name_or_id, uuid in identifiers.items():
+            if uuid in found_ids:
+                tasks[name_or_id] = uuid
+            elif uuid is None and name_or_id in by_name:
+                tasks[name_or_id] = by_name[name_or_id]
+
+        return tasks
+
+    @classmethod
+    def create_many(cls, session: Session, names: List[str]) -> List[dict]:
+        """Create the tasks in the session with a single multi-row insert.
+
+        Names already used in the session, or repeated in the given list,
+        are not inserted and are reported as duplicates instead.
+        Returns one compact result per given name, in the same order.
+        """
+        results, rows, seen = list(), list(), set()
+
+        with database.atomic():
+            query = cls.select(cls.name).where((cls.session == session) & (cls.name.in_(names)))
+            existing_names = {name for name, in query.tuples()}
+
+            for name in names:
+                if name in existing_names or name in seen:
+                    results.append({
+                        'name': name,
+                        'status': 'duplicate',
+                        'message': f'Task with name {name} already exists in the session',
+                    })
+                    continue
+
+                seen.add(name)
+                row = {
+                    'id': uuid4(),
+                    'name': name,
+                    'session': session,
+                    'created_at': datetime.now(),
+                }
+                rows.append(row)
+                results.append({
+                    'id': str(row['id']),
+                    'name': name,
+                    'status': 'created',
+                })
+
+            if rows:
+                cls.insert_many(rows).execute()
+
+        return results
 
     @property
     def is_estimated_by_all_members(self) -> bool:
         """Returns a boolean if everybody has estimated the task."""
-        users_who_estimated: List[User] = [estimation.user for estimation in self.estimations]
-        session_users: List[User] = [member.user for member in self.session.session_members]
-
-        return all((user in users_who_estimated) for user in session_users)
+        return self.pending_members().count() == 0
+
+    def pending_members(self) -> peewee.ModelSelect:
+        """The session members that did not estimate the task yet, with a single anti-join."""
+        return (User
+                .select()
+                .join(SessionMember, on=(SessionMember.user == User.id))
+                .switch(User)
+                .join(Estimation, peewee.JOIN.LEFT_OUTER,
+                      on=((Estimation.user == User.id) & (Estimation.task == self.id)))
+                .where((SessionMember.session == self.session_id) & Estimation.id.is_null())
+                .order_by(User.registered_on, User.id))
 
     @property
     def consensus_met(self) -> bool:
@@ -255,13 +437,79 @@ class Task(peewee.Model):
         """Returns the estimations that have no numerical value."""
         return [estimation for estimation in self.estimations if estimation.value.value is None]
 
-    def dump(self, with_session=True, with_organization=False, with_estimations=False) -> dict:
-        data = {
-            'id': str(self.id),
-            'name': self.name,
-            'created_at': self.created_at.isoformat(),
+    @classmethod
+    def histograms(cls, session: Session, values: Optional[List[Value]] = None) -> Dict[UUID, List[dict]]:
+        """Count the estimations of every task of the session for each value.
+
+        The counts of all the tasks come from a single GROUP BY, the tasks
+        created since, e.g., while the session's tasks are iterated, get an
+        empty histogram.
+        """
+        if values is None:
+            values = session.sequence.sorted_values
+
+        query = (cls
+                 .select(cls.id, Estimation.value, peewee.fn.COUNT(Estimation.id))
+                 .join(Estimation, peewee.JOIN.LEFT_OUTER)
+                 .where(cls.session == session)
+                 .group_by(cls.id, Estimation.value))
+        counts = defaultdict(dict)
+        for task_id, value_id, count in query.tuples():
+            counts[task_id][value_id] = count
+
+        histograms = defaultdict(lambda: to_histogram(values, dict()))
+        histograms.update((task_id, to_histogram(values, task_counts)) for task_id, task_counts in counts.items())
+        return histograms
+
+    def histogram(self, values: Optional[List[Value]] = None) -> List[dict]:
+        """Count the estimations for each value, following the sequence's order.
+
+        The counts come from a single GROUP BY over the task's estimations.
+        """
+        if values is None:
+            values = self.session.sequence.sorted_values
+
+        query = (Estimation
+                 .select(Estimation.value, peewee.fn.COUNT(Estimation.id))
+                 .where(Estimation.task == self)
+                 .group_by(Estimation.value))
+        return to_histogram(values, dict(query.tuples()))
+
+    @property
+    def aggregate(self) -> 'TaskAggregate':
+        """The aggregate of the task's estimations."""
+        return TaskAggregate.for_task(self.id)
+
+    def summary(self, sequence: Optional[Sequence] = None,
+                aggregate: Optional['TaskAggregate'] = None) -> dict:
+        """Computes the summary of the task out of its aggregate."""
+        if sequence is None:
+            sequence = self.session.sequence
+        if aggregate is None:
+            aggregate = self.aggregate
+
+        mean_estimation = aggregate.mean
+        everybody_estimated = self.is_estimated_by_all_members
+        consensus_met = aggregate.consensus_met and everybody_estimated
+        closest_value = sequence.closest_possible_value(mean_estimation)
+        non_numeric_estimations = []
+        if aggregate.non_numeric_count:
+            non_numeric_estimations = [estimation.dump(with_task=False)
+                                       for estimation in self.non_numeric_estimations]
+
+        return {
+            'mean': float(mean_estimation),
+            'everybody_estimated': everybody_estimated,
+            'consensus_met': consensus_met,
+            'closest_value': closest_value.dump() if closest_value else 0,
+            'task': self.dump(with_session=False, with_estimations=True),
+            'has_non_numeric_estimations': aggregate.non_numeric_count > 0,
+            'non_numeric_estimations': non_numeric_estimations,
         }
 
+    def dump(self, with_session=True, with_organization=False, with_estimations=False) -> dict:
+        data = self.dump_row((self.id, self.name, self.created_at))
+
         if with_session:
             data['session'] = self.session.dump(with_tasks=True,
                                                 with_organization=with_organization)
@@ -274,35 +522,60 @@ class Task(peewee.Model):
 
         return data
 
+    @staticmethod
+    def dump_row(row: tuple) -> dict:
+        """Dump a row of the ROW columns like dump(with_session=False)."""
+        task_id, name, created_at = row
+        return {
+            'id': str(task_id),
+            'name': name,
+            'created_at': created_at.isoformat(),
+        }
+
+    @classmethod
+    def dump_rows(cls, query: peewee.ModelSelect) -> List[dict]:
+        """Dump the tasks of the query like dump(with_session=False), selecting only the ROW columns."""
+        return [cls.dump_row(row) for row in query.select(*cls.ROW).tuples().iterator()]
+
 
 class Estimation(peewee.Model):
     """Estimation of a user."""
 
     id = peewee.UUIDField(primary_key=True, default=uuid4)
 
-    task = peewee.ForeignKeyField(Task, backref='estimations',
-                                  column_name='task',
-                                  on_delete='CASCADE')
+    task = identity.MappedForeignKeyField(Task, backref='estimations',
+                                          column_name='task',
+                                          on_delete='CASCADE')
 
-    user = peewee.ForeignKeyField(User, backref='estimations',
-                                  column_name='user',
-                                  on_delete='SET NULL')
+    user = identity.MappedForeignKeyField(User, backref='estimations',
+                                          column_name='user',
+                                          on_delete='CASCADE')
 
     value = peewee.ForeignKeyField(Value, backref='estimations',
                                    column_name='value',
-                                   on_delete='SET NULL')
+                                   on_delete='CASCADE')
 
     created_at = peewee.TimestampField(default=datetime.now)
 
+    # the columns of dump_row(), in its order, the user's and value's are joined
+    ROW = (created_at, *User.ROW, *Value.ROW)
+
     class Meta:
 
+        indexes = (
+            (('task', 'user'), False),
+        )
+
         database = database
 
         table_name = 'estimations'
 
     @classmethod
     def lookup(cls, task: Task, user: User) -> Optional['Estimation']:
-        query = cls.select().where((cls.task == task) & (cls.user == user))
+        query = (cls
+                 .select(cls, Value)
+                 .join(Value, peewee.JOIN.LEFT_OUTER)
+                 .where((cls.task == task) & (cls.user == user)))
         try:
             estimation = query.get()
         except cls.DoesNotExist:
@@ -310,6 +583,86 @@ class Estimation(peewee.Model):
         else:
             return estimation
 
+    @classmethod
+    def estimate(cls, task: Task, user: User, value: Value) -> Tuple['Estimation', bool]:
+        """Create or update the user's estimation of the task.
+
+        The task's aggregate is updated within the same transaction.
+        Returns the estimation and whether it was created.
+        """
+        with database.atomic():
+            aggregate = TaskAggregate.locked([task.id])[task.id]
+
+            # did the user already estimated?
+            estimation = cls.lookup(task, user)
+            created = estimation is None
+            if created:
+                estimation = cls(value=value, user=user, task=task)
+                estimation.save(force_insert=True)
+                aggregate.change(None, value)
+            elif estimation.value_id != value.id:
+                aggregate.change(estimation.value, value)
+                estimation.value = value
+                estimation.save()
+
+            TaskAggregate.save_changed([aggregate])
+
+        return estimation, created
+
+    @classmethod
+    def estimate_many(cls, session: Session, user: User, items: List[dict]) -> List[dict]:
+        """Create or update the user's estimations for many tasks of the session.
+
+        The tasks, the sequence values and the current estimations are fetched
+        with a single query each. The new estimations are inserted with one
+        multi-row insert and the changed ones are updated with one statement
+        per value, all within the same transaction as the tasks' aggregates.
+        Returns one result per given item, in the same order.
+        """
+        tasks = Task.resolve_many(session, [item['task'] for item in items])
+        values = session.sequence.find_values([item['value'] for item in items])
+        task_ids = list(set(tasks.values()))
+
+        results, rows, updates, seen = list(), list(), defaultdict(list), set()
+        with database.atomic():
+            aggregates = TaskAggregate.locked(task_ids)
+
+            query = (cls
+                     .select(cls, Value)
+                     .join(Value, peewee.JOIN.LEFT_OUTER)
+                     .where((cls.user == user) & (cls.task.in_(task_ids))))
+            estimations = {estimation.task_id: estimation for estimation in query}
+
+            for item, value in zip(items, values):
+                task_id = tasks.get(item['task'])
+                current = estimations.get(task_id)
+                status = estimation_status(task_id, value, current, seen)
+                seen.add(task_id)
+
+                if status == 'created':
+                    rows.append({
+                        'id': uuid4(),
+                        'task': task_id,
+                        'user': user,
+                        'value': value.id,
+                        'created_at': datetime.now(),
+                    })
+                    aggregates[task_id].change(None, value)
+                elif status == 'updated' and current.value_id != value.id:
+                    updates[value.id].append(current.id)
+                    aggregates[task_id].change(current.value, value)
+
+                results.append(estimation_result(item, status, value))
+
+            if rows:
+                cls.insert_many(rows).execute()
+            for value_id, estimation_ids in updates.items():
+                cls.update(value=value_id).where(cls.id.in_(estimation_ids)).execute()
+
+            TaskAggregate.save_changed(aggregates.values())
+
+        return results
+
     def dump(self, with_task=True):
         data = {
             'user': self.user.dump(with_organization=False),
@@ -321,3 +674,328 @@ class Estimation(peewee.Model):
             data['task'] = self.task.dump(with_session=False)
 
         return data
+
+    @staticmethod
+    def dump_row(row: tuple) -> dict:
+        """Dump a row of the ROW columns like dump(with_task=False)."""
+        value_start = 1 + len(User.ROW)
+        return {
+            'user': User.dump_row(row[1:value_start]),
+            'value': Value.dump_row(row[value_start:]),
+            'created_at': row[0].isoformat(),
+        }
+
+    @classmethod
+    def dump_rows(cls, query: peewee.ModelSelect) -> List[dict]:
+        """Dump the estimations of the query like dump(with_task=False), joining their users and values."""
+        query = query.select(*cls.ROW).join(User).switch(cls).join(Value)
+        return [cls.dump_row(row) for row in query.tuples().iterator()]
+
+
+class EstimationSummary(peewee.Model):
+    """Frozen summary of a task, created when its session is completed."""
+
+    id = peewee.UUIDField(primary_key=True, default=uuid4)
+
+    task = identity.MappedForeignKeyField(Task, backref='summaries',
+                                          column_name='task',
+                                          on_delete='CASCADE',
+                                          unique=True)
+
+    mean = peewee.DecimalField()
+
+    closest_value = peewee.ForeignKeyField(Value, backref='summaries',
+                                           column_name='closest_value',
+                                           on_delete='SET NULL',
+                                           null=True)
+
+    everybody_estimated = peewee.BooleanField()
+
+    consensus_met = peewee.BooleanField()
+
+    histogram = JSONField()
+
+    payload = JSONField()
+
+    created_at = peewee.TimestampField(default=datetime.now)
+
+    class Meta:
+
+        database = database
+
+        table_name = 'estimation_summaries'
+
+    @classmethod
+    def lookup(cls, task: Task) -> Optional['EstimationSummary']:
+        query = cls.select().where(cls.task == task)
+        try:
+            summary = query.get()
+        except cls.DoesNotExist:
+            return None
+        else:
+            return summary
+
+    @classmethod
+    def from_task(cls, task: Task, sequence: Sequence, histogram: List[dict]) -> 'EstimationSummary':
+        """Build the summary out of the task's current estimations."""
+        aggregate = task.aggregate
+        payload = task.summary(sequence, aggregate)
+        closest_value = payload['closest_value']
+
+        return cls(task=task,
+                   mean=aggregate.mean,
+                   closest_value=closest_value['id'] if closest_value else None,
+                   everybody_estimated=payload['everybody_estimated'],
+                   consensus_met=payload['consensus_met'],
+                   histogram=histogram,
+                   payload=payload)
+
+    def dump(self) -> dict:
+        data = dict(self.payload)
+        data['histogram'] = self.histogram
+        return data
+
+
+class TaskAggregate(peewee.Model):
+    """Running totals of the estimations of a task.
+
+    Kept up to date within the same transaction that creates or changes the
+    estimations, so the task summary does not need to read every estimation.
+    The writes deleting estimations through cascades (e.g., deleting a value
+    or a user) must run within rebuilding(), ``bin/rebuild-aggregates``
+    repairs the aggregates drifted otherwise.
+    """
+
+    task = identity.MappedForeignKeyField(Task, backref='aggregates',
+                                          column_name='task',
+                                          on_delete='CASCADE',
+                                          primary_key=True)
+
+    count = peewee.IntegerField(default=0)
+
+    numeric_sum = peewee.DecimalField(max_digits=20, decimal_places=5, default=Decimal(0))
+
+    non_numeric_count = peewee.IntegerField(default=0)
+
+    value_counts = JSONField(default=dict)
+
+    updated_at = peewee.TimestampField(default=datetime.now)
+
+    class Meta:
+
+        database = database
+
+        table_name = 'task_aggregates'
+
+    @classmethod
+    def for_task(cls, task_id: UUID) -> 'TaskAggregate':
+        """Return the task's aggregate, computed from its estimations if it does not exist yet."""
+        aggregate = cls.get_or_none(cls.task == task_id)
+        if aggregate is None:
+            aggregate = cls(**cls.compute([task_id]).get(task_id, empty_aggregate(task_id)))
+        return aggregate
+
+    @classmethod
+    def locked(cls, task_ids: List[UUID]) -> Dict[UUID, 'TaskAggregate']:
+        """Return the tasks' aggregates, locked for update when the database supports it.
+
+        Missing aggregates are created out of the tasks' current estimations first.
+        Must be called within the transaction that changes the estimations.
+        """
+        aggregates = cls._select_for_update(task_ids)
+
+        missing = [task_id for task_id in set(task_ids) if task_id not in aggregates]
+        if missing:
+            rows = cls.compute(missing)
+            cls.insert_many([rows.get(task_id, empty_aggregate(task_id)) for task_id in missing]) \
+                .on_conflict_ignore() \
+                .execute()
+            aggregates.update(cls._select_for_update(missing))
+
+        return aggregates
+
+    @classmethod
+    def _select_for_update(cls, task_ids: List[UUID]) -> Dict[UUID, 'TaskAggregate']:
+        if not task_ids:
+            return dict()
+
+        query = cls.select().where(cls.task.in_(task_ids))
+        if database.for_update:
+            query = query.for_update()
+        return {aggregate.task_id: aggregate for aggregate in query}
+
+    @classmethod
+    def save_changed(cls, aggregates: Iterable['TaskAggregate']):
+        """Write the aggregates that were changed with a single statement."""
+        changed = [aggregate for aggregate in aggregates if aggregate.is_dirty()]
+        if changed:
+            cls.bulk_update(changed, fields=[cls.count, cls.numeric_sum, cls.non_numeric_count,
+                                             cls.value_counts, cls.updated_at])
+
+    @classmethod
+    def compute(cls, task_ids: Optional[List[UUID]] = None) -> Dict[UUID, dict]:
+        """Compute the aggregates rows from the estimations, the full recomputation.
+
+        Tasks without estimations are left out.
+        """
+        query = (Estimation
+                 .select(Estimation.task, Estimation.value, Value.value, peewee.fn.COUNT(Estimation.id))
+                 .join(Value)
+                 .group_by(Estimation.task, Estimation.value, Value.value))
+        if task_ids is not None:
+            query = query.where(Estimation.task.in_(task_ids))
+
+        rows = dict()
+        for task_id, value_id, number, amount in query.tuples():
+            row = rows.setdefault(task_id, empty_aggregate(task_id))
+            row['count'] += amount
+            if number is None:
+                row['non_numeric_count'] += amount
+            else:
+                row['numeric_sum'] += number * amount
+            row['value_counts'][str(value_id)] = amount
+
+        return rows
+
+    @classmethod
+    def rebuild(cls, task_ids: Optional[List[UUID]] = None) -> int:
+        """Replace the aggregates with their full recomputation.
+
+        Returns the amount of aggregates written.
+        """
+        with database.atomic():
+            rows = list(cls.compute(task_ids).values())
+
+            query = cls.delete()
+            if task_ids is not None:
+                query = query.where(cls.task.in_(task_ids))
+            query.execute()
+
+            for batch in peewee.chunked(rows, 500):
+                cls.insert_many(batch).execute()
+
+        return len(rows)
+
+    @classmethod
+    @contextmanager
+    def rebuilding(cls, estimations: peewee.Expression) -> Iterator[List[UUID]]:
+        """Rebuild the aggregates of the tasks of the estimations the block deletes, e.g., through a cascade.
+
+        The tasks are collected before the block and rebuilt after it, in the
+        same transaction. Yields the IDs of the tasks' organizations, their
+        cached results must be invalidated once done.
+        """
+        with database.atomic():
+            query = (Estimation
+                     .select(Estimation.task, Session.organization)
+                     .join(Task)
+                     .join(Session)
+                     .where(estimations)
+                     .distinct())
+            rows = list(query.tuples())
+
+            yield list({organization_id for _, organization_id in rows})
+
+            task_ids = list({task_id for task_id, _ in rows})
+            if task_ids:
+                cls.rebuild(task_ids)
+
+    @classmethod
+    def check(cls, task_ids: Optional[List[UUID]] = None) -> List[UUID]:
+        """Compare the aggregates with their full recomputation.
+
+        Returns the IDs of the tasks whose aggregate drifted.
+        """
+        expected = cls.compute(task_ids)
+
+        query = cls.select()
+        if task_ids is not None:
+            query = query.where(cls.task.in_(task_ids))
+        stored = {aggregate.task_id: aggregate for aggregate in query}
+
+        drifted = list()
+        for task_id in set(expected) | set(stored):
+            row = expected.get(task_id, empty_aggregate(task_id))
+            aggregate = stored.get(task_id, cls(**empty_aggregate(task_id)))
+            if aggregate.totals() != (row['count'], row['numeric_sum'],
+                                      row['non_numeric_count'], row['value_counts']):
+                drifted.append(task_id)
+
+        return drifted
+
+    @property
+    def mean(self) -> Decimal:
+        """The mean of the numeric estimations, Decimal(0) if there are none."""
+        numeric_count = self.count - self.non_numeric_count
+        if not numeric_count:
+            return Decimal(0)
+        return self.numeric_sum / numeric_count
+
+    @property
+    def consensus_met(self) -> bool:
+        """Returns True if there are estimations and all of them are the same."""
+        return len(self.value_counts) == 1
+
+    def totals(self) -> tuple:
+        return self.count, self.numeric_sum, self.non_numeric_count, self.value_counts
+
+    def change(self, previous: Optional[Value], value: Optional[Value]):
+        """Move a vote from the previous value (if any) to the new value (if any)."""
+        if previous is not None:
+            self._add(previous, -1)
+        if value is not None:
+            self._add(value, 1)
+        self.updated_at = datetime.now()
+
+    def _add(self, value: Value, amount: int):
+        self.count += amount
+        if value.value is None:
+            self.non_numeric_count += amount
+        else:
+            self.numeric_sum += value.value * amount
+
+        value_counts = dict(self.value_counts)
+        key = str(value.id)
+        value_counts[key] = value_counts.get(key, 0) + amount
+        if not value_counts[key]:
+            del value_counts[key]
+        self.value_counts = value_counts
+
+
+def to_histogram(values: List[Value], counts: Dict[UUID, int]) -> List[dict]:
+    """The amount of estimations per value, in the order of the given values."""
+    return [{'value': value.dump(), 'count': counts.get(value.id, 0)} for value in values]
+
+
+def empty_aggregate(task_id: UUID) -> dict:
+    """The aggregate row of a task without estimations."""
+    return {
+        'task': task_id,
+        'count': 0,
+        'numeric_sum': Decimal(0),
+        'non_numeric_count': 0,
+        'value_counts': dict(),
+        'updated_at': datetime.now(),
+    }
+
+
+def estimation_result(item: dict, status: str, value: Optional[Value]) -> dict:
+    """The result of estimating one of the batch items."""
+    result = {'task': item['task'], 'status': status}
+    if value is not None and status in ('created', 'updated'):
+        result['value'] = value.dump()
+    return result
+
+
+def estimation_status(task_id: Optional[UUID], value: Optional[Value],
+                      current: Optional[Estimation], seen: set) -> str:
+    """Return the outcome of estimating the task with the value."""
+    if task_id is None:
+        return 'task_not_found'
+    if task_id in seen:
+        return 'duplicate'
+    if value is None:
+        return 'value_not_found'
+    if current is None:
+        return 'created'
+    return 'updated'
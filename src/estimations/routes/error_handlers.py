@@ -7,7 +7,7 @@ from organizations.exceptions import NotFound as OrganizationNotFound
 from users.exceptions import NotFound as UserNotFound
 
 from ..app import estimations_app
-from ..exc import EmptyIdentifier, InvalidRequest
+from ..exc import EmptyIdentifier, InvalidRequest, SessionCompleted
 from ..exc import SequenceNotFound, SessionNotFound, TaskNotFound, ValueNotFound
 
 
@@ -26,7 +26,8 @@ def handle_not_found(error: Exception):
 @estimations_app.errorhandler(EmptyIdentifier)
 @estimations_app.errorhandler(InvalidRequest)
 @estimations_app.errorhandler(UserNotFound)
-def handle_invalid_requests(error: Union[EmptyIdentifier, InvalidRequest, UserNotFound]):
+@estimations_app.errorhandler(SessionCompleted)
+def handle_invalid_requests(error: Union[EmptyIdentifier, InvalidRequest, UserNotFound, SessionCompleted]):
     return make_response(
         jsonify({
             'message': str(error),
@@ -4,13 +4,16 @@ from typing import Tuple, Union
 from cerberus import Validator
 from flask import jsonify, make_response, request
 
+from common import singleflight
 from estimations import schemas
 from users.models import User
 
+from .. import analytics
 from ..app import estimations_app
 from ..exc import EmptyIdentifier, InvalidRequest, ValueNotFound
 from ..models import (
     Estimation,
+    EstimationSummary,
     Sequence,
     Session,
     Task,
@@ -18,6 +21,9 @@ from ..models import (
 )
 
 
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
 @estimations_app.route('/sessions/<session_id>/tasks/<task_id>/estimations', methods=['GET'])
 def get_estimations(session_id: str, task_id: str):
     """Get the tasks' estimations.
@@ -64,7 +70,7 @@ def get_estimations(session_id: str, task_id: str):
     """
     session, task = get_or_fail(session_id, task_id)
 
-    payload = [estimation.dump(with_task=False) for estimation in task.estimations]
+    payload = Estimation.dump_rows(task.estimations)
     return make_response(jsonify(payload), HTTPStatus.OK)
 
 
@@ -99,16 +105,16 @@ def estimate(session_id: str, task_id: str):
                         id:
                             type: string
                             format: uuid
-                            description: Provide only one of these
+                            description: At least one of these is required
                         name:
                             type: string
                             example: Coffee Break
-                            description: Provide only one of these
+                            description: At least one of these is required
                         value:
                             type: number
                             format: float
                             example: 2.0
-                            description: Provide only one of these
+                            description: At least one of these is required
                 user:
                     type: object
                     properties:
@@ -132,8 +138,13 @@ def estimate(session_id: str, task_id: str):
             description: The session or task were not found
             schema:
                 $ref: '#/definitions/NotFound'
+        422:
+            description: The session is completed
+            schema:
+                $ref: '#/definitions/UnprocessableEntity'
     """
     session, task = get_or_fail(session_id, task_id)
+    session.ensure_open()
 
     payload = request.get_json()
 
@@ -164,16 +175,9 @@ def estimate(session_id: str, task_id: str):
     if not value:
         raise ValueNotFound('The Value given did not contain a value from the sequence')
 
-    # did the user already estimated?
-    estimation = Estimation.lookup(task, user)
-    if not estimation:
-        estimation = Estimation(value=value, user=user, task=task)
-        estimation.save(force_insert=True)
-        http_status_code = HTTPStatus.CREATED
-    else:
-        estimation.value = value
-        estimation.save()
-        http_status_code = HTTPStatus.OK
+    estimation, created = Estimation.estimate(task, user, value)
+    analytics.invalidate(session.organization_id)
+    http_status_code = HTTPStatus.CREATED if created else HTTPStatus.OK
 
     return make_response(
         jsonify(estimation.dump()),
@@ -181,6 +185,132 @@ def estimate(session_id: str, task_id: str):
     )
 
 
+@estimations_app.route('/sessions/<session_id>/estimations/batch', methods=['PUT'])
+def estimate_many(session_id: str):
+    """Estimate many tasks of the session at once.
+    ---
+    description: 'Creates or updates the estimations of a single user for many tasks.
+    All the estimations are written in a single transaction and every task gets its own status.'
+    tags:
+        - Estimations
+        - Tasks
+    parameters:
+        - in: path
+          name: session_id
+          type: string
+          format: uuid
+          required: True
+        - in: body
+          name: body
+          required: True
+          schema:
+            type: object
+            properties:
+                user:
+                    type: object
+                    properties:
+                        id:
+                            type: string
+                            format: uuid
+                estimations:
+                    type: array
+                    items:
+                        type: object
+                        properties:
+                            task:
+                                type: string
+                                description: The task name or ID
+                                example: TASK-123
+                            value:
+                                type: object
+                                description: 'Only one of the attributes is required.
+                                If all given the first priority is the id, then the value and the name at the end.'
+                                properties:
+                                    id:
+                                        type: string
+                                        format: uuid
+                                    name:
+                                        type: string
+                                        example: Coffee Break
+                                    value:
+                                        type: number
+                                        format: float
+                                        example: 2.0
+    definitions:
+        EstimationBatchResults:
+            type: array
+            items:
+                $ref: '#/definitions/EstimationBatchResult'
+        EstimationBatchResult:
+            type: object
+            properties:
+                task:
+                    type: string
+                    example: TASK-123
+                status:
+                    type: string
+                    enum:
+                        - created
+                        - updated
+                        - duplicate
+                        - task_not_found
+                        - value_not_found
+                value:
+                    $ref: '#/definitions/Value'
+    responses:
+        200:
+            description: At least one task was estimated
+            schema:
+                $ref: '#/definitions/EstimationBatchResults'
+        400:
+            description: Bad request input
+            schema:
+                $ref: '#/definitions/ValidationErrors'
+        401:
+            description: The user is not part of the session's organization
+            schema:
+                $ref: '#/definitions/Unauthorized'
+        404:
+            description: The session or user were not found
+            schema:
+                $ref: '#/definitions/NotFound'
+        422:
+            description: None of the tasks were estimated or the session is completed
+            schema:
+                $ref: '#/definitions/EstimationBatchResults'
+    """
+    if not session_id:
+        raise EmptyIdentifier('Please provide a session identifier')
+
+    session = Session.lookup(session_id)
+    session.ensure_open()
+
+    payload = request.get_json()
+
+    validator = Validator()
+    if not validator.validate(payload, schemas.CREATE_ESTIMATIONS):
+        return make_response(jsonify(validator.errors), HTTPStatus.BAD_REQUEST)
+
+    # FIXME: move the user to the authentication layer
+    user_id = payload['user']['id']
+
+    user = User.lookup(user_id)
+    if user.organization_id != session.organization_id:
+        return make_response(jsonify({
+            'message': f'This user({user_id}) seems to not be part of the organization\'s session',
+        }), HTTPStatus.UNAUTHORIZED)
+
+    results = Estimation.estimate_many(session, user, payload['estimations'])
+    analytics.invalidate(session.organization_id)
+
+    if any(result['status'] in ('created', 'updated') for result in results):
+        http_status_code = HTTPStatus.OK
+    else:
+        http_status_code = HTTPStatus.UNPROCESSABLE_ENTITY
+
+    return make_response(jsonify(results), http_status_code)
+
+
 @estimations_app.route('/sessions/<session_id>/tasks/<task_id>/summary', methods=['GET'])
 def get_task_summary(session_id: str, task_id: str):
     """Get the summary of the task.
@@ -224,9 +354,16 @@ def get_task_summary(session_id: str, task_id: str):
                     type: array
                     items:
                         $ref: '#/definitions/Estimation'
+                histogram:
+                    $ref: '#/definitions/Histogram'
     responses:
         200:
-            description: Get the task's summary
+            description: 'Get the summary of the task.
+            The summary of a completed session is frozen and can be cached forever.'
+            headers:
+                Cache-Control:
+                    type: string
+                    description: Only for completed sessions
             schema:
                 $ref: '#/definitions/RuntimeSummary'
         404:
@@ -236,22 +373,143 @@ def get_task_summary(session_id: str, task_id: str):
     """
     session, task = get_or_fail(session_id, task_id)
 
-    mean_estimation = task.mean_estimation
-    everybody_estimated = task.is_estimated_by_all_members
-    consensus_met = task.consensus_met and everybody_estimated
-    closest_value = session.sequence.closest_possible_value(mean_estimation)
-    non_numeric_estimations = [estimation.dump(with_task=False)
-                               for estimation in task.non_numeric_estimations]
-
-    return make_response(jsonify({
-        'mean': float(mean_estimation),
-        'everybody_estimated': everybody_estimated,
-        'consensus_met': consensus_met,
-        'closest_value': closest_value.dump() if closest_value else 0,
-        'task': task.dump(with_session=False, with_estimations=True),
-        'has_non_numeric_estimations': task.has_non_numeric_estimations(),
-        'non_numeric_estimations': non_numeric_estimations,
-    }), HTTPStatus.OK)
+    if session.completed:
+        summary = EstimationSummary.lookup(task)
+        if summary:
+            response = make_response(jsonify(summary.dump()), HTTPStatus.OK)
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            return response
+
+    # every member refetches the summary as soon as somebody estimates
+    summary = singleflight.coalesce(lambda: task.summary(session.sequence),
+                                    version=analytics.generation(session.organization_id))
+    return make_response(jsonify(summary), HTTPStatus.OK)
+
+
+@estimations_app.route('/sessions/<session_id>/tasks/<task_id>/histogram', methods=['GET'])
+def get_task_histogram(session_id: str, task_id: str):
+    """Get the amount of estimations per value of the task.
+    ---
+    tags:
+        - Tasks
+        - Estimations
+    parameters:
+        - in: path
+          name: session_id
+          type: string
+          format: uuid
+          required: True
+        - in: path
+          name: task_id
+          type: string
+          required: True
+    definitions:
+        Histogram:
+            type: array
+            description: The amount of estimations per value, following the sequence's order
+            items:
+                type: object
+                properties:
+                    value:
+                        $ref: '#/definitions/Value'
+                    count:
+                        type: integer
+    responses:
+        200:
+            description: The task's histogram
+            schema:
+                $ref: '#/definitions/Histogram'
+        404:
+            description: Task or session were not found
+            schema:
+                $ref: '#/definitions/NotFound'
+    """
+    session, task = get_or_fail(session_id, task_id)
+
+    return make_response(jsonify(task.histogram(session.sequence.sorted_values)), HTTPStatus.OK)
+
+
+@estimations_app.route('/sessions/<session_id>/tasks/<task_id>/pending-members', methods=['GET'])
+def get_task_pending_members(session_id: str, task_id: str):
+    """Get the session members that did not estimate the task yet.
+    ---
+    tags:
+        - Tasks
+        - Estimations
+    parameters:
+        - in: path
+          name: session_id
+          type: string
+          format: uuid
+          required: True
+        - in: path
+          name: task_id
+          type: string
+          required: True
+    responses:
+        200:
+            description: The pending members, sorted by their registration date
+            schema:
+                $ref: '#/definitions/SessionMembers'
+        404:
+            description: Task or session were not found
+            schema:
+                $ref: '#/definitions/NotFound'
+    """
+    _, task = get_or_fail(session_id, task_id)
+
+    return make_response(
+        jsonify([user.dump(with_organization=False) for user in task.pending_members()]),
+        HTTPStatus.OK,
+    )
+
+
+@estimations_app.route('/sessions/<session_id>/histograms', methods=['GET'])
+def get_session_histograms(session_id: str):
+    """Get the histograms of all the tasks in the session.
+    ---
+    tags:
+        - Sessions
+        - Tasks
+        - Estimations
+    parameters:
+        - in: path
+          name: session_id
+          type: string
+          format: uuid
+          required: True
+    definitions:
+        TaskHistograms:
+            type: array
+            items:
+                type: object
+                properties:
+                    task:
+                        $ref: '#/definitions/TaskWithoutSession'
+                    histogram:
+                        $ref: '#/definitions/Histogram'
+    responses:
+        200:
+            description: The histogram of every task, sorted by the task name
+            schema:
+                $ref: '#/definitions/TaskHistograms'
+        404:
+            description: The session was not found
+            schema:
+                $ref: '#/definitions/NotFound'
+    """
+    if not session_id:
+        raise EmptyIdentifier('Please provide a session identifier')
+
+    session = Session.lookup(session_id)
+    histograms = Task.histograms(session)
+
+    tasks = sorted(session.tasks, key=lambda task: task.name)
+    payload = [{
+        'task': task.dump(with_session=False),
+        'histogram': histograms[task.id],
+    } for task in tasks]
+    return make_response(jsonify(payload), HTTPStatus.OK)
 
 
 def get_or_fail(session_id: Union[str, None], task_id: Union[str, None]) -> Tuple[Session, Task]:
@@ -3,11 +3,11 @@ from http import HTTPStatus
 from cerberus import Validator
 from flask import jsonify, make_response, request
 
-from estimations import schemas
+from estimations import analytics, schemas
 from estimations.exc import ResourceAlreadyExists
 
 from ..app import estimations_app
-from ..models import Sequence, Value
+from ..models import Estimation, Sequence, TaskAggregate, Value
 
 
 @estimations_app.route('/sequences', methods=['GET'])
@@ -281,6 +281,11 @@ def remove_values_from_sequence(name: str):
             f'No values were found for sequence {name}',
         }), HTTPStatus.NOT_FOUND)
 
-    sequence.remove_values()
+    # the estimations of the values go with them
+    values = Value.select(Value.id).where(Value.sequence == sequence.name)
+    with TaskAggregate.rebuilding(Estimation.value.in_(values)) as organization_ids:
+        sequence.remove_values()
+    for organization_id in organization_ids:
+        analytics.invalidate(organization_id)
 
     return make_response(jsonify({}), HTTPStatus.NO_CONTENT)
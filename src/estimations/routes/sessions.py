@@ -3,9 +3,11 @@ from http import HTTPStatus
 from cerberus import Validator
 from flask import jsonify, make_response, request
 
+from common import singleflight
 from estimations import schemas
 from users.models import User
 
+from .. import analytics
 from ..app import estimations_app
 from ..exc import UserIsNotPartOfTheSession
 from ..models import Session, SessionMember, Task
@@ -38,6 +40,10 @@ def get_session(code: str):
                     type: boolean
                     description: 'If true the session is mark as completed and
                     no further changes can be made to the session.'
+                completed_at:
+                    type: string
+                    format: datetime
+                    description: Only present if the session is completed
                 sequence:
                     $ref: '#/definitions/Sequence'
                 organization:
@@ -66,6 +72,10 @@ def get_session(code: str):
                     type: boolean
                     description: 'If true the session is mark as completed and
                     no further changes can be made to the session.'
+                completed_at:
+                    type: string
+                    format: datetime
+                    description: Only present if the session is completed
                 sequence:
                     $ref: '#/definitions/Sequence'
                 organization:
@@ -93,8 +103,9 @@ def get_session(code: str):
         }), HTTPStatus.NOT_FOUND)
 
     session = Session.lookup(code)
+    dump = singleflight.coalesce(session.dump, version=analytics.generation(session.organization_id))
 
-    return make_response(jsonify(session.dump()), HTTPStatus.OK)
+    return make_response(jsonify(dump), HTTPStatus.OK)
 
 
 @estimations_app.route('/sessions/', methods=['POST'])
@@ -143,10 +154,51 @@ def create_session():
         )
 
     session = Session.from_data(**payload)
+    analytics.invalidate(session.organization_id)
 
     return make_response(jsonify(session.dump()), HTTPStatus.CREATED)
 
 
+@estimations_app.route('/sessions/<session_id>/complete', methods=['PUT'])
+def complete_session(session_id: str):
+    """Complete the session.
+    ---
+    description: 'Freezes the summary of every task in the session.
+    Once completed, the tasks and estimations of the session can not be changed.'
+    tags:
+        - Sessions
+    parameters:
+        - in: path
+          name: session_id
+          type: string
+          format: uuid
+          required: True
+    responses:
+        200:
+            description: The session was completed
+            schema:
+                $ref: '#/definitions/Session'
+        404:
+            description: The session was not found
+            schema:
+                $ref: '#/definitions/NotFound'
+        422:
+            description: The session was already completed
+            schema:
+                $ref: '#/definitions/UnprocessableEntity'
+    """
+    if not session_id:
+        return make_response(jsonify({
+            'message': 'Please provide the session identifier.',
+        }), HTTPStatus.NOT_FOUND)
+
+    session = Session.lookup(session_id)
+    session.complete()
+    analytics.invalidate(session.organization_id)
+
+    return make_response(jsonify(session.dump()), HTTPStatus.OK)
+
+
 @estimations_app.route('/sessions/<session_id>/members', methods=['GET'])
 def get_session_members(session_id: str):
     """Get the session members.
@@ -273,6 +325,7 @@ def join_session(session_id: str):
         SessionMember.lookup(session, user)
     except UserIsNotPartOfTheSession:
         member = SessionMember.create(user=user, session=session)
+        analytics.invalidate(session.organization_id)
     else:
         return make_response(jsonify({
             'message': f'User has already joined the session',
@@ -281,6 +334,100 @@ def join_session(session_id: str):
     return make_response(jsonify(member.dump()), HTTPStatus.OK)
 
 
+@estimations_app.route('/sessions/<session_id>/members/batch', methods=['PUT'])
+def join_session_many(session_id: str):
+    """Join many users to a session at once.
+    ---
+    description: 'Adds the users to the session as long as they are members of same organization.
+    Every user gets its own status in the response.'
+    tags:
+        - Sessions
+    parameters:
+        - in: path
+          name: session_id
+          type: string
+          format: uuid
+          required: True
+        - in: body
+          name: body
+          required: True
+          schema:
+            type: object
+            properties:
+                users:
+                    type: array
+                    items:
+                        type: object
+                        properties:
+                            id:
+                                type: string
+                                format: uuid
+    definitions:
+        MemberBatchResults:
+            type: array
+            items:
+                $ref: '#/definitions/MemberBatchResult'
+        MemberBatchResult:
+            type: object
+            properties:
+                id:
+                    type: string
+                    format: uuid
+                status:
+                    type: string
+                    enum:
+                        - joined
+                        - already_joined
+                        - not_found
+                        - not_in_organization
+                message:
+                    type: string
+                    description: Only present if the user did not join
+    responses:
+        200:
+            description: At least one user joined the session
+            schema:
+                $ref: '#/definitions/MemberBatchResults'
+        400:
+            description: Invalid request
+            schema:
+                $ref: '#/definitions/ValidationErrors'
+        404:
+            description: Session not found
+            schema:
+                $ref: '#/definitions/NotFound'
+        422:
+            description: None of the users joined the session
+            schema:
+                $ref: '#/definitions/MemberBatchResults'
+    """
+    if not session_id:
+        return make_response(jsonify({
+            'message': 'Please provide the session identifier.',
+        }), HTTPStatus.NOT_FOUND)
+
+    session = Session.lookup(session_id)
+
+    payload = request.get_json()
+
+    validator = Validator()
+    if not validator.validate(payload, schemas.JOIN_SESSION_MANY):
+        return make_response(
+            jsonify(validator.errors),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    results = SessionMember.join_many(session, [user['id'] for user in payload['users']])
+    analytics.invalidate(session.organization_id)
+
+    if any(result['status'] == 'joined' for result in results):
+        http_status_code = HTTPStatus.OK
+    else:
+        http_status_code = HTTPStatus.UNPROCESSABLE_ENTITY
+
+    return make_response(jsonify(results), http_status_code)
+
+
 @estimations_app.route('/sessions/<session_id>/members/<user_id>', methods=['DELETE'])
 def leave_session(session_id: str, user_id: str):
     """Leave the session.
@@ -314,8 +461,9 @@ def leave_session(session_id: str, user_id: str):
     session = Session.lookup(session_id)
     user = User.lookup(user_id)
 
-    session = SessionMember.lookup(user=user, session=session)
-    session.leave()
+    member = SessionMember.lookup(user=user, session=session)
+    member.leave()
+    analytics.invalidate(session.organization_id)
 
     return make_response(jsonify(None), HTTPStatus.NO_CONTENT)
 
@@ -370,7 +518,7 @@ def get_session_tasks(session_id: str):
     session = Session.lookup(session_id)
 
     return make_response(
-        jsonify([task.dump(with_session=False) for task in session.tasks]),
+        jsonify(Task.dump_rows(session.tasks)),
         HTTPStatus.OK,
     )
 
@@ -496,6 +644,7 @@ def add_task_to_session(session_id: str):
         }), HTTPStatus.NOT_FOUND)
 
     session = Session.lookup(session_id)
+    session.ensure_open()
 
     payload = request.get_json()
 
@@ -505,10 +654,106 @@ def add_task_to_session(session_id: str):
                              HTTPStatus.BAD_REQUEST)
 
     task = Task.create(session=session, name=payload['name'])
+    analytics.invalidate(session.organization_id)
 
     return make_response(jsonify(task.dump()), HTTPStatus.CREATED)
 
 
+@estimations_app.route('/sessions/<session_id>/tasks/batch', methods=['POST'])
+def add_tasks_to_session(session_id: str):
+    """Create many tasks in the session at once.
+    ---
+    description: 'All the tasks are inserted in a single transaction.
+    Names that already exist in the session, or that are repeated in the request,
+    are skipped and reported as duplicates.'
+    tags:
+        - Tasks
+        - Sessions
+    parameters:
+        - in: path
+          name: session_id
+          type: string
+          format: uuid
+          required: True
+        - in: body
+          name: body
+          required: True
+          schema:
+            type: array
+            items:
+                type: object
+                properties:
+                    name:
+                        type: string
+                        example: TASK-123
+    definitions:
+        TaskBatchResults:
+            type: array
+            items:
+                $ref: '#/definitions/TaskBatchResult'
+        TaskBatchResult:
+            type: object
+            properties:
+                id:
+                    type: string
+                    format: uuid
+                    description: Only present if the task was created
+                name:
+                    type: string
+                    example: TASK-123
+                status:
+                    type: string
+                    enum:
+                        - created
+                        - duplicate
+                message:
+                    type: string
+                    description: Only present if the task was not created
+    responses:
+        201:
+            description: At least one task was created
+            schema:
+                $ref: '#/definitions/TaskBatchResults'
+        400:
+            description: Invalid request
+            schema:
+                $ref: '#/definitions/ValidationErrors'
+        404:
+            description: Session not found
+            schema:
+                $ref: '#/definitions/NotFound'
+        422:
+            description: None of the tasks were created
+            schema:
+                $ref: '#/definitions/TaskBatchResults'
+    """
+    if not session_id:
+        return make_response(jsonify({
+            'message': 'Please provide the session identifier.',
+        }), HTTPStatus.NOT_FOUND)
+
+    session = Session.lookup(session_id)
+    session.ensure_open()
+
+    payload = request.get_json()
+    elements = {'tasks': payload}
+
+    validator = Validator()
+    if not validator.validate(elements, schemas.CREATE_TASKS):
+        return make_response(jsonify(validator.errors),
+                             HTTPStatus.BAD_REQUEST)
+
+    results = Task.create_many(session, [item['name'] for item in payload])
+    analytics.invalidate(session.organization_id)
+
+    if any(result['status'] == 'created' for result in results):
+        http_status_code = HTTPStatus.CREATED
+    else:
+        http_status_code = HTTPStatus.UNPROCESSABLE_ENTITY
+
+    return make_response(jsonify(results), http_status_code)
+
+
 @estimations_app.route('/sessions/<session_id>/tasks/<task>', methods=['PATCH'])
 def edit_task_from_session(session_id: str, task: str):
     """Edit the task.
@@ -554,6 +799,7 @@ def edit_task_from_session(session_id: str, task: str):
         }), HTTPStatus.NOT_FOUND)
 
     session = Session.lookup(session_id)
+    session.ensure_open()
 
     payload = request.get_json()
 
@@ -571,5 +817,6 @@ def edit_task_from_session(session_id: str, task: str):
 
     task.name = payload['name']
     task.save()
+    analytics.invalidate(session.organization_id)
 
     return make_response(jsonify(task.dump()), HTTPStatus.OK)
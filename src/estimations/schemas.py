@@ -67,6 +67,23 @@ user:
 JOIN_SESSION = yaml.safe_load(_JOIN_SESSION)
 
 
+_JOIN_SESSION_MANY = """
+users:
+    type: list
+    required: True
+    empty: False
+    maxlength: 500
+    schema:
+        type: dict
+        schema:
+            id:
+                type: string
+                required: True
+                empty: False
+"""
+JOIN_SESSION_MANY = yaml.safe_load(_JOIN_SESSION_MANY)
+
+
 _CREATE_TASK = """
 name:
     type: string
@@ -75,23 +92,50 @@ name:
 """
 CREATE_TASK = EDIT_TASK = yaml.safe_load(_CREATE_TASK)
 
+
+_CREATE_TASKS = """
+tasks:
+    type: list
+    required: True
+    empty: False
+    maxlength: 500
+    schema:
+        type: dict
+        schema:
+            name:
+                type: string
+                required: True
+                empty: False
+"""
+CREATE_TASKS = yaml.safe_load(_CREATE_TASKS)
+
 _CREATE_ESTIMATION = """
 value:
     type: dict
     required: True
-    oneof_schema:
-        - id:
+    minlength: 1
+    schema:
+        id:
             type: string
-            required: True
             empty: False
-        - value:
+        value:
             type: number
-            required: True
+        name:
+            type: string
             empty: False
-        - name:
+user:
+    type: dict
+    required: True
+    schema:
+        id:
             type: string
             required: True
             empty: False
+"""
+CREATE_ESTIMATION = yaml.safe_load(_CREATE_ESTIMATION)
+
+
+_CREATE_ESTIMATIONS = """
 user:
     type: dict
     required: True
@@ -100,5 +144,30 @@ user:
             type: string
             required: True
             empty: False
+estimations:
+    type: list
+    required: True
+    empty: False
+    maxlength: 500
+    schema:
+        type: dict
+        schema:
+            task:
+                type: string
+                required: True
+                empty: False
+            value:
+                type: dict
+                required: True
+                minlength: 1
+                schema:
+                    id:
+                        type: string
+                        empty: False
+                    value:
+                        type: number
+                    name:
+                        type: string
+                        empty: False
 """
-CREATE_ESTIMATION = yaml.safe_load(_CREATE_ESTIMATION)
+CREATE_ESTIMATIONS = yaml.safe_load(_CREATE_ESTIMATIONS)
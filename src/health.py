@@ -2,6 +2,8 @@ from http import HTTPStatus
 
 from flask import Blueprint, jsonify, make_response
 
+from common import metrics
+
 
 health_app = Blueprint('health_app', __name__)
 
@@ -25,3 +27,20 @@ def health_check():
     return make_response(jsonify({
         'status': 'OK',
     }), HTTPStatus.OK)
+
+
+@health_app.route('/metrics', methods=['GET'])
+def metrics_exposition():
+    """Exposes the request metrics of all the workers in the Prometheus text format.
+    ---
+    tags:
+        - selfz
+    produces:
+        - text/plain
+    responses:
+        200:
+            description: Latency histograms, status counts, database time and requests in flight
+            schema:
+                type: string
+    """
+    return metrics.exposition()
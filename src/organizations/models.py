@@ -4,12 +4,13 @@ from uuid import uuid4
 
 import peewee
 
+from common import identity, lookups
 from common.db import database
 
 from .exceptions import NotFound
 
 
-class Organization(peewee.Model):
+class Organization(identity.IdentityMapped, peewee.Model):
     """Organizations model.
 
     Receives the backref from the User class as 'users'
@@ -20,6 +21,9 @@ class Organization(peewee.Model):
 
     registered_on = peewee.TimestampField(default=datetime.now)
 
+    # the columns of the cached lookups
+    CACHED = (id, name, registered_on)
+
     class Meta:
 
         database = database
@@ -28,13 +32,17 @@ class Organization(peewee.Model):
 
     @classmethod
     def lookup(cls, identifier) -> 'Organization':
+        instance = identity.get(cls, identifier)
+        if instance is not None:
+            return instance
+
         query = cls.select().where(cls.id == identifier)
         try:
-            instance = query.get()
+            instance = lookups.lookup(cls, identifier, query.get, cls.CACHED)
         except cls.DoesNotExist as e:
             raise NotFound(f'Organization with ID {identifier} was not found', e) from e
         else:
-            return instance
+            return identity.add(instance)
 
     @classmethod
     def create_from(cls, data: dict) -> 'Organization':
@@ -51,9 +59,10 @@ class Organization(peewee.Model):
             'name': self.name,
         }
 
-        if with_users and self.users:
-            users = [u.dump(with_organization=False)
-                     for u in self.users]
-            users.sort(key=lambda u: u['name'])
-            data['users'] = users
+        if with_users:
+            query = self.users
+            users = query.model.dump_rows(query)
+            if users:
+                users.sort(key=lambda u: u['name'])
+                data['users'] = users
         return data
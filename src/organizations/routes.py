@@ -2,8 +2,10 @@ from http import HTTPStatus
 from typing import Union
 
 from cerberus import Validator
-from flask import jsonify, make_response, request
+from flask import jsonify, make_response, request, Response, stream_with_context
 
+from common import lookups
+from estimations import analytics, exports, imports
 from organizations import schemas
 from organizations.models import Organization
 from users.exceptions import NotFound as UserNotFound
@@ -52,6 +54,258 @@ def get_organizations(org_id: str):
     return make_response(jsonify(payload), HTTPStatus.OK)
 
 
+@organizations_app.route('/<org_id>/analytics', methods=['GET'])
+def get_organization_analytics(org_id: str):
+    """Get the estimation analytics of all the organization's sessions.
+    ---
+    description: 'Per session and per task statistics of the estimations.
+    With a shared cache backend the report is cached until one of the sessions of the organization changes.'
+    tags:
+        - Organizations
+        - Estimations
+    parameters:
+        - in: path
+          name: org_id
+          required: True
+          type: string
+          format: uuid
+    definitions:
+        OrganizationAnalytics:
+            type: object
+            properties:
+                organization:
+                    type: object
+                    properties:
+                        id:
+                            type: string
+                            format: uuid
+                totals:
+                    $ref: '#/definitions/AnalyticsTotals'
+                sessions:
+                    type: array
+                    items:
+                        $ref: '#/definitions/SessionAnalytics'
+        AnalyticsTotals:
+            type: object
+            properties:
+                sessions:
+                    type: integer
+                    description: Only in the organization's totals
+                tasks:
+                    type: integer
+                estimated_tasks:
+                    type: integer
+                    description: The tasks with at least one estimation
+                estimations:
+                    type: integer
+                points:
+                    type: number
+                    format: float
+                    description: The sum of the mean estimation of the tasks
+                consensus_rate:
+                    type: number
+                    format: float
+                    description: The share of the estimated tasks where everybody voted the same value
+                mean_variance:
+                    type: number
+                    format: float
+        SessionAnalytics:
+            type: object
+            properties:
+                id:
+                    type: string
+                    format: uuid
+                name:
+                    type: string
+                completed:
+                    type: boolean
+                created_at:
+                    type: string
+                    format: datetime
+                totals:
+                    $ref: '#/definitions/AnalyticsTotals'
+                tasks:
+                    type: array
+                    items:
+                        $ref: '#/definitions/TaskAnalytics'
+        TaskAnalytics:
+            type: object
+            properties:
+                id:
+                    type: string
+                    format: uuid
+                name:
+                    type: string
+                estimations:
+                    type: integer
+                non_numeric_estimations:
+                    type: integer
+                mean:
+                    type: number
+                    format: float
+                variance:
+                    type: number
+                    format: float
+                spread:
+                    type: number
+                    format: float
+                    description: The difference between the highest and the lowest numeric estimation
+                consensus_met:
+                    type: boolean
+    responses:
+        200:
+            description: The organization's analytics
+            schema:
+                $ref: '#/definitions/OrganizationAnalytics'
+        404:
+            description: Organization not found
+            schema:
+                $ref: '#/definitions/NotFound'
+    """
+    organization = Organization.lookup(org_id)
+
+    payload = analytics.organization_analytics(organization.id)
+    return make_response(jsonify(payload), HTTPStatus.OK)
+
+
+@organizations_app.route('/<org_id>/export', methods=['GET'])
+def export_organization(org_id: str):
+    """Export all the sessions, tasks and estimations of the organization.
+    ---
+    description: 'The export is streamed and read within a single transaction.
+    NDJSON exports have one typed record per line (organization, user, sequence, session, member, task and
+    estimation), without the passwords of the users, and can be imported into another database.
+    CSV exports have one row per estimation.'
+    tags:
+        - Organizations
+        - Estimations
+    produces:
+        - application/x-ndjson
+        - text/csv
+    parameters:
+        - in: path
+          name: org_id
+          required: True
+          type: string
+          format: uuid
+        - in: query
+          name: format
+          type: string
+          enum:
+            - ndjson
+            - csv
+          default: ndjson
+    responses:
+        200:
+            description: The organization export
+        400:
+            description: Unknown export format
+            schema:
+                $ref: '#/definitions/UnprocessableEntity'
+        404:
+            description: Organization not found
+            schema:
+                $ref: '#/definitions/NotFound'
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in exports.FORMATS:
+        return make_response(jsonify({
+            'message': f'Unknown export format {export_format}, use one of {", ".join(exports.FORMATS)}',
+        }), HTTPStatus.BAD_REQUEST)
+
+    organization = Organization.lookup(org_id)
+
+    response = Response(stream_with_context(exports.export(organization, export_format)),
+                        mimetype=exports.FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename=organization-{organization.id}.{export_format}'
+    return response
+
+
+@organizations_app.route('/import', methods=['POST'])
+def import_organizations():
+    """Import organizations, users, sequences and sessions from NDJSON records.
+    ---
+    description: 'The body is read line by line, in the format of the NDJSON exports.
+    Every record is validated on its own, the invalid ones are reported with their line number
+    and the valid ones are written with multi-row inserts. The records of existing rows are skipped.
+    The users without a password get a random one, they must be given a new one.'
+    tags:
+        - Organizations
+        - Estimations
+    consumes:
+        - application/x-ndjson
+    parameters:
+        - in: body
+          required: True
+          name: body
+          schema:
+            type: string
+        - in: query
+          name: batch_size
+          type: integer
+          default: 500
+        - in: query
+          name: transaction_batches
+          description: The batches written per transaction
+          type: integer
+          default: 10
+    definitions:
+        ImportReport:
+            type: object
+            properties:
+                lines:
+                    type: integer
+                imported:
+                    type: object
+                    additionalProperties:
+                        type: integer
+                skipped:
+                    type: object
+                    additionalProperties:
+                        type: integer
+                error_count:
+                    type: integer
+                errors:
+                    type: array
+                    items:
+                        type: object
+                        properties:
+                            line:
+                                type: integer
+                            type:
+                                type: string
+                            errors:
+                                type: object
+    responses:
+        200:
+            description: The import report
+            schema:
+                $ref: '#/definitions/ImportReport'
+        400:
+            description: Invalid batch sizes
+            schema:
+                $ref: '#/definitions/UnprocessableEntity'
+        422:
+            description: No record was imported
+            schema:
+                $ref: '#/definitions/ImportReport'
+    """
+    validator = Validator(schemas.IMPORT_OPTIONS)
+    if not validator.validate(request.args.to_dict()):
+        return make_response(jsonify({
+            'message': 'Invalid import options',
+            'errors': validator.errors,
+        }), HTTPStatus.BAD_REQUEST)
+
+    importer = imports.Importer(**validator.document)
+    report = importer.run(request.stream)
+
+    status = HTTPStatus.OK
+    if report.error_count and not report.imported_count:
+        status = HTTPStatus.UNPROCESSABLE_ENTITY
+    return make_response(jsonify(report.dump()), status)
+
+
 @organizations_app.route('/', methods=['POST'])
 def create_organization():
     """Creates an organization.
@@ -127,6 +381,7 @@ def delete_organization(org_id: str):
         }), HTTPStatus.UNPROCESSABLE_ENTITY)
 
     organization.delete_instance()
+    lookups.invalidate(Organization, organization.id)
     return make_response(jsonify(None), HTTPStatus.NO_CONTENT)
 
 
@@ -176,6 +431,7 @@ def update_organization(org_id: str):
         organization.name = organization_name
 
     organization.save()
+    lookups.invalidate(Organization, organization.id)
 
     return make_response(
         jsonify(organization.dump()),
@@ -233,6 +489,7 @@ def add_user_to_organization(org_id: str):
 
     user.organization = organization
     user.save(only=('organization',))
+    lookups.invalidate(User, user.id)
 
     return make_response(
         jsonify({
@@ -274,5 +531,6 @@ def remove_user_from_organization(org_id: str, user_id: str):
 
     user.organization = None
     user.save(only=('organization',))
+    lookups.invalidate(User, user.id)
 
     return make_response(jsonify(None), HTTPStatus.NO_CONTENT)
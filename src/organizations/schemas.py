@@ -23,3 +23,20 @@ user:
 """
 
 JOIN_ORGANIZATION = yaml.safe_load(_JOIN_ORGANIZATION)
+
+
+_IMPORT_OPTIONS = """
+batch_size:
+  type: integer
+  min: 1
+  max: 10000
+transaction_batches:
+  type: integer
+  min: 1
+"""
+
+IMPORT_OPTIONS = yaml.safe_load(_IMPORT_OPTIONS)
+
+# the options come as query strings
+for _option in IMPORT_OPTIONS.values():
+    _option['coerce'] = int
@@ -1,10 +1,11 @@
 import os
 
 from flasgger import Swagger
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
 
-from common import db
+from common import admission, compression, db, identity, metrics, profiling, recorder
+from settings.db import REPLICA_STICKINESS
 from estimations.app import estimations_app  # noqa
 from health import health_app
 from organizations.app import organizations_app
@@ -13,14 +14,42 @@ from users.app import users_app
 
 app = Flask(__name__)
 
+metrics.init_app(app)
+
+compression.init_app(app)
+
+profiling.init_app(app)
+
+recorder.init_app(app)
+
+admission.init_app(app)
+
+
+# clients that just wrote read from the primary while the cookie lasts
+PRIMARY_COOKIE = 'read_primary'
+
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
 
 @app.before_request
 def setup_database():
     db.connect()
+    identity.start()
+    if request.method in READ_ONLY_METHODS and PRIMARY_COOKIE not in request.cookies:
+        db.database.use_replica()
+
+
+@app.after_request
+def stick_to_primary(response):
+    if db.database.replica is not None and request.method not in READ_ONLY_METHODS:
+        response.set_cookie(PRIMARY_COOKIE, '1', max_age=REPLICA_STICKINESS, httponly=True)
+    return response
 
 
 @app.teardown_request
 def clean_up(exc):
+    identity.clear()
+    db.database.use_replica(False)
     db.close()
 
 
@@ -1,4 +1,7 @@
 import os
+import tempfile
+
+from settings import cache
 
 
 SERVICE_NAME = os.getenv('SERVICE_NAME')
@@ -8,3 +11,73 @@ HOSTNAME = HOST = os.getenv('HOSTNAME')
 PORT = int(os.getenv('PORT', 5000))
 
 ACCESS_LOG_FORMAT = '%a %t "%r" %s %b "%{Referer}i" "%{User-Agent}i"'
+
+# the seconds the organization analytics are cached, see estimations/analytics.py, 0 disables it. The memory cache
+# backend only invalidates the worker that changed a session, the others would serve the report stale until it
+# expires, so it is disabled there unless set
+ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 0 if cache.BACKEND == 'memory' else 300))
+
+# the directory of the metrics files shared by the workers, see common/metrics.py
+METRICS_DIR = os.getenv('prometheus_multiproc_dir')
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# text or json, one object per line
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+
+# the records waiting for the writer, the records of a full queue are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+# the share of debug records written
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
+# requests carrying the secret in the X-Profile header or the profile query parameter are profiled
+PROFILE_SECRET = os.getenv('PROFILE_SECRET')
+
+# profile one in every N requests, 0 to only profile on demand
+PROFILE_SAMPLE_EVERY = int(os.getenv('PROFILE_SAMPLE_EVERY', 0))
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'estimations-profiles'))
+
+# the functions in the X-Profile-Summary response header
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', 10))
+
+# the concurrent requests of every budget per worker and the requests waiting for them, see common/admission.py
+ADMISSION_LIGHT_LIMIT = int(os.getenv('ADMISSION_LIGHT_LIMIT', 8))
+
+ADMISSION_LIGHT_QUEUE = int(os.getenv('ADMISSION_LIGHT_QUEUE', 16))
+
+ADMISSION_STANDARD_LIMIT = int(os.getenv('ADMISSION_STANDARD_LIMIT', 4))
+
+ADMISSION_STANDARD_QUEUE = int(os.getenv('ADMISSION_STANDARD_QUEUE', 8))
+
+ADMISSION_HEAVY_LIMIT = int(os.getenv('ADMISSION_HEAVY_LIMIT', 2))
+
+ADMISSION_HEAVY_QUEUE = int(os.getenv('ADMISSION_HEAVY_QUEUE', 2))
+
+# the seconds a request waits in the queue before being shed
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 1))
+
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 1))
+
+# the responses smaller than this are not compressed, see common/compression.py
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+
+# the gzip level, 1 to 9
+COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+
+# the brotli quality, 0 to 11
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+# coalesce the identical requests of the workers through the cache, see common/singleflight.py
+SINGLEFLIGHT_SHARED = os.getenv('SINGLEFLIGHT_SHARED', 'false').lower() in ('1', 'true', 'yes')
+
+# the seconds a request waits for the identical request in flight before computing on its own
+SINGLEFLIGHT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_TIMEOUT', 10))
+
+# append every request to this JSON lines file, to replay them with benchmarks/replay.py, see common/recorder.py
+RECORD_PATH = os.getenv('RECORD_PATH')
+
+# the key of the hashes replacing the personal values of the records, random per worker unless set, set it to keep
+# the same hash of a value across the workers and recordings
+RECORD_KEY = os.getenv('RECORD_KEY') or os.urandom(16).hex()
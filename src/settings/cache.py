@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+
+# memory, shared or redis, see common/cache.py
+BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+
+# the entries of the memory and shared backends, beyond it the least recently used, or oldest written, are evicted
+MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+
+# the file of the shared backend, in a directory of the user in shared memory when there is some
+PATH = os.getenv('CACHE_PATH', os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                                            f'estimations-cache-{os.getuid()}', 'cache.db'))
+
+REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+# the seconds the users and organizations looked up are cached, see common/lookups.py, 0 disables it. The memory
+# backend only invalidates the worker that wrote the row, the others read it stale until it expires, so it is
+# disabled there unless set, keep it to a few seconds then
+LOOKUP_TTL = float(os.getenv('CACHE_LOOKUP_TTL', 0 if BACKEND == 'memory' else 60))
@@ -1,6 +1,17 @@
 import os
 
 
+# mysql, or sqlite for the embedded single node mode
+ENGINE = os.getenv('DB_ENGINE', 'mysql')
+
+SQLITE_PATH = os.getenv('DB_SQLITE_PATH', 'estimations.db')
+
+# the seconds a write waits for the lock of another one
+SQLITE_BUSY_TIMEOUT = float(os.getenv('DB_SQLITE_BUSY_TIMEOUT', 5))
+
+# per worker
+MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 5))
+
 HOST = os.getenv('DB_HOST')
 
 PORT = int(os.getenv('DB_PORT', 3306))
@@ -12,3 +23,15 @@ PASSWORD = os.getenv('DB_PASSWORD')
 DATABASE = os.getenv('DB_NAME', 'estimations')
 
 ENDPOINT = f'mysql://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}'
+
+# the read replica is optional, it shares the primary's credentials unless given
+REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+
+REPLICA_PORT = int(os.getenv('DB_REPLICA_PORT', PORT))
+
+REPLICA_USER = os.getenv('DB_REPLICA_USER', USER)
+
+REPLICA_PASSWORD = os.getenv('DB_REPLICA_PASSWORD', PASSWORD)
+
+# the seconds the reads of a client stay on the primary after it writes
+REPLICA_STICKINESS = int(os.getenv('DB_REPLICA_STICKINESS', 5))
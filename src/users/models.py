@@ -3,11 +3,12 @@
 Contains the models of all the users regarding the admin tool.
 """
 from datetime import datetime
-from typing import Optional, Union
+from typing import List, Optional, Union
 from uuid import UUID, uuid4
 
 import peewee
 
+from common import identity, lookups
 from common.db import database
 from organizations.models import Organization
 
@@ -23,7 +24,7 @@ ROLES = (
 )
 
 
-class User(peewee.Model):
+class User(identity.IdentityMapped, peewee.Model):
     """User from the admin tool.
 
     This model relates to an organization.
@@ -38,12 +39,18 @@ class User(peewee.Model):
 
     role = peewee.CharField(default=ROLES[0])
 
-    organization = peewee.ForeignKeyField(Organization, backref='users',
-                                          column_name='organization_id',
-                                          null=True, default=None)
+    organization = identity.MappedForeignKeyField(Organization, backref='users',
+                                                  column_name='organization_id',
+                                                  null=True, default=None)
 
     registered_on = peewee.TimestampField(default=datetime.now)
 
+    # the columns of dump_row(), in its order
+    ROW = (id, email, name, role, registered_on)
+
+    # the columns of the cached lookups, without the password
+    CACHED = ROW + (organization,)
+
     class Meta:
 
         database = database
@@ -52,13 +59,17 @@ class User(peewee.Model):
 
     @classmethod
     def lookup(cls, identifier) -> Optional['User']:
+        user = identity.get(cls, identifier)
+        if user is not None:
+            return user
+
         user_query = cls.select().where(cls.id == identifier)
         try:
-            user = user_query.get()
+            user = lookups.lookup(cls, identifier, user_query.get, cls.CACHED)
         except cls.DoesNotExist as e:
             raise NotFound(f'User with ID {identifier} was not found', e) from e
         else:
-            return user
+            return identity.add(user)
 
     @classmethod
     def create_from(cls, data: dict) -> 'User':
@@ -83,7 +94,9 @@ class User(peewee.Model):
         """Update user from the given data."""
         self.email = email or self.email
         self.name = name or self.name
-        self.password = password or self.password
+        # the looked up users do not carry their password
+        if password:
+            self.password = password
         self.role = role or self.role
 
         return self
@@ -102,13 +115,7 @@ class User(peewee.Model):
 
     def dump(self, with_organization: bool = False):
         """Dump the object to a primitive dictionary."""
-        user = {
-            'id': str(self.id),
-            'email': self.email,
-            'name': self.name,
-            'role': self.role,
-            'registered_on': self.registered_on.isoformat(),
-        }
+        user = self.dump_row((self.id, self.email, self.name, self.role, self.registered_on))
 
         if with_organization:
             if self.organization:
@@ -117,3 +124,20 @@ class User(peewee.Model):
                 user['organization'] = None
 
         return user
+
+    @staticmethod
+    def dump_row(row: tuple) -> dict:
+        """Dump a row of the ROW columns like dump()."""
+        user_id, email, name, role, registered_on = row
+        return {
+            'id': str(user_id),
+            'email': email,
+            'name': name,
+            'role': role,
+            'registered_on': registered_on.isoformat(),
+        }
+
+    @classmethod
+    def dump_rows(cls, query: peewee.ModelSelect) -> List[dict]:
+        """Dump the users of the query like dump(), selecting only the ROW columns."""
+        return [cls.dump_row(row) for row in query.select(*cls.ROW).tuples().iterator()]
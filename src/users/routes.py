@@ -3,6 +3,9 @@ from http import HTTPStatus
 from cerberus import Validator
 from flask import jsonify, make_response, request
 
+from common import lookups
+from estimations import analytics
+from estimations.models import Estimation, TaskAggregate
 from users.models import User
 from users.schemas import CREATE_USER_SCHEMA
 
@@ -264,6 +267,7 @@ def update_user(user_id: str):
     payload = request.get_json()
     user.update_from(**payload)
     user.save()
+    lookups.invalidate(User, user.id)
 
     return make_response(
         jsonify(user.dump(with_organization=True)),
@@ -293,6 +297,11 @@ def delete_user(user_id: str):
     """
     user = User.lookup(user_id)
 
-    user.delete_instance()
+    # the user's estimations go with it
+    with TaskAggregate.rebuilding(Estimation.user == user.id) as organization_ids:
+        user.delete_instance()
+    lookups.invalidate(User, user.id)
+    for organization_id in organization_ids:
+        analytics.invalidate(organization_id)
 
     return make_response(jsonify(None), HTTPStatus.NO_CONTENT)
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from common import admission
+
+
+@pytest.fixture
+def heavy(monkeypatch):
+    budget = admission.Budget('heavy', limit=1, queue=1, timeout=0.05)
+    monkeypatch.setitem(admission.BUDGETS, 'heavy', budget)
+    return budget
+
+
+def test_unlimited_budget():
+    budget = admission.Budget('unlimited', limit=0, queue=0, timeout=0)
+
+    assert all(budget.acquire() for _ in range(100))
+    budget.release()
+
+
+def test_waiting_requests_take_the_released_slots():
+    budget = admission.Budget('standard', limit=1, queue=1, timeout=5)
+    assert budget.acquire()
+
+    admitted = list()
+    waiting = threading.Thread(target=lambda: admitted.append(budget.acquire()))
+    waiting.start()
+    while not budget.waiting:
+        pass
+    # the queue is full
+    assert not budget.acquire()
+
+    budget.release()
+    waiting.join()
+    assert admitted == [True]
+
+
+def test_waiting_requests_time_out():
+    budget = admission.Budget('standard', limit=1, queue=1, timeout=0.01)
+    assert budget.acquire()
+
+    assert not budget.acquire()
+    assert budget.waiting == 0
+
+
+@pytest.mark.parametrize('blueprint, endpoint, budget', [
+    ('health_app', 'health_app.health_check', 'light'),
+    ('estimations', 'estimations.get_sequence', 'light'),
+    ('estimations', 'estimations.get_task_summary', 'heavy'),
+    ('organizations', 'organizations.export_organization', 'heavy'),
+    ('users', 'users.create_user', 'standard'),
+    (None, None, 'standard'),
+])
+def test_budgets_of_the_endpoints(blueprint, endpoint, budget):
+    assert admission.budget_of(blueprint, endpoint) is admission.BUDGETS[budget]
+
+
+def test_overloaded_requests_are_shed(client, heavy):
+    organization = client.post('/organizations/', json={'name': 'Shed'}).get_json()
+    assert heavy.acquire()
+
+    response = client.get(f'/organizations/{organization["id"]}/export')
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    # other budgets are not affected
+    assert client.get(f'/organizations/{organization["id"]}').status_code == 200
+
+    heavy.release()
+    assert client.get(f'/organizations/{organization["id"]}/export').status_code == 200
+    assert heavy.acquire(), 'the slot was released'
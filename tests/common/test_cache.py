@@ -0,0 +1,137 @@
+import fnmatch
+import os
+import stat
+import time
+from typing import Dict, Optional, Tuple
+
+import pytest
+
+from common.cache import MemoryCache, MISSING, RedisCache, SharedCache
+
+
+class StandInRedis:
+    """The part of the redis-py client used by RedisCache, in memory."""
+
+    def __init__(self):
+        self.values: Dict[str, Tuple[bytes, Optional[float]]] = dict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        value, expires = self.values.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            return None
+        return value
+
+    def set(self, key: str, value, px: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        if nx and self.get(key) is not None:
+            return None
+        self.values[key] = (value, None if px is None else time.monotonic() + px / 1000)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    def incr(self, key: str) -> int:
+        value = int(self.get(key) or 0) + 1
+        self.values[key] = (str(value).encode(), None)
+        return value
+
+    def scan_iter(self, pattern: str):
+        return [key for key in list(self.values) if fnmatch.fnmatch(key, pattern)]
+
+
+@pytest.fixture(params=['memory', 'shared', 'redis'])
+def cache(request, tmp_path):
+    if request.param == 'shared':
+        return SharedCache(str(tmp_path / 'cache.db'), max_entries=3)
+    if request.param == 'redis':
+        return RedisCache(StandInRedis())
+    return MemoryCache(max_entries=3)
+
+
+def test_set_get_and_delete(cache):
+    assert cache.get('report') is MISSING
+
+    cache.set('report', {'points': 5.0})
+    cache.set('nothing', None)
+
+    assert cache.get('report') == {'points': 5.0}
+    assert cache.get('nothing') is None
+    cache.delete('report')
+    assert cache.get('report') is MISSING
+
+
+def test_entries_expire(cache):
+    cache.set('report', {'points': 5.0}, ttl=0.01)
+    cache.set('forever', 1)
+    time.sleep(0.02)
+
+    assert cache.get('report') is MISSING
+    assert cache.get('forever') == 1
+
+
+def test_add_only_sets_missing_keys(cache):
+    assert cache.add('lease', 'first', ttl=0.01)
+    assert not cache.add('lease', 'second')
+    assert cache.get('lease') == 'first'
+
+    time.sleep(0.02)
+    assert cache.add('lease', 'third')
+
+
+def test_versions_invalidate_the_namespace(cache):
+    key = cache.key('organizations:1:sessions', 'analytics')
+    cache.set(key, {'points': 5.0})
+
+    assert cache.invalidate('organizations:1:sessions') == 1
+    assert cache.version('organizations:1:sessions') == 1
+    assert cache.version('organizations:2:sessions') == 0
+    assert cache.get(cache.key('organizations:1:sessions', 'analytics')) is MISSING
+
+    cache.clear()
+    assert cache.version('organizations:1:sessions') == 0
+
+
+@pytest.mark.parametrize('backend', [MemoryCache, SharedCache])
+def test_entries_are_evicted(backend, tmp_path):
+    cache = backend(max_entries=3) if backend is MemoryCache else backend(str(tmp_path / 'cache.db'), max_entries=3)
+    for number in range(4):
+        cache.set(f'key {number}', number)
+
+    assert cache.get('key 0') is MISSING
+    assert [cache.get(f'key {number}') for number in range(1, 4)] == [1, 2, 3]
+
+
+def test_the_shared_cache_is_shared(tmp_path):
+    first, second = SharedCache(str(tmp_path / 'cache.db')), SharedCache(str(tmp_path / 'cache.db'))
+
+    first.set('report', {'points': 5.0})
+    second.invalidate('organizations:1:sessions')
+
+    assert second.get('report') == {'points': 5.0}
+    assert first.version('organizations:1:sessions') == 1
+
+
+def test_the_shared_cache_file_is_private(tmp_path):
+    path = tmp_path / 'cache' / 'cache.db'
+
+    SharedCache(str(path)).set('report', {'points': 5.0})
+
+    assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+
+def test_shared_cache_files_of_others_are_refused(tmp_path, monkeypatch):
+    SharedCache(str(tmp_path / 'cache.db')).set('report', {'points': 5.0})
+
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(tmp_path).st_uid + 1)
+    with pytest.raises(PermissionError):
+        SharedCache(str(tmp_path / 'cache.db')).get('report')
+
+
+def test_shared_cache_directories_writable_by_others_are_refused(tmp_path):
+    directory = tmp_path / 'cache'
+    directory.mkdir()
+    directory.chmod(0o777)
+
+    with pytest.raises(PermissionError):
+        SharedCache(str(directory / 'cache.db')).get('report')
@@ -0,0 +1,66 @@
+import gzip
+import json
+
+import pytest
+
+from common import compression
+from settings import app as settings
+
+
+@pytest.fixture
+def organization_id(client):
+    organization = client.post('/organizations/', json={'name': 'Compressed'}).get_json()
+    for number in range(30):
+        client.post('/users/', json={
+            'email': f'user_{number}@example.com',
+            'name': f'User {number}',
+            'password': 'pwd',
+            'organization': organization['id'],
+        })
+    return organization['id']
+
+
+def test_large_responses_are_compressed(client, organization_id, monkeypatch):
+    monkeypatch.setattr(compression, 'CODECS', {'gzip': compression.gzip_compressor})
+
+    response = client.get(f'/organizations/{organization_id}', headers={'Accept-Encoding': 'br;q=1.0, gzip;q=0.8'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert int(response.headers['Content-Length']) == len(response.data)
+    assert len(json.loads(gzip.decompress(response.data))['users']) == 30
+
+
+@pytest.mark.parametrize('accept_encoding', [None, 'identity', 'gzip;q=0', 'compress'])
+def test_not_accepted_encodings(client, organization_id, accept_encoding):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+
+    response = client.get(f'/organizations/{organization_id}', headers=headers)
+
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.get_json()['users']) == 30
+
+
+def test_small_responses_are_not_compressed(client, organization_id, monkeypatch):
+    monkeypatch.setattr(settings, 'COMPRESSION_MIN_SIZE', 1024 * 1024)
+
+    response = client.get(f'/organizations/{organization_id}', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streamed_responses_are_compressed(client, organization_id):
+    response = client.get(f'/organizations/{organization_id}/export', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    records = [json.loads(line) for line in gzip.decompress(response.data).splitlines()]
+    assert records[0]['type'] == 'organization'
+
+
+@pytest.mark.skipif(compression.brotli is None, reason='brotli is not installed')
+def test_brotli_is_preferred(client, organization_id):
+    response = client.get(f'/organizations/{organization_id}', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert len(json.loads(compression.brotli.decompress(response.data))['users']) == 30
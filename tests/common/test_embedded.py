@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import pytest
+
+from common import db
+from common.migrations import manager
+
+
+MIGRATIONS = Path(__file__).parents[2] / 'migrations'
+
+
+@pytest.fixture
+def embedded(tmp_path):
+    database = db.RoutedSqliteDatabase(str(tmp_path / 'estimations.db'),
+                                       pragmas=db.SQLITE_PRAGMAS,
+                                       check_same_thread=False)
+    yield database
+    database.close_all()
+
+
+def test_embedded_database_pragmas(embedded):
+    assert embedded.journal_mode == 'wal'
+    assert embedded.foreign_keys == 1
+
+
+def test_migrations_are_portable_to_sqlite(embedded):
+    migrations = manager(embedded, directory=str(MIGRATIONS))
+
+    migrations.upgrade()
+    tables = set(embedded.get_tables())
+    assert {'organizations', 'users', 'sessions', 'tasks', 'estimations', 'task_aggregates'} <= tables
+    assert 'tasks_session_name' in {index.name for index in embedded.get_indexes('tasks')}
+
+    migrations.downgrade('0001_organizations_table')
+    assert embedded.get_tables() == ['migration_history']
+
+
+def test_writes_take_the_lock_when_they_begin(embedded, monkeypatch):
+    statements = list()
+    execute_sql = db.peewee.SqliteDatabase.execute_sql
+
+    def recording_execute_sql(self, sql, *args, **kwargs):
+        statements.append(sql)
+        return execute_sql(self, sql, *args, **kwargs)
+
+    monkeypatch.setattr(db.peewee.SqliteDatabase, 'execute_sql', recording_execute_sql)
+
+    with embedded.atomic():
+        pass
+    embedded.use_replica()
+    with embedded.atomic():
+        pass
+    embedded.use_replica(False)
+
+    assert [sql for sql in statements if sql.startswith('BEGIN')] == ['BEGIN IMMEDIATE', 'BEGIN']
@@ -0,0 +1,53 @@
+import pytest
+from playhouse.test_utils import count_queries
+
+from common import identity
+from estimations.models import Estimation, Session, Task, Value
+from organizations.models import Organization
+from users.models import User
+
+
+@pytest.fixture
+def user(organization):
+    return User.create(email='user@example.com', name='User', password='pwd', organization=organization)
+
+
+def test_lookups_are_fetched_once_per_scope(session, user):
+    with identity.scope(), count_queries() as counter:
+        assert Session.lookup(str(session.id)) is Session.lookup(session.id)
+        found = User.lookup(str(user.id))
+
+        assert found.belongs_to_organization(Session.lookup(session.id).organization)
+        assert found.organization is Session.lookup(session.id).organization
+        assert Organization.lookup(session.organization_id) is found.organization
+
+    # the session, the user and the organization
+    assert counter.count == 3
+
+
+def test_foreign_keys_go_through_the_identity_map(session, user, sequence):
+    task = Task.create(session=session, name='TASK-1')
+    Estimation.create(task=task, user=user, value=Value.get((Value.sequence == sequence) & (Value.value == 3)))
+
+    with identity.scope():
+        looked_up = Task.lookup(str(task.id))
+        estimation = Estimation.get()
+
+        with count_queries() as counter:
+            assert estimation.task is looked_up
+            assert looked_up.session is Session.lookup(session.id)
+        assert counter.count == 1
+
+
+def test_nothing_is_kept_outside_of_a_scope(organization):
+    with count_queries() as counter:
+        assert Organization.lookup(organization.id) is not Organization.lookup(organization.id)
+
+    assert counter.count == 2
+
+
+def test_deleted_instances_are_forgotten(organization):
+    with identity.scope():
+        Organization.lookup(organization.id).delete_instance()
+
+        assert identity.get(Organization, organization.id) is None
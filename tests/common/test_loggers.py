@@ -0,0 +1,82 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from common import loggers
+from common.loggers import logger
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    yield stream
+    loggers.install()
+
+
+def test_records_are_written_by_the_listener(stream):
+    loggers.install(stream, log_format='json')
+
+    logger.warning('Task(%s) aggregate drifted', 'TASK-1', extra={'session': 'S-1'})
+    loggers.uninstall()
+
+    record = json.loads(stream.getvalue())
+    assert record['level'] == 'WARNING'
+    assert record['message'] == 'Task(TASK-1) aggregate drifted'
+    assert record['session'] == 'S-1'
+
+
+def test_messages_are_not_formatted_below_the_level(stream):
+    class Expensive:
+        def __str__(self):
+            raise AssertionError('formatted')
+
+    loggers.install(stream, level='INFO')
+
+    logger.debug('%s', Expensive())
+    loggers.uninstall()
+
+    assert stream.getvalue() == ''
+
+
+def test_debug_records_are_sampled(stream):
+    loggers.install(stream, level='DEBUG', sample_rate=0)
+
+    logger.debug('Sampled out')
+    logger.info('Kept')
+    loggers.uninstall()
+
+    assert stream.getvalue().splitlines()[0].endswith('INFO - Kept')
+    assert 'Sampled out' not in stream.getvalue()
+
+
+def test_a_full_queue_drops_records_instead_of_blocking(stream):
+    class BlockedStream(io.StringIO):
+        def write(self, text):
+            released.wait()
+            return super().write(text)
+
+    released = threading.Event()
+    handler = loggers.install(BlockedStream(), queue_size=1)
+
+    for number in range(5):
+        logger.info('Record %s', number)
+
+    # the first record is being written, the second is queued
+    assert handler.dropped >= 3
+    released.set()
+    loggers.uninstall()
+
+
+def test_the_arguments_are_formatted_when_logged(stream):
+    loggers.install(stream)
+    values = ['1']
+
+    logger.info('Values %s', values)
+    values.append('2')
+    loggers.uninstall()
+
+    assert stream.getvalue().rstrip().endswith("Values ['1']")
+    assert logging.getLogger('peewee').level == logging.INFO
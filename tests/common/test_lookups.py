@@ -0,0 +1,103 @@
+import pytest
+from playhouse.test_utils import count_queries
+from prometheus_client import REGISTRY
+
+from common import lookups
+from common.cache import cache
+from organizations.models import Organization
+from settings import cache as settings
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(monkeypatch):
+    monkeypatch.setattr(settings, 'LOOKUP_TTL', 60)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def lookups_count(model: str, result: str) -> float:
+    return REGISTRY.get_sample_value('model_lookups_total', {'model': model, 'result': result}) or 0
+
+
+def test_lookups_are_cached(organization):
+    hits, misses = lookups_count('Organization', 'hit'), lookups_count('Organization', 'miss')
+
+    with count_queries() as counter:
+        first = Organization.lookup(organization.id)
+        second = Organization.lookup(str(organization.id))
+
+    assert counter.count == 1
+    assert first is not second
+    assert second.name == 'Organization' and not second.is_dirty()
+    assert lookups_count('Organization', 'hit') == hits + 1
+    assert lookups_count('Organization', 'miss') == misses + 1
+
+
+def test_lookups_are_not_cached_without_ttl(organization, monkeypatch):
+    monkeypatch.setattr(settings, 'LOOKUP_TTL', 0)
+
+    with count_queries() as counter:
+        Organization.lookup(organization.id)
+        Organization.lookup(organization.id)
+
+    assert counter.count == 2
+
+
+def test_passwords_are_not_cached(organization):
+    user = User.create(email='user@example.com', name='User', password='hashed', organization=organization)
+    User.lookup(user.id)
+
+    cached = cache.get(cache.key(lookups._namespace(User, user.id), 'row'))
+    assert set(cached) == {'id', 'email', 'name', 'role', 'registered_on', 'organization'}
+    looked_up = User.lookup(user.id)
+    assert looked_up.password is None and looked_up.organization_id == organization.id
+
+    looked_up.update_from(name='Renamed')
+    looked_up.save()
+    assert User.get_by_id(user.id).password == 'hashed'
+
+
+def test_invalidated_lookups_are_fetched_again(organization):
+    Organization.lookup(organization.id)
+    Organization.update(name='Renamed').execute()
+
+    lookups.invalidate(Organization, organization.id)
+
+    assert Organization.lookup(organization.id).name == 'Renamed'
+
+
+def test_rows_written_while_fetched_are_not_cached(organization):
+    def fetch():
+        row = Organization.get_by_id(organization.id)
+        Organization.update(name='Renamed').execute()
+        lookups.invalidate(Organization, organization.id)
+        return row
+
+    assert lookups.lookup(Organization, organization.id, fetch, Organization.CACHED).name == 'Organization'
+    assert Organization.lookup(organization.id).name == 'Renamed'
+
+
+def test_write_routes_invalidate_the_lookups(client):
+    organization = client.post('/organizations/', json={'name': 'Organization'}).get_json()
+    user = client.post('/users/', json={'email': 'user@example.com', 'name': 'User', 'password': 'pwd'}).get_json()
+    assert client.get(f'/users/{user["id"]}').get_json()['name'] == 'User'
+    assert client.get(f'/users/{user["id"]}/organization').status_code == 404
+
+    client.patch(f'/users/{user["id"]}', json={'name': 'Renamed'})
+    assert client.get(f'/users/{user["id"]}').get_json()['name'] == 'Renamed'
+
+    client.post(f'/organizations/{organization["id"]}/users', json={'user': {'id': user['id']}})
+    assert client.get(f'/users/{user["id"]}/organization').get_json()['name'] == 'Organization'
+
+    client.patch(f'/organizations/{organization["id"]}', json={'name': 'Renamed'})
+    assert client.get(f'/organizations/{organization["id"]}').get_json()['name'] == 'Renamed'
+
+    client.delete(f'/organizations/{organization["id"]}/users/{user["id"]}')
+    assert client.get(f'/users/{user["id"]}/organization').status_code == 404
+
+    client.delete(f'/users/{user["id"]}')
+    assert client.get(f'/users/{user["id"]}').status_code == 404
+    client.delete(f'/organizations/{organization["id"]}')
+    assert client.get(f'/organizations/{organization["id"]}').status_code == 404
@@ -0,0 +1,117 @@
+import fcntl
+import subprocess
+import sys
+from pathlib import Path
+
+from prometheus_client import CollectorRegistry, multiprocess, REGISTRY
+
+from common import db, metrics_files
+from organizations.models import Organization
+
+
+SRC = Path(__file__).parents[2] / 'src'
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_query_time_is_accumulated(app_database):
+    db.reset_query_time()
+    assert db.query_time() == 0
+
+    Organization.create(name='Timed')
+    Organization.select().count()
+
+    assert db.query_time() > 0
+    db.reset_query_time()
+    assert db.query_time() == 0
+
+
+def test_requests_are_measured_per_endpoint(client):
+    labels = dict(blueprint='organizations', endpoint='organizations.create_organization', method='POST')
+    requests = sample('http_request_duration_seconds_count', **labels)
+    created = sample('http_requests_total', status='201', **labels)
+    invalid = sample('http_requests_total', status='400', **labels)
+    unmatched = sample('http_requests_total', blueprint='app', endpoint='unmatched', method='GET', status='404')
+
+    assert client.post('/organizations/', json={'name': 'Measured'}).status_code == 201
+    assert client.post('/organizations/', json={}).status_code == 400
+    assert client.get('/nowhere').status_code == 404
+
+    assert sample('http_request_duration_seconds_count', **labels) == requests + 2
+    assert sample('http_request_db_duration_seconds_sum', **labels) > 0
+    assert sample('http_requests_total', status='201', **labels) == created + 1
+    assert sample('http_requests_total', status='400', **labels) == invalid + 1
+    assert sample('http_requests_total', blueprint='app', endpoint='unmatched', method='GET',
+                  status='404') == unmatched + 1
+    assert sample('http_requests_in_flight') == 0
+
+
+def test_metrics_exposition(client):
+    client.get('/selfz/healthz')
+
+    response = client.get('/selfz/metrics')
+
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    assert b'http_request_duration_seconds_bucket{blueprint="health_app"' in response.data
+
+
+WORKER = """
+import os
+
+from common import metrics
+
+labels = ('estimations', 'estimations.get_session', 'GET')
+metrics.IN_FLIGHT.inc()
+metrics.REQUESTS.labels(*labels, '200').inc(3)
+metrics.REQUEST_DURATION.labels(*labels).observe(0.2)
+print(os.getpid())
+"""
+
+
+def test_workers_metrics_are_aggregated(tmp_path):
+    for _ in range(2):
+        worker = subprocess.run([sys.executable, '-c', WORKER], check=True, stdout=subprocess.PIPE,
+                                env={'PYTHONPATH': str(SRC), 'prometheus_multiproc_dir': str(tmp_path)})
+        multiprocess.mark_process_dead(int(worker.stdout), str(tmp_path))
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+    labels = dict(blueprint='estimations', endpoint='estimations.get_session', method='GET')
+
+    assert registry.get_sample_value('http_requests_total', dict(status='200', **labels)) == 6
+    assert registry.get_sample_value('http_request_duration_seconds_count', labels) == 2
+    # the workers exited, their requests in flight are not live anymore
+    assert not registry.get_sample_value('http_requests_in_flight')
+
+
+def test_dead_workers_files_are_compacted(tmp_path):
+    pids = []
+    for _ in range(3):
+        worker = subprocess.run([sys.executable, '-c', WORKER], check=True, stdout=subprocess.PIPE,
+                                env={'PYTHONPATH': str(SRC), 'prometheus_multiproc_dir': str(tmp_path)})
+        pids.append(int(worker.stdout))
+    live = pids[-1]
+    for pid in pids[:-1]:
+        multiprocess.mark_process_dead(pid, str(tmp_path))
+
+    # a compaction is skipped while the files are read
+    with metrics_files.locked(str(tmp_path), fcntl.LOCK_SH):
+        assert metrics_files.compact(str(tmp_path), [live]) == 0
+
+    assert metrics_files.compact(str(tmp_path), [live]) == 4
+    assert metrics_files.compact(str(tmp_path), [live]) == 0
+
+    files = {path.name for path in tmp_path.glob('*.db')}
+    assert files == {'counter_archive.db', f'counter_{live}.db', f'gauge_livesum_{live}.db', 'histogram_archive.db',
+                     f'histogram_{live}.db'}
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(tmp_path))
+    labels = dict(blueprint='estimations', endpoint='estimations.get_session', method='GET')
+    assert registry.get_sample_value('http_requests_total', dict(status='200', **labels)) == 9
+    assert registry.get_sample_value('http_request_duration_seconds_count', labels) == 3
+    assert registry.get_sample_value('http_request_duration_seconds_bucket', dict(le='0.25', **labels)) == 3
+    assert registry.get_sample_value('http_requests_in_flight') == 1
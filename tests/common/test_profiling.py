@@ -0,0 +1,46 @@
+import pstats
+
+import pytest
+
+from common import profiling
+from settings import app as settings
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'PROFILE_SECRET', 'secret')
+    monkeypatch.setattr(settings, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    return tmp_path / 'profiles'
+
+
+def test_requests_are_not_profiled_by_default(client, profiles):
+    response = client.post('/organizations/', json={'name': 'Unprofiled'}, headers={'X-Profile': 'wrong'})
+
+    assert response.status_code == 201
+    assert 'X-Profile-Summary' not in response.headers
+    assert not profiles.exists()
+
+
+@pytest.mark.parametrize('options', [
+    {'headers': {'X-Profile': 'secret'}},
+    {'query_string': {'profile': 'secret'}},
+])
+def test_requests_with_the_secret_are_profiled(client, profiles, options):
+    response = client.post('/organizations/', json={'name': 'Profiled'}, **options)
+
+    assert response.status_code == 201
+    assert 'create_organization' in response.headers['X-Profile-Summary']
+    profile = profiles / response.headers['X-Profile-File']
+    assert 'organizations.create_organization' in profile.name
+    assert pstats.Stats(str(profile)).total_calls > 0
+
+
+def test_one_in_n_requests_is_profiled(client, profiles, monkeypatch):
+    monkeypatch.setattr(settings, 'PROFILE_SECRET', None)
+    monkeypatch.setattr(settings, 'PROFILE_SAMPLE_EVERY', 3)
+    monkeypatch.setattr(profiling, '_requests', iter(range(1, 100)))
+
+    responses = [client.post('/organizations/', json={'name': f'Sampled {number}'}) for number in range(6)]
+
+    assert ['X-Profile-Summary' in response.headers for response in responses] == [False, False, True] * 2
+    assert len(list(profiles.iterdir())) == 2
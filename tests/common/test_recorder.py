@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from common import recorder
+from settings import app as settings
+
+
+@pytest.fixture
+def records(tmp_path, monkeypatch):
+    path = tmp_path / 'records.jsonl'
+    monkeypatch.setattr(settings, 'RECORD_PATH', str(path))
+
+    def read():
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    return read
+
+
+def test_requests_are_not_recorded_by_default(client, tmp_path):
+    assert client.post('/organizations/', json={'name': 'Unrecorded'}).status_code == 201
+
+    assert not list(tmp_path.glob('*.jsonl'))
+
+
+def test_requests_are_recorded(client, records):
+    organization = client.post('/organizations/', json={'name': 'Recorded'}, headers={
+        'Accept-Encoding': 'gzip',
+        'Authorization': 'Bearer credentials',
+    }).get_json()
+    client.get(f'/organizations/{organization["id"]}', query_string={'profile': 'secret', 'with': 'users'})
+
+    created, read = records()
+    assert created['method'] == 'POST'
+    assert created['path'] == '/organizations/'
+    assert created['endpoint'] == 'organizations.create_organization'
+    assert created['headers'] == {'Accept-Encoding': 'gzip'}
+    assert created['body'] == {'name': 'Recorded'}
+    assert created['status'] == 201
+    assert created['ids'] == [organization['id']]
+    assert created['duration'] > 0
+
+    assert read['path'] == f'/organizations/{organization["id"]}'
+    assert read['query'] == 'profile=%2A%2A%2A&with=users'
+    assert 'body' not in read and 'ids' not in read
+    assert created['at'] <= read['at']
+
+
+def test_sensitive_values_are_masked(client, records):
+    organization = client.post('/organizations/', json={'name': 'Recorded'}).get_json()
+    user = client.post('/users/', json={
+        'email': 'user@example.com',
+        'name': 'User',
+        'password': 'hunter2',
+        'organization': organization['id'],
+    }).get_json()
+    client.patch(f'/users/{user["id"]}', json={'email': 'user@example.com', 'new_password': 'hunter3'},
+                 query_string={'api_key': 'key'})
+
+    created, patched = records()[-2:]
+    assert created['status'] == 201
+    assert created['body']['password'] == recorder.MASK
+    assert patched['body']['new_password'] == recorder.MASK
+    assert patched['query'] == 'api_key=%2A%2A%2A'
+    assert 'hunter' not in json.dumps(records())
+
+
+def test_personal_values_are_hashed(client, records):
+    client.post('/organizations/', json={'name': 'Recorded'})
+    client.post('/users/', json={'email': 'user@example.com', 'name': 'Jane Doe', 'password': 'pwd'})
+    client.post('/users/', json={'email': 'other@example.com', 'name': 'Jane Doe', 'password': 'pwd'})
+
+    organization, first, second = (record['body'] for record in records())
+    assert organization['name'] == 'Recorded'
+    assert 'user@example.com' not in json.dumps(first) and 'Jane' not in json.dumps(first)
+    # the replay creates the users with the hashed emails, distinct and valid ones
+    assert first['email'] != second['email'] and first['email'].endswith('@example.com')
+    assert first['name'] == second['name'] != 'Jane Doe'
+
+
+def test_ids_are_depth_first():
+    payload = {'id': 'a', 'organization': {'id': 'b'}, 'users': [{'id': 'c'}, {'id': 'd', 'value': {'id': 1}}]}
+
+    assert list(recorder.ids(payload)) == ['a', 'b', 'c', 'd']
+
+
+def test_unparsable_lines_are_skipped(tmp_path):
+    path = tmp_path / 'records.jsonl'
+    path.write_text('{"method": "GET"}\n{"method": \n{"method": "POST"}\n')
+
+    assert [record['method'] for record in recorder.read(str(path))] == ['GET', 'POST']
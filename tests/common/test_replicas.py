@@ -0,0 +1,88 @@
+from unittest import mock
+
+import peewee
+import pytest
+from conftest import MODELS
+
+from common import db
+from organizations.models import Organization
+
+
+class RoutedSqliteDatabase(db.ReplicaRouting, peewee.SqliteDatabase):
+    pass
+
+
+@pytest.fixture
+def replica(tmp_path):
+    replica = peewee.SqliteDatabase(str(tmp_path / 'replica.db'))
+    with replica.bind_ctx(MODELS):
+        replica.create_tables(MODELS)
+    yield replica
+    replica.close()
+
+
+@pytest.fixture
+def primary(tmp_path, replica):
+    """Bind all the models to a SQLite primary file routing its reads to a SQLite replica file."""
+    primary = RoutedSqliteDatabase(str(tmp_path / 'primary.db'), replica=replica)
+
+    with primary.bind_ctx(MODELS), \
+            mock.patch('common.db.database', primary), \
+            mock.patch('organizations.models.database', primary), \
+            mock.patch('users.models.database', primary), \
+            mock.patch('estimations.models.sequences.database', primary), \
+            mock.patch('estimations.models.sessions.database', primary):
+        primary.create_tables(MODELS)
+        primary.close()
+        yield primary
+        primary.use_replica(False)
+
+    primary.close()
+
+
+@pytest.fixture
+def organization(primary, replica):
+    """An organization named after the database it is read from."""
+    organization = Organization.create(name='Primary')
+    with replica.bind_ctx([Organization]):
+        Organization.insert(id=organization.id, name='Replica', registered_on=organization.registered_on).execute()
+    primary.close()
+    return organization
+
+
+def test_reads_are_routed_in_read_only_mode(primary, organization):
+    assert Organization.get_by_id(organization.id).name == 'Primary'
+
+    primary.use_replica()
+    assert Organization.get_by_id(organization.id).name == 'Replica'
+
+    with primary.atomic():
+        assert Organization.get_by_id(organization.id).name == 'Primary'
+    with primary.primary():
+        assert Organization.get_by_id(organization.id).name == 'Primary'
+
+    created = Organization.create(name='Created')
+    with primary.primary():
+        assert Organization.get_or_none(Organization.id == created.id) is not None
+
+
+def test_read_only_requests_read_from_the_replica_until_the_client_writes(primary, organization):
+    from run import app
+
+    client = app.test_client()
+
+    response = client.get(f'/organizations/{organization.id}')
+    assert response.get_json()['name'] == 'Replica'
+
+    response = client.post('/organizations/', json={'name': 'Another Organization'})
+    assert response.status_code == 201
+    assert 'read_primary=1' in response.headers['Set-Cookie']
+
+    response = client.get(f'/organizations/{organization.id}')
+    assert response.get_json()['name'] == 'Primary'
+
+
+def test_is_read():
+    assert db.is_read('  select * from tasks')
+    assert not db.is_read('SELECT * FROM tasks FOR UPDATE')
+    assert not db.is_read('INSERT INTO tasks VALUES (1)')
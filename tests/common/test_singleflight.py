@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from common.cache import SharedCache
+from common.singleflight import Group
+
+
+KEY = 'GET /estimations/sessions/S/tasks/T/summary?'
+
+
+@pytest.fixture
+def computation():
+    """A computation blocked until released, counting its calls."""
+    release = threading.Event()
+    calls = list()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {'computed': len(calls)}
+
+    compute.calls = calls
+    compute.release = release
+    return compute
+
+
+def start(count: int, target, results: list):
+    threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_calls_share_the_computation(computation):
+    group = Group()
+    results = list()
+    threads = start(1, lambda: group.do(KEY, computation), results)
+    while not computation.calls:
+        pass
+    flight = group._flights[(KEY, None)]
+
+    threads += start(4, lambda: group.do(KEY, computation), results)
+    while flight.followers < 4:
+        pass
+    computation.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(computation.calls) == 1
+    assert results == [{'computed': 1}] * 5
+    assert group._flights == {}
+
+
+def test_new_versions_are_computed_again(computation):
+    group = Group()
+    computation.release.set()
+
+    assert group.do(KEY, computation, version=1) == {'computed': 1}
+    assert group.do(KEY, computation, version=2) == {'computed': 2}
+
+
+def test_errors_are_shared():
+    group = Group()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError('failed')
+
+    def call():
+        try:
+            return group.do(KEY, fail)
+        except ValueError as e:
+            return e
+
+    results = list()
+    threads = start(3, call, results)
+    while KEY not in [key for key, _ in group._flights] or group._flights[(KEY, None)].followers < 2:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert [str(result) for result in results] == ['failed'] * 3
+    assert group._flights == {}
+
+
+def test_workers_share_the_result_through_the_cache(tmp_path, computation):
+    first = Group(shared=SharedCache(str(tmp_path / 'cache.db')))
+    second = Group(shared=SharedCache(str(tmp_path / 'cache.db')))
+    results = list()
+    threads = start(1, lambda: first.do(KEY, computation), results)
+    while not computation.calls:
+        pass
+
+    threads += start(1, lambda: second.do(KEY, computation), results)
+    # the second worker polls the lease
+    time.sleep(0.1)
+    computation.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(computation.calls) == 1
+    assert results == [{'computed': 1}] * 2
+    # the flight is over, the next call leads a new one
+    assert second.do(KEY, computation) == {'computed': 2}
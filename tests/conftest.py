@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+from unittest import mock
+
+import peewee
+import pytest
+
+from common import db
+from estimations.models import (
+    Estimation,
+    EstimationSummary,
+    Sequence,
+    Session,
+    SessionMember,
+    Task,
+    TaskAggregate,
+    Value,
+)
+from organizations.models import Organization
+from users.models import User
+
+
+MODELS = [
+    Organization,
+    User,
+    Sequence,
+    Value,
+    Session,
+    SessionMember,
+    Task,
+    Estimation,
+    EstimationSummary,
+    TaskAggregate,
+]
+
+
+@contextmanager
+def bound_to(database: peewee.Database):
+    """Bind all the models, and the database of their modules, to the given database."""
+    with database.bind_ctx(MODELS), \
+            mock.patch('organizations.models.database', database), \
+            mock.patch('users.models.database', database), \
+            mock.patch('estimations.models.sequences.database', database), \
+            mock.patch('estimations.models.sessions.database', database):
+        yield database
+
+
+@pytest.fixture
+def sqlite_database():
+    """Bind all the models to an in-memory SQLite database."""
+    database = peewee.SqliteDatabase(':memory:', pragmas={'foreign_keys': 1})
+
+    with bound_to(database):
+        database.create_tables(MODELS)
+        yield database
+
+    database.close()
+
+
+@pytest.fixture
+def bind():
+    """Bind all the models to another database within a block, e.g., an empty one to import into."""
+    return bound_to
+
+
+@pytest.fixture
+def organization(sqlite_database):
+    return Organization.create(name='Organization')
+
+
+@pytest.fixture
+def sequence(sqlite_database):
+    sequence = Sequence.create(name='Fibonacci')
+    Value.from_list([
+        {'value': 0.0},
+        {'value': 1.0},
+        {'value': 2.0},
+        {'value': 3.0},
+        {'value': 5.0},
+        {'name': '?'},
+        {'name': 'Coffee'},
+    ], sequence)
+    return sequence
+
+
+@pytest.fixture
+def session(organization, sequence):
+    return Session.create(name='Session', organization=organization, sequence=sequence)
+
+
+@pytest.fixture
+def app_database(tmp_path):
+    """Bind all the models to a SQLite file built the way the application builds its database."""
+    database = db.RoutedSqliteDatabase(str(tmp_path / 'estimations.db'), pragmas=db.SQLITE_PRAGMAS,
+                                       check_same_thread=False)
+
+    with bound_to(database), mock.patch('common.db.database', database):
+        database.create_tables(MODELS)
+        database.close()
+        yield database
+
+    database.close_all()
+
+
+@pytest.fixture
+def client(app_database):
+    from run import app
+
+    return app.test_client()
@@ -0,0 +1,140 @@
+"""The task aggregates must always match a full recomputation of the estimations."""
+import random
+
+import pytest
+
+from estimations.models import Estimation, Sequence, Session, Task, TaskAggregate, Value
+from organizations.models import Organization
+from users.models import User
+
+
+@pytest.fixture
+def users(organization):
+    return [User.create(email=f'user_{i}@example.com', name=f'User {i}', password='pwd',
+                        organization=organization) for i in range(5)]
+
+
+@pytest.fixture
+def tasks(session):
+    return [Task.create(session=session, name=f'TASK-{i}') for i in range(4)]
+
+
+def assert_consistent(tasks):
+    assert TaskAggregate.check() == []
+
+    for task in tasks:
+        aggregate = task.aggregate
+        assert aggregate.mean == task.mean_estimation
+        assert aggregate.consensus_met == task.consensus_met
+        assert (aggregate.non_numeric_count > 0) == task.has_non_numeric_estimations()
+        assert aggregate.count == task.estimations.count()
+
+
+def test_aggregates_follow_the_votes(sequence, users, tasks):
+    randomizer = random.Random(31)
+    values = list(sequence.values)
+
+    for _ in range(60):
+        task, user, value = randomizer.choice(tasks), randomizer.choice(users), randomizer.choice(values)
+        Estimation.estimate(task, user, value)
+
+    assert_consistent(tasks)
+
+
+def test_aggregates_follow_the_batch_votes(session, sequence, users, tasks):
+    randomizer = random.Random(32)
+    payloads = [{'value': 1}, {'value': 2}, {'value': 5}, {'name': '?'}, {'name': 'Coffee'}]
+
+    for _ in range(15):
+        items = [{'task': task.name, 'value': randomizer.choice(payloads)}
+                 for task in randomizer.sample(tasks, 3)]
+        Estimation.estimate_many(session, randomizer.choice(users), items)
+
+    assert_consistent(tasks)
+
+
+def test_changing_a_vote_subtracts_the_previous_value(sequence, users, tasks):
+    task = tasks[0]
+    three = Value.get((Value.sequence == sequence) & (Value.value == 3))
+    coffee = Value.get((Value.sequence == sequence) & (Value.name == 'Coffee'))
+
+    Estimation.estimate(task, users[0], coffee)
+    Estimation.estimate(task, users[1], three)
+    _, created = Estimation.estimate(task, users[0], three)
+
+    assert not created
+    aggregate = task.aggregate
+    assert (aggregate.count, aggregate.numeric_sum, aggregate.non_numeric_count) == (2, 6, 0)
+    assert aggregate.value_counts == {str(three.id): 2}
+    assert aggregate.consensus_met
+    assert_consistent(tasks)
+
+
+def test_missing_aggregates_are_built_from_the_estimations(sequence, users, tasks):
+    task = tasks[0]
+    values = list(sequence.values)
+    Estimation.create(task=task, user=users[0], value=values[1])
+
+    assert TaskAggregate.get_or_none(TaskAggregate.task == task) is None
+    assert task.aggregate.count == 1
+
+    Estimation.estimate(task, users[1], values[2])
+
+    assert TaskAggregate.get(TaskAggregate.task == task).count == 2
+    assert_consistent(tasks)
+
+
+def test_rebuild_repairs_drifted_aggregates(sequence, users, tasks):
+    values = list(sequence.values)
+    for task in tasks:
+        Estimation.estimate(task, users[0], values[2])
+        Estimation.estimate(task, users[1], values[3])
+
+    Estimation.delete().where(Estimation.user == users[0]).execute()
+    assert sorted(TaskAggregate.check()) == sorted(task.id for task in tasks)
+
+    assert TaskAggregate.rebuild() == len(tasks)
+    assert_consistent(tasks)
+
+
+@pytest.fixture
+def estimated_task(client, app_database):
+    organization = Organization.create(name='Organization')
+    sequence = Sequence.create(name='Fibonacci')
+    values = Value.from_list([{'value': 1}, {'value': 3}, {'value': 5}, {'name': '?'}], sequence)
+    session = Session.create(name='Session', organization=organization, sequence=sequence)
+    task = Task.create(session=session, name='TASK-1')
+    users = [User.create(email=f'user_{i}@example.com', name=f'User {i}', password='pwd',
+                         organization=organization) for i in range(3)]
+    for user, value in zip(users, values):
+        Estimation.estimate(task, user, value)
+    # the requests open their own connection
+    app_database.close()
+    return task, users, values
+
+
+def summary_of(client, task):
+    return client.get(f'/estimations/sessions/{task.session_id}/tasks/{task.id}/summary').get_json()
+
+
+def test_deleting_a_user_rebuilds_the_aggregates_of_its_estimations(client, app_database, estimated_task):
+    task, users, _ = estimated_task
+    assert summary_of(client, task)['mean'] == 3
+
+    assert client.delete(f'/users/{users[2].id}').status_code == 204
+
+    assert summary_of(client, task)['mean'] == 2
+    app_database.close()
+    assert TaskAggregate.get(TaskAggregate.task == task.id).count == 2
+    assert TaskAggregate.check() == []
+
+
+def test_removing_the_values_rebuilds_the_aggregates_of_their_estimations(client, app_database, estimated_task):
+    task, _, values = estimated_task
+
+    assert client.delete(f'/estimations/sequences/{values[0].sequence_id}/values').status_code == 204
+
+    assert summary_of(client, task)['mean'] == 0
+    app_database.close()
+    assert not TaskAggregate.select().where(TaskAggregate.task == task.id).exists()
+    assert TaskAggregate.check() == []
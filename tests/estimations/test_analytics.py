@@ -0,0 +1,94 @@
+import pytest
+from playhouse.test_utils import count_queries
+
+from common.cache import cache
+from estimations import analytics
+from estimations.models import Estimation, Session, Task, Value
+from settings import app as settings
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def users(organization):
+    return [User.create(email=f'user_{i}@example.com', name=f'User {i}', password='pwd',
+                        organization=organization) for i in range(3)]
+
+
+def vote(task, users, sequence, *keys):
+    values = {value.value if value.value is not None else value.name: value for value in sequence.values}
+    for user, key in zip(users, keys):
+        Estimation.create(task=task, user=user, value=values[key])
+
+
+def test_organization_analytics(organization, session, sequence, users):
+    vote(Task.create(session=session, name='TASK-1'), users, sequence, 1, 3, 5)
+    vote(Task.create(session=session, name='TASK-2'), users, sequence, 2, 2, '?')
+    Task.create(session=session, name='TASK-3')
+    Session.create(name='Empty Session', organization=organization, sequence=sequence)
+
+    with count_queries() as counter:
+        report = analytics.compute(organization.id)
+
+    assert counter.count == 1
+    assert report['totals'] == {
+        'sessions': 2,
+        'tasks': 3,
+        'estimated_tasks': 2,
+        'estimations': 6,
+        'points': 5.0,
+        'consensus_rate': 0.0,
+        'mean_variance': 4 / 3,
+    }
+
+    sessions = {data['id']: data for data in report['sessions']}
+    estimated = sessions.pop(str(session.id))
+    empty, = sessions.values()
+    assert empty['tasks'] == [] and empty['totals']['tasks'] == 0
+
+    first, second, pending = sorted(estimated['tasks'], key=lambda task: task['name'])
+    assert (first['mean'], first['variance'], first['spread']) == (3.0, 8 / 3, 4.0)
+    assert (second['mean'], second['spread'], second['non_numeric_estimations']) == (2.0, 0.0, 1)
+    assert not second['consensus_met']
+    assert pending['estimations'] == 0 and not pending['consensus_met']
+
+
+def test_organization_analytics_consensus(organization, session, sequence, users):
+    vote(Task.create(session=session, name='TASK-1'), users, sequence, 3, 3, 3)
+
+    report = analytics.compute(organization.id)
+
+    assert report['totals']['consensus_rate'] == 1.0
+    assert report['sessions'][0]['tasks'][0]['consensus_met']
+
+
+def test_organization_analytics_are_cached_until_invalidated(organization, session, sequence, users, monkeypatch):
+    monkeypatch.setattr(settings, 'ANALYTICS_CACHE_TTL', 300)
+    task = Task.create(session=session, name='TASK-1')
+    vote(task, users[:1], sequence, 5)
+
+    assert analytics.organization_analytics(organization.id)['totals']['points'] == 5.0
+
+    Estimation.update(value=Value.get((Value.sequence == sequence) & (Value.value == 1))).execute()
+    with count_queries() as counter:
+        assert analytics.organization_analytics(organization.id)['totals']['points'] == 5.0
+    assert counter.count == 0
+
+    analytics.invalidate(organization.id)
+    assert analytics.organization_analytics(organization.id)['totals']['points'] == 1.0
+
+
+def test_organization_analytics_are_not_cached_without_ttl(organization, session, sequence, users, monkeypatch):
+    monkeypatch.setattr(settings, 'ANALYTICS_CACHE_TTL', 0)
+    vote(Task.create(session=session, name='TASK-1'), users[:1], sequence, 5)
+
+    assert analytics.organization_analytics(organization.id)['totals']['points'] == 5.0
+
+    Estimation.update(value=Value.get((Value.sequence == sequence) & (Value.value == 1))).execute()
+    assert analytics.organization_analytics(organization.id)['totals']['points'] == 1.0
@@ -0,0 +1,119 @@
+from decimal import Decimal
+
+from cerberus import Validator
+from playhouse.test_utils import count_queries
+
+from estimations import schemas
+from estimations.models import Estimation, SessionMember, Task, Value
+from organizations.models import Organization
+from users.models import User
+
+
+def test_create_many_tasks(session):
+    names = [f'TASK-{i}' for i in range(50)]
+
+    with count_queries() as counter:
+        results = Task.create_many(session, names)
+
+    # the transaction, one lookup for the existing names and one multi-row insert
+    assert counter.count == 3
+    assert [result['name'] for result in results] == names
+    assert all(result['status'] == 'created' for result in results)
+    assert Task.select().where(Task.session == session).count() == 50
+
+
+def test_create_many_tasks_reports_duplicates(session):
+    Task.create(session=session, name='TASK-1')
+
+    results = Task.create_many(session, ['TASK-1', 'TASK-2', 'TASK-2', 'TASK-3'])
+
+    assert [result['status'] for result in results] == ['duplicate', 'created', 'duplicate', 'created']
+    assert 'id' not in results[0]
+    assert 'id' in results[1]
+    assert Task.select().where(Task.session == session).count() == 3
+
+
+def test_join_many_members(session, organization):
+    users = [User.create(email=f'user_{i}@example.com', name=f'User {i}', password='pwd',
+                         organization=organization) for i in range(3)]
+    stranger = User.create(email='stranger@example.com', name='Stranger', password='pwd',
+                           organization=Organization.create(name='Another Organization'))
+    SessionMember.create(session=session, user=users[0])
+
+    user_ids = [str(user.id) for user in users] + [str(stranger.id), 'not-an-uuid', str(users[1].id)]
+    with count_queries() as counter:
+        results = SessionMember.join_many(session, user_ids)
+
+    # users, current members, the transaction and one multi-row insert
+    assert counter.count == 4
+    assert [result['status'] for result in results] == [
+        'already_joined',
+        'joined',
+        'joined',
+        'not_in_organization',
+        'not_found',
+        'already_joined',
+    ]
+    assert SessionMember.select().where(SessionMember.session == session).count() == 3
+
+
+def test_estimate_many_tasks(session, sequence, organization):
+    user = User.create(email='voter@example.com', name='Voter', password='pwd',
+                       organization=organization)
+    first, second, third = Task.create_many(session, ['TASK-1', 'TASK-2', 'TASK-3'])
+    coffee = Value.get((Value.sequence == sequence) & (Value.name == 'Coffee'))
+    Estimation.create(task=first['id'], user=user, value=coffee)
+
+    items = [
+        {'task': 'TASK-1', 'value': {'value': 3}},
+        {'task': second['id'], 'value': {'name': '?'}},
+        {'task': 'TASK-3', 'value': {'id': str(coffee.id)}},
+        {'task': 'TASK-3', 'value': {'value': 1}},
+        {'task': 'TASK-4', 'value': {'value': 1}},
+        {'task': 'TASK-2', 'value': {'value': 4}},
+    ]
+    results = Estimation.estimate_many(session, user, items)
+
+    assert [result['status'] for result in results] == [
+        'updated',
+        'created',
+        'created',
+        'duplicate',
+        'task_not_found',
+        'duplicate',
+    ]
+
+    query = Estimation.select().where(Estimation.user == user)
+    estimations = {estimation.task.name: estimation.value for estimation in query}
+    assert estimations['TASK-1'].value == Decimal('3')
+    assert estimations['TASK-2'].name == '?'
+    assert estimations['TASK-3'].name == 'Coffee'
+
+
+def test_estimate_many_reports_unknown_values(session, organization):
+    user = User.create(email='voter@example.com', name='Voter', password='pwd',
+                       organization=organization)
+    Task.create(session=session, name='TASK-1')
+
+    results = Estimation.estimate_many(session, user, [{'task': 'TASK-1', 'value': {'value': 4}}])
+
+    assert results == [{'task': 'TASK-1', 'status': 'value_not_found'}]
+    assert not Estimation.select().count()
+
+
+def test_estimated_values_follow_the_documented_priority(session, sequence, organization):
+    user = User.create(email='voter@example.com', name='Voter', password='pwd',
+                       organization=organization)
+    Task.create(session=session, name='TASK-1')
+    coffee = Value.get((Value.sequence == sequence) & (Value.name == 'Coffee'))
+
+    value = {'id': str(coffee.id), 'value': 3, 'name': '?'}
+    payload = {'user': {'id': str(user.id)}, 'estimations': [{'task': 'TASK-1', 'value': value}]}
+    assert Validator().validate(payload, schemas.CREATE_ESTIMATIONS)
+    assert Validator().validate({'user': payload['user'], 'value': value}, schemas.CREATE_ESTIMATION)
+    assert not Validator().validate({'user': payload['user'], 'value': {}}, schemas.CREATE_ESTIMATION)
+
+    results = Estimation.estimate_many(session, user, payload['estimations'])
+
+    assert results[0]['status'] == 'created'
+    assert Estimation.get(Estimation.user == user).value == coffee
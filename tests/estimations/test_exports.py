@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+from uuid import UUID
+
+import pytest
+
+from common.db import stream
+from estimations import exports
+from estimations.models import Estimation, SessionMember, Task, Value
+from users.models import User
+
+
+@pytest.fixture
+def estimated_session(organization, session, sequence):
+    user = User.create(email='user@example.com', name='User', password='pwd', organization=organization)
+    SessionMember.create(session=session, user=user)
+    task = Task.create(session=session, name='TASK-1')
+    Task.create(session=session, name='TASK-2')
+    Estimation.create(task=task, user=user, value=Value.get((Value.sequence == sequence) & (Value.value == 3)))
+    return session
+
+
+def test_stream_converts_the_rows(estimated_session):
+    rows = list(stream(Task.select(Task.id, Task.name).order_by(Task.name), batch_size=1))
+
+    assert [name for _, name in rows] == ['TASK-1', 'TASK-2']
+    assert all(isinstance(task_id, UUID) for task_id, _ in rows)
+
+
+def test_ndjson_export(organization, estimated_session):
+    content = ''.join(exports.export(organization, 'ndjson'))
+    records = [json.loads(line) for line in content.splitlines()]
+
+    assert [record['type'] for record in records] == [
+        'organization', 'user', 'sequence', 'session', 'member', 'task', 'task', 'estimation',
+    ]
+    assert records[1] == {
+        'type': 'user',
+        'id': records[4]['user']['id'],
+        'email': 'user@example.com',
+        'name': 'User',
+        'role': 'USER',
+        'organization': str(organization.id),
+    }
+    assert records[2]['name'] == 'Fibonacci' and len(records[2]['values']) == 7
+    assert records[3]['organization'] == {'id': str(organization.id)}
+    assert records[3]['sequence'] == {'name': 'Fibonacci'}
+    assert records[-1]['value_number'] == 3.0
+    assert records[-1]['task'] in {record['id'] for record in records if record['type'] == 'task'}
+
+
+def test_csv_export(organization, estimated_session, monkeypatch):
+    monkeypatch.setattr(exports, 'CHUNK_SIZE', 1)
+
+    chunks = list(exports.export(organization, 'csv'))
+    rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+
+    assert len(chunks) == 3
+    assert [(row['task_name'], row['value']) for row in sorted(rows, key=lambda row: row['task_name'])] == [
+        ('TASK-1', '3.0'),
+        ('TASK-2', ''),
+    ]
+    assert all(row['session_id'] == str(estimated_session.id) for row in rows)
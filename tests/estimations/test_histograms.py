@@ -0,0 +1,66 @@
+from playhouse.test_utils import count_queries
+
+from estimations.models import Estimation, Task, Value
+from users.models import User
+
+
+def counts(histogram):
+    return [(bucket['value']['value'], bucket['value'].get('name'), bucket['count']) for bucket in histogram]
+
+
+def test_sorted_values_are_fetched_with_a_single_query(sequence):
+    with count_queries() as counter:
+        values = sequence.sorted_values
+
+    assert counter.count == 1
+    assert [value.value for value in values[:5]] == [0, 1, 2, 3, 5]
+    assert [value.name for value in values[5:]] == ['?', 'Coffee']
+
+    Value.from_list([{'name': 'Break'}], sequence)
+    assert [value.name for value in sequence.sorted_values[5:]] == ['?', 'Break', 'Coffee']
+
+
+def test_task_histogram(session, sequence, organization):
+    task = Task.create(session=session, name='TASK-1')
+    values = {value.value if value.value is not None else value.name: value for value in sequence.values}
+    for i, key in enumerate([2, 2, 3, '?']):
+        user = User.create(email=f'user_{i}@example.com', name=f'User {i}', password='pwd',
+                           organization=organization)
+        Estimation.create(task=task, user=user, value=values[key])
+
+    sorted_values = sequence.sorted_values
+    with count_queries() as counter:
+        histogram = task.histogram(sorted_values)
+
+    assert counter.count == 1
+    assert counts(histogram) == [
+        (0.0, None, 0),
+        (1.0, None, 0),
+        (2.0, None, 2),
+        (3.0, None, 1),
+        (5.0, None, 0),
+        (None, '?', 1),
+        (None, 'Coffee', 0),
+    ]
+
+
+def test_session_histograms(session, sequence, organization):
+    estimated, pending = Task.create(session=session, name='TASK-1'), Task.create(session=session, name='TASK-2')
+    user = User.create(email='user@example.com', name='User', password='pwd', organization=organization)
+    Estimation.create(task=estimated, user=user, value=sequence.sorted_values[1])
+
+    sorted_values = sequence.sorted_values
+    with count_queries() as counter:
+        histograms = Task.histograms(session, sorted_values)
+
+    assert counter.count == 1
+    assert set(histograms) == {estimated.id, pending.id}
+    assert [bucket['count'] for bucket in histograms[estimated.id]] == [0, 1, 0, 0, 0, 0, 0]
+    assert [bucket['count'] for bucket in histograms[pending.id]] == [0] * 7
+
+
+def test_tasks_created_since_get_an_empty_histogram(session, sequence):
+    histograms = Task.histograms(session, sequence.sorted_values)
+    created = Task.create(session=session, name='TASK-1')
+
+    assert [bucket['count'] for bucket in histograms[created.id]] == [0] * 7
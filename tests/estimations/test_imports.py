@@ -0,0 +1,135 @@
+import json
+from uuid import uuid4
+
+import peewee
+import pytest
+
+from estimations import exports, imports
+from estimations.models import Estimation, Sequence, Session, SessionMember, Task, TaskAggregate, Value
+from organizations.models import Organization
+from users.models import User
+
+
+@pytest.fixture
+def user(organization):
+    return User.create(email='user@example.com', name='User', password='pwd', organization=organization)
+
+
+@pytest.fixture
+def exported(organization, session, sequence, user):
+    SessionMember.create(session=session, user=user)
+    task = Task.create(session=session, name='TASK-1')
+    Task.create(session=session, name='TASK-2')
+    Estimation.create(task=task, user=user, value=Value.get((Value.sequence == sequence) & (Value.value == 3)))
+
+    lines = ''.join(exports.export(organization, 'ndjson')).splitlines()
+    for model in (TaskAggregate, Estimation, Task, SessionMember, Session):
+        model.delete().execute()
+    return lines
+
+
+def test_export_round_trip(exported, session, user):
+    report = imports.Importer(batch_size=2, transaction_batches=2).run(exported)
+
+    assert report.lines == 8
+    assert dict(report.imported) == {'session': 1, 'member': 1, 'task': 2, 'estimation': 1}
+    # the organization, its user and the sequence already exist
+    assert dict(report.skipped) == {'organization': 1, 'user': 1, 'sequence': 1}
+    assert report.error_count == 0
+
+    assert Session.get_by_id(session.id).name == 'Session'
+    assert [member.user_id for member in SessionMember.select()] == [user.id]
+    task = Task.get(Task.name == 'TASK-1')
+    assert task.aggregate.count == 1 and task.aggregate.numeric_sum == 3
+
+
+def test_invalid_records_are_reported(exported):
+    lines = exported[3:5] + [
+        'not json',
+        json.dumps({'type': 'unknown'}),
+        json.dumps({'type': 'task', 'session': exported[3][:10]}),
+        json.dumps({'type': 'task', 'session': 'not-a-uuid', 'name': 'TASK-3'}),
+    ]
+
+    report = imports.Importer().run(lines)
+
+    assert dict(report.imported) == {'session': 1, 'member': 1}
+    assert [(error['line'], error['type']) for error in report.errors] == [
+        (3, None),
+        (4, 'unknown'),
+        (5, 'task'),
+        (6, 'task'),
+    ]
+    assert 'name' in report.errors[2]['errors']
+    assert report.errors[3]['errors'] == {'session': ['not-a-uuid is not a valid UUID']}
+
+
+def test_estimations_resolve_values_by_name(exported, sequence, user):
+    session_record = json.loads(exported[3])
+    lines = exported[3:4] + [
+        json.dumps({'type': 'task', 'id': session_record['id'], 'session': session_record['id'], 'name': 'TASK-3'}),
+        json.dumps({'type': 'estimation', 'task': session_record['id'], 'user': {'id': str(user.id)},
+                    'value': {'name': 'Coffee'}}),
+        json.dumps({'type': 'estimation', 'task': session_record['id'], 'user': {'id': str(user.id)},
+                    'value': {'name': 'Tea'}}),
+    ]
+
+    report = imports.Importer().run(lines)
+
+    assert dict(report.imported) == {'session': 1, 'task': 1, 'estimation': 1}
+    assert report.errors[0]['line'] == 4 and 'value' in report.errors[0]['errors']
+    assert Estimation.get().value.name == 'Coffee'
+
+
+def test_sequence_errors_are_reported(sqlite_database):
+    value_id = str(uuid4())
+    lines = [
+        json.dumps({'type': 'organization', 'name': 'Imported'}),
+        json.dumps({'type': 'sequence', 'name': 'First', 'values': [{'id': value_id, 'value': 1}]}),
+        json.dumps({'type': 'sequence', 'name': 'Second', 'values': [{'id': value_id, 'value': 2}]}),
+        json.dumps({'type': 'sequence', 'name': 'Third', 'values': [{'id': 'not-a-uuid', 'value': 3}]}),
+    ]
+
+    report = imports.Importer(batch_size=1, transaction_batches=1).run(lines)
+
+    assert dict(report.imported) == {'organization': 1, 'sequence': 1}
+    assert [(error['line'], error['type']) for error in report.errors] == [(3, 'sequence'), (4, 'sequence')]
+    assert 'record' in report.errors[0]['errors']
+    assert report.errors[1]['errors'] == {'values': ['not-a-uuid is not a valid UUID']}
+    assert [sequence.name for sequence in Sequence.select()] == ['First']
+    assert [str(value.id) for value in Value.select()] == [value_id]
+
+
+def test_exports_import_into_an_empty_database(organization, session, sequence, user, bind):
+    other = User.create(email='other@example.com', name='Other', password='pwd', organization=organization)
+    for member in (user, other):
+        SessionMember.create(session=session, user=member)
+    values = sequence.sorted_values
+    for number in range(3):
+        task = Task.create(session=session, name=f'TASK-{number}')
+        Estimation.create(task=task, user=user, value=values[number])
+        Estimation.create(task=task, user=other, value=values[4])
+    TaskAggregate.rebuild()
+
+    models = (Organization, User, Sequence, Value, Session, SessionMember, Task, Estimation, TaskAggregate)
+    exported_counts = [model.select().count() for model in models]
+    lines = ''.join(exports.export(organization, 'ndjson')).splitlines()
+    assert 'pwd' not in ''.join(lines)
+
+    empty = peewee.SqliteDatabase(':memory:', pragmas={'foreign_keys': 1})
+    with bind(empty):
+        empty.create_tables(models)
+        report = imports.Importer(batch_size=3).run(lines)
+
+        assert report.error_count == 0
+        assert [model.select().count() for model in models] == exported_counts
+        assert Task.get(Task.name == 'TASK-1').summary()['mean'] == pytest.approx(float(values[1].value + 5) / 2)
+        # the passwords are not exported, the users get a random one to reset
+        assert User.get_by_id(user.id).password not in ('', 'pwd')
+
+        again = imports.Importer().run(lines)
+
+        assert again.error_count == 0
+        assert set(again.imported) <= {'member'}
+        assert [model.select().count() for model in models] == exported_counts
+    empty.close()
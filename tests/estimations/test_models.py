@@ -221,3 +221,12 @@ def test_sequence_closest_possible_value(sequence_with_valid_linked_values: Sequ
     # test the closest value is the higher than the max value
     actual = sequence_with_valid_linked_values.closest_possible_value(Decimal('10'))
     assert actual.value == Decimal('2.0')
+
+
+def test_values_from_list_get_their_own_ids(sequence):
+    given = uuid4()
+
+    value, = Value.from_list([{'id': str(given), 'value': 34}], sequence)
+
+    assert value.id != given
+    assert Value.get_by_id(value.id).value == 34
@@ -0,0 +1,41 @@
+import pytest
+from playhouse.test_utils import count_queries
+
+from estimations.models import Estimation, SessionMember, Task, Value
+from users.models import User
+
+
+@pytest.fixture
+def members(organization, session):
+    users = [User.create(email=f'user_{i}@example.com', name=f'User {i}', password='pwd',
+                         organization=organization) for i in range(3)]
+    for user in users:
+        SessionMember.create(session=session, user=user)
+    return users
+
+
+def test_pending_members(session, sequence, members):
+    task = Task.create(session=session, name='TASK-1')
+    outsider = User.create(email='outsider@example.com', name='Outsider', password='pwd')
+    value = Value.get((Value.sequence == sequence) & (Value.value == 3))
+    Estimation.create(task=task, user=members[1], value=value)
+    Estimation.create(task=task, user=outsider, value=value)
+    # estimations of other tasks do not count
+    Estimation.create(task=Task.create(session=session, name='TASK-2'), user=members[0], value=value)
+
+    with count_queries() as counter:
+        pending = list(task.pending_members())
+        everybody_estimated = task.is_estimated_by_all_members
+
+    assert counter.count == 2
+    assert {user.id for user in pending} == {members[0].id, members[2].id}
+    assert not everybody_estimated
+
+
+def test_estimated_by_all_members(session, sequence, members):
+    task = Task.create(session=session, name='TASK-1')
+    for user in members:
+        Estimation.create(task=task, user=user, value=Value.get((Value.sequence == sequence) & (Value.value == 3)))
+
+    assert list(task.pending_members()) == []
+    assert task.is_estimated_by_all_members
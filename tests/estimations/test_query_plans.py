@@ -0,0 +1,117 @@
+"""Query plan regression tests.
+
+The hot lookups are executed against a local database, every SELECT they run
+is then explained and must be resolved through an index instead of a full scan.
+"""
+from typing import List
+
+import pytest
+from playhouse.test_utils import count_queries
+
+from estimations.models import Estimation, Session, SessionMember, Task
+from organizations.models import Organization
+from users.models import User
+
+
+def explain(database, sql: str, params: list) -> List[str]:
+    cursor = database.execute_sql(f'EXPLAIN QUERY PLAN {sql}', params)
+    return [row[-1] for row in cursor.fetchall()]
+
+
+def assert_no_full_scans(database, counter: count_queries):
+    selects = [record.msg for record in counter.get_queries()
+               if record.msg[0].startswith('SELECT')]
+    assert selects
+
+    for sql, params in selects:
+        plan = explain(database, sql, params)
+        full_scans = [detail for detail in plan if detail.startswith('SCAN')]
+        assert not full_scans, f'{sql} is not using an index: {plan}'
+
+
+def assert_searches_on(database, counter: count_queries, constraints: str):
+    """Assert the index used by the query covers all the given constraints."""
+    plans = [' '.join(explain(database, *record.msg)) for record in counter.get_queries()
+             if record.msg[0].startswith('SELECT')]
+    assert any(f'({constraints})' in plan for plan in plans), plans
+
+
+@pytest.fixture
+def user(organization):
+    return User.create(email='user@example.com', name='User', password='pwd',
+                       organization=organization)
+
+
+@pytest.fixture
+def task(session):
+    return Task.create(session=session, name='TASK-1')
+
+
+def test_task_lookup_by_name_plan(sqlite_database, session, task):
+    with count_queries() as counter:
+        Task.lookup('TASK-1', session=session)
+
+    assert_no_full_scans(sqlite_database, counter)
+    assert_searches_on(sqlite_database, counter, 'session=? AND name=?')
+
+
+def test_session_tasks_plan(sqlite_database, session, task):
+    with count_queries() as counter:
+        list(session.tasks)
+
+    assert_no_full_scans(sqlite_database, counter)
+
+
+def test_estimation_lookup_plan(sqlite_database, task, user):
+    with count_queries() as counter:
+        Estimation.lookup(task, user)
+
+    assert_no_full_scans(sqlite_database, counter)
+    assert_searches_on(sqlite_database, counter, 'task=? AND user=?')
+
+
+def test_task_estimations_plan(sqlite_database, task):
+    with count_queries() as counter:
+        list(task.estimations)
+
+    assert_no_full_scans(sqlite_database, counter)
+
+
+def test_sequence_values_plan(sqlite_database, sequence):
+    with count_queries() as counter:
+        list(sequence.values)
+
+    assert_no_full_scans(sqlite_database, counter)
+
+
+def test_organization_sessions_plan(sqlite_database, organization, session):
+    with count_queries() as counter:
+        list(organization.sessions.order_by(Session.created_at))
+
+    assert_no_full_scans(sqlite_database, counter)
+    sql, params = counter.get_queries()[0].msg
+    assert not any('TEMP B-TREE' in detail for detail in explain(sqlite_database, sql, params))
+
+
+def test_session_members_plan(sqlite_database, session, user):
+    SessionMember.create(session=session, user=user)
+
+    with count_queries() as counter:
+        list(session.session_members)
+
+    assert_no_full_scans(sqlite_database, counter)
+
+
+def test_bulk_paths_plans(sqlite_database, session, task, user):
+    another_organization = Organization.create(name='Another Organization')
+
+    with count_queries() as counter:
+        Task.create_many(session, ['TASK-1', 'TASK-2'])
+        SessionMember.join_many(session, [str(user.id)])
+        Estimation.estimate_many(session, user, [
+            {'task': 'TASK-1', 'value': {'value': 1}},
+            {'task': str(task.id), 'value': {'name': '?'}},
+        ])
+        list(another_organization.sessions)
+
+    assert_no_full_scans(sqlite_database, counter)
@@ -0,0 +1,78 @@
+from playhouse.test_utils import count_queries
+
+from estimations.models import Estimation, Task
+from organizations.models import Organization
+from users.models import User
+
+
+def create_users(organization, count):
+    # the names repeat, the users of the same name keep their order
+    return [User.create(email=f'user_{organization.name}_{i}@example.com', name=f'User {i % 3}', password='pwd',
+                        organization=organization) for i in range(count)]
+
+
+def test_task_rows_dump_like_the_instances(session):
+    for name in ('TASK-2', 'TASK-1', 'TASK-3'):
+        Task.create(session=session, name=name)
+
+    with count_queries() as counter:
+        rows = Task.dump_rows(session.tasks)
+
+    assert counter.count == 1
+    assert rows == [task.dump(with_session=False) for task in session.tasks]
+    assert set(rows[0]) == {'id', 'name', 'created_at'}
+
+
+def test_estimation_rows_dump_like_the_instances(session, sequence, organization):
+    task = Task.create(session=session, name='TASK-1')
+    users = create_users(organization, 4)
+    values = sequence.sorted_values
+    for user, value in zip(users, (values[1], values[4], values[5], values[6])):
+        Estimation.create(task=task, user=user, value=value)
+    Estimation.create(task=Task.create(session=session, name='TASK-2'), user=users[0], value=values[0])
+
+    with count_queries() as counter:
+        rows = Estimation.dump_rows(task.estimations)
+
+    assert counter.count == 1
+    assert rows == [estimation.dump(with_task=False) for estimation in task.estimations]
+    assert sorted(row['value'].get('name', '') for row in rows) == ['', '', '?', 'Coffee']
+    row = next(row for row in rows if row['user']['id'] == str(users[0].id))
+    user = User.get_by_id(users[0].id)
+    assert row == {
+        'user': {
+            'id': str(user.id),
+            'email': user.email,
+            'name': user.name,
+            'role': user.role,
+            'registered_on': user.registered_on.isoformat(),
+        },
+        'value': {'id': values[1].id, 'value': 1.0},
+        'created_at': row['created_at'],
+    }
+
+
+def test_organization_dumps_its_users_from_rows(organization):
+    assert organization.dump() == {'id': str(organization.id), 'name': 'Organization'}
+
+    create_users(organization, 7)
+    create_users(Organization.create(name='Other'), 2)
+
+    expected = [user.dump(with_organization=False) for user in organization.users]
+    expected.sort(key=lambda user: user['name'])
+    with count_queries() as counter:
+        data = organization.dump()
+
+    assert counter.count == 1
+    assert data['users'] == expected
+
+
+def test_session_dumps_its_tasks_from_rows(session):
+    assert 'tasks' not in session.dump()
+
+    for name in ('TASK-2', 'TASK-1'):
+        Task.create(session=session, name=name)
+
+    assert [task['name'] for task in session.dump()['tasks']] == ['TASK-1', 'TASK-2']
+    assert session.dump()['tasks'] == sorted([task.dump(with_session=False) for task in session.tasks],
+                                             key=lambda task: task['name'])
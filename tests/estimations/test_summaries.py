@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+
+from estimations.exc import SessionCompleted
+from estimations.models import Estimation, EstimationSummary, SessionMember, Task, Value
+from users.models import User
+
+
+@pytest.fixture
+def members(session, organization):
+    users = [User.create(email=f'user_{i}@example.com', name=f'User {i}', password='pwd',
+                         organization=organization) for i in range(2)]
+    for user in users:
+        SessionMember.create(session=session, user=user)
+    return users
+
+
+def value_named(sequence, number):
+    return Value.get((Value.sequence == sequence) & (Value.value == Decimal(number)))
+
+
+def test_complete_session_freezes_the_summaries(session, sequence, members):
+    first_task = Task.create(session=session, name='TASK-1')
+    second_task = Task.create(session=session, name='TASK-2')
+    Estimation.create(task=first_task, user=members[0], value=value_named(sequence, 2))
+    Estimation.create(task=first_task, user=members[1], value=value_named(sequence, 3))
+    Estimation.create(task=second_task, user=members[0], value=value_named(sequence, 5))
+    Estimation.create(task=second_task, user=members[1], value=value_named(sequence, 5))
+
+    summaries = session.complete()
+
+    assert len(summaries) == 2
+    assert session.completed
+    assert session.completed_at is not None
+
+    summary = EstimationSummary.lookup(first_task)
+    assert summary.mean == Decimal('2.5')
+    assert summary.closest_value.value == Decimal('3')
+    assert summary.everybody_estimated
+    assert not summary.consensus_met
+
+    counts = [(bucket['value']['value'], bucket['count']) for bucket in summary.histogram]
+    assert counts[:5] == [(0.0, 0), (1.0, 0), (2.0, 1), (3.0, 1), (5.0, 0)]
+
+    data = summary.dump()
+    assert data['mean'] == 2.5
+    assert data['task']['name'] == 'TASK-1'
+    assert len(data['task']['estimations']) == 2
+
+    assert EstimationSummary.lookup(second_task).consensus_met
+
+
+def test_completed_session_can_not_be_changed(session):
+    session.complete()
+
+    with pytest.raises(SessionCompleted):
+        session.ensure_open()
+
+    with pytest.raises(SessionCompleted):
+        session.complete()
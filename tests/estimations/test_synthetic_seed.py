@@ -0,0 +1,86 @@
+import importlib.util
+import os
+from collections import defaultdict
+from decimal import Decimal
+
+import pytest
+from playhouse.db_url import connect
+
+from estimations.models import Estimation, Session, SessionMember, Task, TaskAggregate, Value
+from organizations.models import Organization
+from users.models import User
+
+
+SEED_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'seeds', 'synthetic_seed.py')
+
+OPTIONS = ['--organizations', '3', '--users', '20', '--sessions', '6', '--tasks', '30', '--estimations', '100',
+           '--batch-size', '7']
+
+
+@pytest.fixture(scope='module')
+def synthetic_seed():
+    spec = importlib.util.spec_from_file_location('synthetic_seed', SEED_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def seed(synthetic_seed, path, *options):
+    url = f'sqlite:///{path}'
+    assert synthetic_seed.main(['--database', url, *OPTIONS, *options]) == 0
+    return connect(url)
+
+
+def rows(database, models):
+    with database.bind_ctx(models):
+        return {model._meta.table_name: sorted(model.select().tuples(), key=str) for model in models}
+
+
+def test_the_requested_rows_are_generated(synthetic_seed, tmp_path):
+    database = seed(synthetic_seed, tmp_path / 'seed.db')
+
+    with database.bind_ctx(synthetic_seed.MODELS):
+        assert Organization.select().count() == 3
+        assert User.select().count() == 20
+        assert Session.select().count() == 6
+        assert Task.select().count() == 30
+        assert Value.select().count() == len(synthetic_seed.SEQUENCE_VALUES) + len(synthetic_seed.NON_NUMERIC_VALUES)
+        # every member votes with the same probability, about the requested amount
+        assert 0 < Estimation.select().count() <= 2 * 100
+
+        for organization in Organization.select():
+            assert organization.users.count() >= 1
+        for member in SessionMember.select():
+            assert member.user.organization_id == member.session.organization_id
+    database.close()
+
+
+def test_the_same_seed_generates_the_same_rows(synthetic_seed, tmp_path):
+    first = seed(synthetic_seed, tmp_path / 'first.db', '--seed', '7')
+    second = seed(synthetic_seed, tmp_path / 'second.db', '--seed', '7')
+    other = seed(synthetic_seed, tmp_path / 'other.db', '--seed', '8')
+
+    assert rows(first, synthetic_seed.MODELS) == rows(second, synthetic_seed.MODELS)
+    assert rows(first, [User]) != rows(other, [User])
+    for database in (first, second, other):
+        database.close()
+
+
+def test_the_aggregates_match_the_estimations(synthetic_seed, tmp_path):
+    database = seed(synthetic_seed, tmp_path / 'seed.db')
+
+    with database.bind_ctx(synthetic_seed.MODELS):
+        assert TaskAggregate.select().count() == Estimation.select(Estimation.task).distinct().count()
+        assert TaskAggregate.check() == []
+
+        numbers = defaultdict(list)
+        for task_id, number in Estimation.select(Estimation.task, Value.value).join(Value).tuples():
+            if number is not None:
+                numbers[task_id].append(number)
+
+        for task in Task.select():
+            summary = task.summary()
+            expected = sum(numbers[task.id], Decimal(0)) / len(numbers[task.id]) if numbers[task.id] else 0
+            assert summary['mean'] == pytest.approx(float(expected))
+            assert len(summary['task']['estimations']) == task.estimations.count()
+    database.close()